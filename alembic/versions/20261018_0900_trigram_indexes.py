@@ -0,0 +1,61 @@
+"""Trigram indexes for fuzzy name search
+
+Revision ID: 3c5e1f7a9b2d
+Revises: f9a133b33db1
+Create Date: 2026-10-18 09:00:00.000000+00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3c5e1f7a9b2d"
+down_revision = "f9a133b33db1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_species_matched_canonical_full_name_trgm",
+        "species",
+        ["matched_canonical_full_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"matched_canonical_full_name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_species_current_name_trgm",
+        "species",
+        ["current_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"current_name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_species_common_names_name_trgm",
+        "species_common_names",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_species_synonyms_scientific_name_trgm",
+        "species_synonyms",
+        ["scientific_name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"scientific_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_species_synonyms_scientific_name_trgm", table_name="species_synonyms"
+    )
+    op.drop_index(
+        "ix_species_common_names_name_trgm", table_name="species_common_names"
+    )
+    op.drop_index("ix_species_current_name_trgm", table_name="species")
+    op.drop_index("ix_species_matched_canonical_full_name_trgm", table_name="species")
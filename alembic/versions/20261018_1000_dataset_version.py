@@ -0,0 +1,36 @@
+"""Dataset version for HTTP caching
+
+Revision ID: 8d2b4e6f1a3c
+Revises: 3c5e1f7a9b2d
+Create Date: 2026-10-18 10:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d2b4e6f1a3c"
+down_revision = "3c5e1f7a9b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "dataset_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO dataset_version (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table("dataset_version")
@@ -0,0 +1,30 @@
+"""Content hashes of the imported records for incremental imports
+
+Revision ID: 5a7c9e1b3d4f
+Revises: 8d2b4e6f1a3c
+Create Date: 2026-10-18 11:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5a7c9e1b3d4f"
+down_revision = "8d2b4e6f1a3c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "import_hashes",
+        sa.Column("table_name", sa.String(length=100), nullable=False),
+        sa.Column("key", sa.String(length=700), nullable=False),
+        sa.Column("hash", sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint("table_name", "key"),
+    )
+
+
+def downgrade():
+    op.drop_table("import_hashes")
@@ -0,0 +1,30 @@
+"""Geography index of the station coordinates
+
+Revision ID: 7c1e3a5b9d2f
+Revises: 5a7c9e1b3d4f
+Create Date: 2026-10-18 12:00:00.000000+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7c1e3a5b9d2f"
+down_revision = "5a7c9e1b3d4f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_stations_coordinates_geography",
+        "stations",
+        [sa.text("geography(coordinates)")],
+        unique=False,
+        postgresql_using="gist",
+    )
+
+
+def downgrade():
+    op.drop_index("ix_stations_coordinates_geography", table_name="stations")
@@ -0,0 +1,76 @@
+"""Materialized views of the station and species counts
+
+Revision ID: 9e4f2a6c8b1d
+Revises: 7c1e3a5b9d2f
+Create Date: 2026-10-18 13:00:00.000000+00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e4f2a6c8b1d"
+down_revision = "7c1e3a5b9d2f"
+branch_labels = None
+depends_on = None
+
+# The genera are not counted as species, see `app.utils.species.binomial_only`
+BINOMIAL_SPECIES = """
+    LEFT JOIN stations_species ON stations_species.station_id = stations.name
+    LEFT JOIN species ON species.id = stations_species.species_id
+        AND species.current_canonical_simple_name LIKE '% %'
+"""
+
+
+def upgrade():
+    op.execute(
+        f"""
+        CREATE MATERIALIZED VIEW station_species_counts AS
+        SELECT stations.name AS station_id, count(species.id) AS species_count
+        FROM stations
+        {BINOMIAL_SPECIES}
+        GROUP BY stations.name
+        """
+    )
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW species_station_counts AS
+        SELECT species.id AS species_id,
+            count(stations_species.station_id) AS station_count
+        FROM species
+        LEFT JOIN stations_species ON stations_species.species_id = species.id
+        GROUP BY species.id
+        """
+    )
+    op.execute(
+        f"""
+        CREATE MATERIALIZED VIEW fao_area_counts AS
+        SELECT stations.fao_area,
+            count(DISTINCT stations.name) AS station_count,
+            count(DISTINCT species.id) AS species_count
+        FROM stations
+        {BINOMIAL_SPECIES}
+        GROUP BY stations.fao_area
+        """
+    )
+    # The unique indexes allow refreshing the views concurrently
+    op.create_index(
+        "ix_station_species_counts_station_id",
+        "station_species_counts",
+        ["station_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_species_station_counts_species_id",
+        "species_station_counts",
+        ["species_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_fao_area_counts_fao_area", "fao_area_counts", ["fao_area"], unique=True
+    )
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW fao_area_counts")
+    op.execute("DROP MATERIALIZED VIEW species_station_counts")
+    op.execute("DROP MATERIALIZED VIEW station_species_counts")
@@ -1,48 +1,72 @@
 from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
 from app.api import deps
+from app.utils.encoders import json_response
+from app.utils.streaming import StreamFormat, streaming_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=schemas.DataSourceSummaryPagination)
-def read_data_sources(
-    db: Session = Depends(deps.get_db),
+async def read_data_sources(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
     order_by: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
 ) -> Any:
-    """Retrieve data sources."""
-    data_sources = crud.data_source.get_multi(
-        db, skip=skip, limit=limit, order_by=order_by
+    """Retrieve data sources.
+    Pass an empty `cursor` to paginate by cursor instead of `skip`."""
+    data_sources = await crud.data_source.get_multi_async(
+        db,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        cursor=cursor,
+        schema=schemas.DataSourceSummary,
     )
     return data_sources
 
 
 @router.get("/all/", response_model=List[schemas.DataSourceSummary])
-def read_all_data_sources(
-    db: Session = Depends(deps.get_db),
+async def read_all_data_sources(
+    db: AsyncSession = Depends(deps.get_async_db),
     order_by: Optional[List[str]] = Query(None),
+    stream: Optional[StreamFormat] = None,
 ) -> Any:
-    """Retrieve all data sources."""
-    data_sources = crud.data_source.get_all(db, order_by=order_by)
-    return data_sources
+    """Retrieve all data sources.
+    Set `stream` to serialize the data sources while they are fetched from
+    the database."""
+    if stream:
+        return streaming_response(
+            crud.data_source.stream_all_async(
+                db, order_by=order_by, schema=schemas.DataSourceSummary
+            ),
+            schemas.DataSourceSummary,
+            stream,
+        )
+    data_sources = await crud.data_source.get_all_async(
+        db, order_by=order_by, schema=schemas.DataSourceSummary
+    )
+    return json_response(data_sources, schemas.DataSourceSummary)
 
 
 @router.get(
     "/{data_source_id}",
     response_model=schemas.DataSourceDetails,
 )
-def read_data_source_by_id(
+async def read_data_source_by_id(
     data_source_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
 ) -> Any:
     """Get a data source by id."""
-    data_source = crud.data_source.get(db, id=data_source_id)
+    data_source = await crud.data_source.get_async(
+        db, id=data_source_id, schema=schemas.DataSourceDetails
+    )
     if not data_source:
         raise HTTPException(
             status_code=404, detail=f"Data source not found: ${data_source_id}"
@@ -51,10 +75,10 @@ def read_data_source_by_id(
 
 
 @router.get("/{data_source_id}/species", response_model=List[schemas.SpeciesSummary])
-def read_data_source_species(
+async def read_data_source_species(
     data_source_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
 ) -> Any:
     """Get all the species for the given data source id."""
-    species = crud.data_source.get_species(db, id=data_source_id)
+    species = await crud.data_source.get_species_async(db, id=data_source_id)
     return species
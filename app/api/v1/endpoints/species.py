@@ -1,139 +1,183 @@
-from typing import Any, List, Optional, Type, Union
+from typing import Any, List, Optional, Union
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import Table
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app import crud, schemas
 from app.api import deps
-from app.db.base_class import Base
-from app.models import SpeciesCommonNames, SpeciesSynonyms, stations_species_table
+from app.utils.cache import cached_search
+from app.utils.dataset_version import dataset_version
+from app.utils.encoders import json_response
+from app.utils.fuzzy_index import (
+    MatchedRecord,
+    get_fuzzy_index,
+    refresh_fuzzy_index_if_stale,
+)
 from app.utils.species import binomial_only
+from app.utils.streaming import StreamFormat, streaming_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=schemas.SpeciesSummaryPagination)
-def read_species(
-    db: Session = Depends(deps.get_db),
+async def read_species(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
     order_by: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
 ) -> Any:
-    """Retrieve species."""
-    species = crud.species.get_multi(db, skip=skip, limit=limit, order_by=order_by)
+    """Retrieve species.
+    Pass an empty `cursor` to paginate by cursor instead of `skip`."""
+    species = await crud.species.get_multi_async(
+        db,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        cursor=cursor,
+        schema=schemas.SpeciesSummary,
+    )
     return species
 
 
 @router.get("/all/", response_model=List[schemas.SpeciesSummary])
-def read_all_species(
-    db: Session = Depends(deps.get_db), order_by: Optional[List[str]] = Query(None)
+async def read_all_species(
+    db: AsyncSession = Depends(deps.get_async_db),
+    order_by: Optional[List[str]] = Query(None),
+    stream: Optional[StreamFormat] = None,
 ) -> Any:
-    """Retrieve all species."""
-    species = crud.species.get_all(db, order_by=order_by)
-    return binomial_only(species)
+    """Retrieve all species.
+    Set `stream` to serialize the species while they are fetched from the database."""
+    if stream:
+        return streaming_response(
+            crud.species.stream_all_async(
+                db,
+                order_by=order_by,
+                filters=[binomial_only()],
+                schema=schemas.SpeciesSummary,
+            ),
+            schemas.SpeciesSummary,
+            stream,
+        )
+    species = await crud.species.get_all_async(
+        db,
+        order_by=order_by,
+        filters=[binomial_only()],
+        schema=schemas.SpeciesSummary,
+    )
+    return json_response(species, schemas.SpeciesSummary)
 
 
 @router.post("/search/", response_model=List[schemas.SpeciesSummary])
-def read_species_by_search(
+async def read_species_by_search(
     expressions: Union[schemas.Expression, schemas.ExpressionGroup],
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     limit: int = 0,
     order_by: Optional[List[str]] = Query(None),
 ) -> Any:
     """Retrieves the species based on the given search expressions."""
-    species = crud.species.search(
+    return await cached_search(
+        "species_search",
         db,
+        lambda: crud.species.search_async(
+            db,
+            expressions=expressions,
+            order_by=order_by,
+            limit=limit,
+            filters=[binomial_only()],
+            schema=schemas.SpeciesSummary,
+        ),
+        schemas.SpeciesSummary,
         expressions=expressions,
         order_by=order_by,
         limit=limit,
     )
-    return binomial_only(species)
 
 
-@router.get("/fuzzymatch/", response_model=List[schemas.SpeciesSummary])
-def read_fuzzy_species_by_search(
+@router.get("/fuzzymatch/", response_model=List[schemas.SpeciesFuzzyMatch])
+async def read_fuzzy_species_by_search(
     query_str: str,
     station: Optional[str] = Query(None),
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     min_string_similarity_score: float = 0.5,
     limit: int = 0,
     order_by: Optional[List[str]] = Query(None),
 ) -> Any:
-
-    expressions_dict: dict = {
-        "join": "OR",
-        "expressions": [
-            {
-                "column_name": "matched_canonical_full_name",
-                "search_term": query_str,
-                "operator": "eq",
-                "fuzzy": True,
-                "min_string_similarity": min_string_similarity_score,
-            },
-            {
-                "column_name": "current_name",
-                "search_term": query_str,
-                "operator": "eq",
-                "fuzzy": True,
-                "min_string_similarity": min_string_similarity_score,
-            },
-            {
-                "column_name": "name",
-                "search_term": query_str,
-                "operator": "eq",
-                "fuzzy": True,
-                "min_string_similarity": min_string_similarity_score,
-            },
-            {
-                "column_name": "scientific_name",
-                "search_term": query_str,
-                "operator": "eq",
-                "fuzzy": True,
-                "min_string_similarity": min_string_similarity_score,
-            },
-        ],
-    }
-
-    relations: List[Union[Type[Base], Table]] = [SpeciesCommonNames, SpeciesSynonyms]
-
-    if station:
-        expressions_dict = {
-            "join": "AND",
-            "expressions": [
-                expressions_dict,
-                {
-                    "column_name": "station_id",
-                    "search_term": station,
-                    "operator": "eq",
-                },
-            ],
-        }
-        relations.append(stations_species_table)
-
-    expressions = schemas.ExpressionGroup(**expressions_dict)
-
-    """Retrieves the species based on the given search expressions."""
-    species = crud.species.search(
+    """Retrieves the species with a name, common name or synonym similar to the query,
+    from the most similar, with the `score` of their most similar name, and which
+    one it is."""
+    fuzzy_index = get_fuzzy_index()
+    if fuzzy_index:
+        version = await dataset_version.get_async(db)
+        refresh_fuzzy_index_if_stale(version.number)
+        # Scoring is CPU bound, so it doesn't run in the event loop.
+        matches = await run_in_threadpool(
+            fuzzy_index.search,
+            query_str,
+            min_similarity=min_string_similarity_score,
+            # Filtering by station happens in the database, so the limit can only
+            # be applied to the matches without a station.
+            limit=0 if station else limit,
+        )
+        best = {match.species_id: match for match in matches}
+        # The index only has binomial species, see `FuzzyIndex.from_db`
+        species = await crud.species.get_multi_by_ids_async(
+            db,
+            list(best),
+            station=station,
+            order_by=order_by,
+            schema=schemas.SpeciesSummary,
+        )
+        # `order_by` only breaks the ties between the scores (the sort is stable).
+        species.sort(key=lambda sp: -best[sp.id].score)
+        if limit > 0:
+            species = species[:limit]
+        return json_response(
+            [MatchedRecord(sp, best[sp.id]) for sp in species],
+            schemas.SpeciesFuzzyMatch,
+        )
+
+    species = await crud.species.fuzzy_match_async(
         db,
-        expressions=expressions,
-        relations=relations,
+        query_str,
+        min_similarity=min_string_similarity_score,
+        station=station,
         order_by=order_by,
         limit=limit,
+        schema=schemas.SpeciesSummary,
     )
-    return binomial_only(species)
+    return json_response(species, schemas.SpeciesFuzzyMatch)
 
 
 @router.get(
     "/{species_id}",
     response_model=schemas.SpeciesDetails,
 )
-def read_species_by_id(
+async def read_species_by_id(
     species_id: str,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
 ) -> Any:
     """Get a specific species by id."""
-    species = crud.species.get(db, id=species_id)
+    species = await crud.species.get_async(
+        db, id=species_id, schema=schemas.SpeciesDetails
+    )
     if not species:
         raise HTTPException(status_code=404, detail=f"Species not found: ${species_id}")
     return species
+
+
+@router.get("/{species_id}/stations/", response_model=List[schemas.StationSummary])
+async def read_species_stations(
+    species_id: str,
+    db: AsyncSession = Depends(deps.get_async_db),
+    order_by: Optional[List[str]] = Query(None),
+) -> Any:
+    """Retrieve the stations where a species was recorded."""
+    stations = await crud.station.all_async(
+        db,
+        crud.station.by_species_query(
+            species_id, order_by=order_by, schema=schemas.StationSummary
+        ),
+    )
+    return json_response(stations, schemas.StationSummary)
@@ -1,64 +1,238 @@
-from typing import Any, List, Optional, Type, Union
+from typing import Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import Table
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
 
 from app import crud, schemas
 from app.api import deps
-from app.db.base_class import Base
 from app.models import stations_species_table
+from app.utils.cache import cache_key, cached_response, cached_search
+from app.utils.encoders import encode_json, json_response
+from app.utils.streaming import StreamFormat, streaming_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=schemas.StationSummaryPagination)
-def read_stations(
-    db: Session = Depends(deps.get_db),
+async def read_stations(
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
     order_by: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
 ) -> Any:
-    """Retrieve stations."""
-    stations = crud.station.get_multi(db, skip=skip, limit=limit, order_by=order_by)
+    """Retrieve stations.
+    Pass an empty `cursor` to paginate by cursor instead of `skip`."""
+    stations = await crud.station.get_multi_async(
+        db,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        cursor=cursor,
+        schema=schemas.StationSummary,
+    )
     return stations
 
 
 @router.get("/all/", response_model=List[schemas.StationSummary])
-def read_all_stations(
-    db: Session = Depends(deps.get_db),
+async def read_all_stations(
+    db: AsyncSession = Depends(deps.get_async_db),
     order_by: Optional[List[str]] = Query(None),
+    stream: Optional[StreamFormat] = None,
 ) -> Any:
-    """Retrieve all stations."""
-    stations = crud.station.get_all(db, order_by=order_by)
-    return stations
+    """Retrieve all stations.
+    Set `stream` to serialize the stations while they are fetched from the database."""
+    if stream:
+        return streaming_response(
+            crud.station.stream_all_async(
+                db, order_by=order_by, schema=schemas.StationSummary
+            ),
+            schemas.StationSummary,
+            stream,
+        )
+    stations = await crud.station.get_all_async(
+        db, order_by=order_by, schema=schemas.StationSummary
+    )
+    return json_response(stations, schemas.StationSummary)
 
 
 @router.post("/search/", response_model=List[schemas.StationSummary])
-def read_stations_by_search(
+async def read_stations_by_search(
     expressions: Union[schemas.Expression, schemas.ExpressionGroup],
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     limit: int = 0,
     order_by: Optional[List[str]] = Query(None),
 ) -> Any:
     """Retrieves the stations based on the given search expressions."""
-    relations: Optional[List[Union[Type[Base], Table]]] = (
-        [stations_species_table] if expressions.uses_column("species_id") else None
-    )
-    stations = crud.station.search(
+    return await cached_search(
+        "stations_search",
         db,
+        lambda: crud.station.search_async(
+            db,
+            expressions=expressions,
+            # Only semi-joined if the expressions use `species_id`
+            relations=[stations_species_table],
+            order_by=order_by,
+            limit=limit,
+            schema=schemas.StationSummary,
+        ),
+        schemas.StationSummary,
         expressions=expressions,
-        relations=relations,
         order_by=order_by,
         limit=limit,
     )
-    return stations
+
+
+@router.get("/bbox/", response_model=List[schemas.StationSummary])
+async def read_stations_in_bbox(
+    min_longitude: float = Query(..., ge=-180, le=180),
+    min_latitude: float = Query(..., ge=-90, le=90),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    db: AsyncSession = Depends(deps.get_async_db),
+    limit: int = 0,
+    order_by: Optional[List[str]] = Query(None),
+) -> Any:
+    """Retrieve the stations in a bounding box, in degrees.
+    A `min_longitude` greater than `max_longitude` crosses the antimeridian."""
+    if min_latitude > max_latitude:
+        raise HTTPException(
+            status_code=400, detail="min_latitude is greater than max_latitude"
+        )
+    stations = await crud.station.all_async(
+        db,
+        crud.station.bbox_query(
+            min_longitude,
+            min_latitude,
+            max_longitude,
+            max_latitude,
+            order_by=order_by,
+            limit=limit,
+            schema=schemas.StationSummary,
+        ),
+    )
+    return json_response(stations, schemas.StationSummary)
+
+
+@router.get("/nearest/", response_model=List[schemas.StationDistance])
+async def read_nearest_stations(
+    longitude: float = Query(..., ge=-180, le=180),
+    latitude: float = Query(..., ge=-90, le=90),
+    radius: Optional[float] = Query(None, gt=0),
+    db: AsyncSession = Depends(deps.get_async_db),
+    limit: int = 10,
+) -> Any:
+    """Retrieve the stations nearest to a point, from the nearest, with their
+    distance to it in meters.
+    Set `radius`, in meters, to only retrieve the stations within it, and `limit`
+    to 0 to retrieve all of them."""
+    stations = await crud.station.all_async(
+        db,
+        crud.station.nearest_query(
+            longitude,
+            latitude,
+            radius=radius,
+            limit=limit,
+            schema=schemas.StationSummary,
+        ),
+    )
+    return json_response(stations, schemas.StationDistance)
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}",
+    response_class=Response,
+    responses={200: {"content": {"application/vnd.mapbox-vector-tile": {}}}},
+)
+async def read_stations_tile(
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    species_id: Optional[List[str]] = Query(None),
+    fao_area: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """Get the Mapbox Vector Tile of the stations in a tile of a web map, with
+    their name, FAO area and location.
+    Set `species_id` or `fao_area`, which can be repeated, to only include the
+    stations with one of the species or in one of the areas."""
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=404, detail=f"Tile not found: {z}/{x}/{y}")
+    request = {"tile": [z, x, y], "species_id": species_id, "fao_area": fao_area}
+
+    async def render() -> bytes:
+        query = crud.station.tile_query(
+            z,
+            x,
+            y,
+            filter=crud.station.map_filter(species_ids=species_id, fao_areas=fao_area),
+        )
+        return (await db.execute(query)).scalar() or b""
+
+    return await cached_response(
+        "stations_tiles",
+        db,
+        lambda version: cache_key("stations_tiles", request, version=version),
+        render,
+        media_type="application/vnd.mapbox-vector-tile",
+    )
+
+
+@router.get("/clusters/", response_model=List[schemas.StationCluster])
+async def read_station_clusters(
+    zoom: int = Query(..., ge=0, le=22),
+    species_id: Optional[List[str]] = Query(None),
+    fao_area: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """Retrieve the stations clustered for a zoom level of a web map, in the cells
+    of a grid an eighth of a tile wide.
+    Set `species_id` or `fao_area`, which can be repeated, to only cluster the
+    stations with one of the species or in one of the areas."""
+    request = {"zoom": zoom, "species_id": species_id, "fao_area": fao_area}
+
+    async def render() -> bytes:
+        query = crud.station.clusters_query(
+            zoom,
+            filter=crud.station.map_filter(species_ids=species_id, fao_areas=fao_area),
+        )
+        return encode_json(
+            [
+                {
+                    "coordinates": [cluster.longitude, cluster.latitude],
+                    "count": cluster.count,
+                    "stations": cluster.stations,
+                }
+                for cluster in await db.execute(query)
+            ]
+        )
+
+    return await cached_response(
+        "stations_clusters",
+        db,
+        lambda version: cache_key("stations_clusters", request, version=version),
+        render,
+        media_type="application/json",
+    )
+
+
+@router.get("/fao_areas/", response_model=List[schemas.FAOAreaCount])
+async def read_fao_area_counts(db: AsyncSession = Depends(deps.get_async_db)) -> Any:
+    """Retrieve the number of stations, and of species recorded at them, in each
+    FAO area."""
+    result = await db.execute(crud.station.fao_area_counts_query())
+    return json_response(result, schemas.FAOAreaCount)
 
 
 @router.get("/{station_id}", response_model=schemas.StationDetails)
-def read_station_by_id(station_id: str, db: Session = Depends(deps.get_db)) -> Any:
+async def read_station_by_id(
+    station_id: str, db: AsyncSession = Depends(deps.get_async_db)
+) -> Any:
     """Get a specific station by id."""
-    station = crud.station.get(db, id=station_id)
+    station = await crud.station.get_async(
+        db, id=station_id, schema=schemas.StationDetails
+    )
     if not station:
         raise HTTPException(status_code=404, detail=f"Station not found: ${station_id}")
     return station
@@ -0,0 +1,109 @@
+"""Benchmark the memory used to serve the `/all/` endpoints, with and without
+streaming.
+
+Each case runs in its own process, so the peak resident memory (which includes the
+result set buffered by the database driver) is not shared between the cases.
+
+Usage (from the project root):
+    python -m app.benchmarks.all_endpoints_memory
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel
+
+from app import crud, schemas
+from app.crud.base import CRUDBase
+from app.db.session import SessionLocal
+from app.utils.encoders import json_response
+from app.utils.streaming import stream_json_array
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--endpoints",
+    nargs="+",
+    choices=["species", "stations", "data_source"],
+    default=["species", "stations", "data_source"],
+)
+
+ENDPOINTS: Dict[str, Tuple[CRUDBase, Type[BaseModel]]] = {
+    "species": (crud.species, schemas.SpeciesSummary),
+    "stations": (crud.station, schemas.StationSummary),
+    "data_source": (crud.data_source, schemas.DataSourceSummary),
+}
+
+
+def serve_full(crud_obj: CRUDBase, schema: Type[BaseModel]) -> int:
+    """What a request without `stream` does: load all the records, and render the
+    whole body."""
+    db = SessionLocal()
+    try:
+        rows = crud_obj.get_all(db, schema=schema)
+        body = json_response(rows, schema).body
+        return len(body)
+    finally:
+        db.close()
+
+
+def serve_streaming(crud_obj: CRUDBase, schema: Type[BaseModel]) -> int:
+    """What a request with `stream=json` does, without sending the chunks."""
+    db = SessionLocal()
+    try:
+        return sum(
+            len(chunk)
+            for chunk in stream_json_array(
+                crud_obj.stream_all(db, schema=schema), schema
+            )
+        )
+    finally:
+        db.close()
+
+
+MODES: Dict[str, Callable[[CRUDBase, Type[BaseModel]], int]] = {
+    "full": serve_full,
+    "stream": serve_streaming,
+}
+
+
+def measure(endpoint: str, mode: str, results: multiprocessing.Queue) -> None:
+    crud_obj, schema = ENDPOINTS[endpoint]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = MODES[mode](crud_obj, schema)
+    duration = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    # ru_maxrss is in KiB on Linux
+    results.put((size, duration, python_peak, rss_growth * 1024))
+
+
+def main() -> None:
+    args = parser.parse_args()
+    context = multiprocessing.get_context("spawn")
+
+    rows: List[str] = []
+    for endpoint in args.endpoints:
+        for mode in MODES:
+            results: multiprocessing.Queue = context.Queue()
+            process = context.Process(target=measure, args=(endpoint, mode, results))
+            process.start()
+            size, duration, python_peak, rss_growth = results.get()
+            process.join()
+            rows.append(
+                f"/{endpoint}/all/ {mode:<7} body {size / 2**20:8.2f} MiB"
+                f"  python peak {python_peak / 2**20:8.2f} MiB"
+                f"  peak RSS growth {rss_growth / 2**20:8.2f} MiB"
+                f"  {duration:7.2f} s"
+            )
+
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark the ranking of `/species/fuzzymatch/` in the database: the search
+expressions the endpoint used to run, a four-way `OR` of `word_similarity` over the
+names, common names and synonyms, ordered by the four similarities, or
+`CRUDSpecies.fuzzy_match`, which scores the best name of each species once.
+
+Usage (from the project root):
+    python -m app.benchmarks.fuzzy_ranking [--queries 50] [--limit 20]
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.benchmarks.fuzzy_search import get_search_terms, report
+from app.db.session import SessionLocal
+from app.models import SpeciesCommonNames, SpeciesSynonyms
+from app.utils.species import binomial_only
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--queries", type=int, default=50)
+parser.add_argument("--threshold", type=float, default=0.5)
+parser.add_argument("--limit", type=int, default=20)
+
+
+def search_expressions(db: Session, term: str, threshold: float, limit: int) -> List:
+    expressions = schemas.ExpressionGroup(
+        join="OR",
+        expressions=[
+            {
+                "column_name": column_name,
+                "search_term": term,
+                "operator": "eq",
+                "fuzzy": True,
+                "min_string_similarity": threshold,
+            }
+            for column_name in [
+                "matched_canonical_full_name",
+                "current_name",
+                "name",
+                "scientific_name",
+            ]
+        ],
+    )
+    return crud.species.search(
+        db,
+        expressions,
+        relations=[SpeciesCommonNames, SpeciesSynonyms],
+        limit=limit,
+        filters=[binomial_only()],
+        schema=schemas.SpeciesSummary,
+    )
+
+
+def best_score(db: Session, term: str, threshold: float, limit: int) -> List:
+    return crud.species.fuzzy_match(
+        db,
+        term,
+        min_similarity=threshold,
+        limit=limit,
+        schema=schemas.SpeciesSummary,
+    )
+
+
+MODES: Dict[str, Callable[[Session, str, float, int], List[Any]]] = {
+    "search expressions": search_expressions,
+    "best score": best_score,
+}
+
+
+def main() -> None:
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        terms = get_search_terms(db.connection(), args.queries)
+
+        # Without a limit, both find the same species
+        for term in terms:
+            found = [
+                {sp.id for sp in search(db, term, args.threshold, 0)}
+                for search in MODES.values()
+            ]
+            assert found[0] == found[1], f"Different species found for {term!r}"
+
+        for mode, search in MODES.items():
+            durations = []
+            for term in terms:
+                start = time.perf_counter()
+                search(db, term, args.threshold, args.limit)
+                durations.append((time.perf_counter() - start) * 1000)
+            report(mode, durations)
+
+
+if __name__ == "__main__":
+    main()
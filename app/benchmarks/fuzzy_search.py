@@ -0,0 +1,224 @@
+"""Benchmark the fuzzy species search with and without the trigram indexes.
+
+The species, with their common names and synonyms, are copied into a `benchmark`
+schema and scaled up to the given number of species, then the same search terms
+are run with the expressions of `/species/fuzzymatch/`, i.e. a fuzzy match of the
+canonical name, the current name, a common name or a synonym, with the sequential
+`word_similarity(term, name) >= threshold` filters (before) and with the
+index-supported `term <% name` filters on GIN trigram indexes (after).
+
+Usage (from the project root):
+    python -m app.benchmarks.fuzzy_search --rows 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.elements import TextClause
+
+from app.db.session import engine
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=1_000_000)
+parser.add_argument("--queries", type=int, default=50)
+parser.add_argument("--threshold", type=float, default=0.5)
+parser.add_argument("--limit", type=int, default=20)
+parser.add_argument("--keep", action="store_true", help="Keep the scaled tables")
+
+# The tables and columns of the names matched by `/species/fuzzymatch/`
+NAME_COLUMNS = [
+    ("species", "matched_canonical_full_name"),
+    ("species", "current_name"),
+    ("species_common_names", "name"),
+    ("species_synonyms", "scientific_name"),
+]
+
+
+def search_query(indexed: bool) -> TextClause:
+    """Create the query of the search expressions of `/species/fuzzymatch/`, as
+    `CRUDBase.search` creates it: the names of the relations are matched with
+    `EXISTS`, and the species are ordered by the similarity of each of the names."""
+    conditions = []
+    similarities = []
+    for table, column in NAME_COLUMNS:
+        name = f"{table}.{column}"
+        condition = f"word_similarity(:term, {name}) >= :threshold"
+        if indexed:
+            condition = f":term <% {name} AND {condition}"
+        similarity = f"word_similarity(:term, {name})"
+        if table != "species":
+            related = f"FROM benchmark.{table} WHERE {table}.species_id = species.id"
+            condition = f"EXISTS (SELECT 1 {related} AND {condition})"
+            similarity = f"coalesce((SELECT max({similarity}) {related}), 0)"
+        conditions.append(f"({condition})")
+        similarities.append(f"{similarity} DESC")
+
+    return text(
+        f"""
+        SELECT species.id
+        FROM benchmark.species
+        WHERE {" OR ".join(conditions)}
+        ORDER BY {", ".join(similarities)}
+        LIMIT :limit
+        """
+    )
+
+
+def create_scaled_tables(connection: Connection, rows: int) -> None:
+    """Copy the species into `benchmark.species`, repeated until the table has the
+    given number of rows, with the common names and synonyms of each copy. A random
+    suffix keeps the names of the copies distinct."""
+    connection.execute(text("CREATE SCHEMA IF NOT EXISTS benchmark"))
+    connection.execute(text("DROP TABLE IF EXISTS benchmark.species CASCADE"))
+    connection.execute(
+        text(
+            """
+            CREATE TABLE benchmark.species AS
+            SELECT
+                copies.id,
+                copies.source_id,
+                copies.suffix,
+                copies.matched_canonical_full_name || copies.suffix
+                    AS matched_canonical_full_name,
+                copies.current_name || copies.suffix AS current_name
+            FROM (
+                SELECT
+                    n::text AS id,
+                    names.id AS source_id,
+                    CASE WHEN n > names.total THEN ' ' || substr(md5(n::text), 1, 6)
+                        ELSE '' END AS suffix,
+                    names.matched_canonical_full_name,
+                    names.current_name
+                FROM generate_series(1, :rows) AS n
+                JOIN (
+                    SELECT
+                        row_number() OVER () AS idx,
+                        count(*) OVER () AS total,
+                        id,
+                        matched_canonical_full_name,
+                        current_name
+                    FROM species
+                    WHERE matched_canonical_full_name IS NOT NULL
+                ) AS names ON names.idx = (n - 1) % names.total + 1
+            ) AS copies
+            """
+        ),
+        {"rows": rows},
+    )
+    connection.execute(text("DROP TABLE IF EXISTS benchmark.species_common_names"))
+    connection.execute(
+        text(
+            """
+            CREATE TABLE benchmark.species_common_names AS
+            SELECT species.id AS species_id, names.name || species.suffix AS name
+            FROM benchmark.species
+            JOIN species_common_names AS names ON names.species_id = species.source_id
+            """
+        )
+    )
+    connection.execute(text("DROP TABLE IF EXISTS benchmark.species_synonyms"))
+    connection.execute(
+        text(
+            """
+            CREATE TABLE benchmark.species_synonyms AS
+            SELECT
+                species.id AS species_id,
+                names.scientific_name || species.suffix AS scientific_name
+            FROM benchmark.species
+            JOIN species_synonyms AS names ON names.species_id = species.source_id
+            """
+        )
+    )
+    # The keys the relations are matched on, as in the database
+    connection.execute(text("CREATE UNIQUE INDEX ON benchmark.species (id)"))
+    for table in ("species_common_names", "species_synonyms"):
+        connection.execute(text(f"CREATE INDEX ON benchmark.{table} (species_id)"))
+        connection.execute(text(f"ANALYZE benchmark.{table}"))
+    connection.execute(text("ANALYZE benchmark.species"))
+
+
+def get_search_terms(connection: Connection, count: int) -> List[str]:
+    """Take random names and cut them at a random length to mimic the terms sent
+    while a user types."""
+    names = connection.execute(
+        text(
+            "SELECT matched_canonical_full_name FROM species "
+            "WHERE matched_canonical_full_name IS NOT NULL "
+            "ORDER BY random() LIMIT :count"
+        ),
+        {"count": count},
+    ).scalars()
+    return [name[: random.randint(min(4, len(name)), len(name))] for name in names]
+
+
+def run_queries(
+    connection: Connection,
+    query: TextClause,
+    terms: List[str],
+    threshold: float,
+    limit: int,
+) -> List[float]:
+    durations = []
+    for term in terms:
+        start = time.perf_counter()
+        connection.execute(
+            query, {"term": term, "threshold": threshold, "limit": limit}
+        ).all()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(name: str, durations: List[float]) -> None:
+    durations = sorted(durations)
+    p95 = durations[max(0, int(len(durations) * 0.95) - 1)]
+    print(
+        f"{name:<32} median {statistics.median(durations):9.2f} ms"
+        f"  p95 {p95:9.2f} ms  max {durations[-1]:9.2f} ms"
+    )
+
+
+def main() -> None:
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        print(f"Creating the benchmark tables with {args.rows} species")
+        create_scaled_tables(connection, args.rows)
+        terms = get_search_terms(connection, args.queries)
+
+        report(
+            "before: word_similarity >=",
+            run_queries(
+                connection, search_query(False), terms, args.threshold, args.limit
+            ),
+        )
+
+        print("Creating the GIN trigram indexes")
+        for table, column in NAME_COLUMNS:
+            connection.execute(
+                text(
+                    f"CREATE INDEX ON benchmark.{table} "
+                    f"USING gin ({column} gin_trgm_ops)"
+                )
+            )
+            connection.execute(text(f"ANALYZE benchmark.{table}"))
+        connection.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, false)"),
+            {"t": str(args.threshold)},
+        )
+        report(
+            "after: <% with trigram indexes",
+            run_queries(
+                connection, search_query(True), terms, args.threshold, args.limit
+            ),
+        )
+
+        if not args.keep:
+            connection.execute(text("DROP SCHEMA benchmark CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the memory used to read the files of the data import, loading them
+whole with `json.load` (as the importer used to) or parsing them incrementally.
+
+Each case runs in its own process, so the peak resident memory is not shared
+between the cases. The records are only read, not written to the database.
+
+Usage (from the project root):
+    python -m app.benchmarks.import_memory [--testing]
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from app.db.data_files import DataFiles, read_species, read_stations
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--testing", action="store_true", help="Read the test data")
+
+
+def read_full(files: DataFiles) -> int:
+    """Load the files whole, and count their records."""
+    with open(files.species, "r") as f:
+        species = json.load(f)["species"]
+    with open(files.species_extra, "r") as f:
+        species_extra = json.load(f)["species"]
+    with open(files.stations, "r") as f:
+        stations = json.load(f)
+    return len(species) + len(species_extra) + len(stations)
+
+
+def read_streaming(files: DataFiles) -> int:
+    """Parse the files one record at a time, and count their records."""
+    return (
+        sum(1 for _ in read_species(files.species))
+        + sum(1 for _ in read_species(files.species_extra))
+        + sum(1 for _ in read_stations(files.stations))
+    )
+
+
+MODES: Dict[str, Callable[[DataFiles], int]] = {
+    "json.load": read_full,
+    "stream": read_streaming,
+}
+
+
+def measure(mode: str, test_mode: bool, results: multiprocessing.Queue) -> None:
+    files = DataFiles.for_mode(test_mode)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = MODES[mode](files)
+    duration = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    # ru_maxrss is in KiB on Linux
+    results.put((records, duration, python_peak, rss_growth * 1024))
+
+
+def main() -> None:
+    args = parser.parse_args()
+    context = multiprocessing.get_context("spawn")
+
+    for mode in MODES:
+        results: multiprocessing.Queue = context.Queue()
+        process = context.Process(target=measure, args=(mode, args.testing, results))
+        process.start()
+        records, duration, python_peak, rss_growth = results.get()
+        process.join()
+        print(
+            f"{mode:<9} {records} records"
+            f"  python peak {python_peak / 2**20:8.2f} MiB"
+            f"  peak RSS growth {rss_growth / 2**20:8.2f} MiB"
+            f"  {duration:7.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
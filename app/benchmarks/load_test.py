@@ -0,0 +1,118 @@
+"""Load test the read-only endpoints of running API servers.
+
+Each client sends requests one after another, going through the paths in turn, for
+the given duration. To compare the sync endpoints with the async ones, run a server
+from a release before the async endpoints next to one from this release, and pass
+both URLs, e.g.:
+
+    python -m app.benchmarks.load_test \
+        --base-url http://localhost:8000 --base-url http://localhost:8001
+
+The clients run in one process, so with many clients the load test itself can be
+the bottleneck. Keep an eye on its CPU usage, or run it from several machines.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, NamedTuple, Tuple
+
+import httpx
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+DEFAULT_PATHS = [
+    f"{settings.API_V1_STR}/species/?limit=100",
+    f"{settings.API_V1_STR}/species/fuzzymatch/?query_str=Hyalonema",
+    f"{settings.API_V1_STR}/stations/?limit=100",
+    f"{settings.API_V1_STR}/stations/1",
+    f"{settings.API_V1_STR}/data_source/?limit=100",
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--base-url", action="append", dest="base_urls")
+parser.add_argument("--path", action="append", dest="paths")
+parser.add_argument("--clients", type=int, default=500)
+parser.add_argument("--duration", type=float, default=30, help="In seconds")
+parser.add_argument("--timeout", type=float, default=30, help="In seconds")
+
+
+class Result(NamedTuple):
+    latencies: List[float]
+    errors: int
+    duration: float
+
+
+async def run_client(
+    client: httpx.AsyncClient, paths: List[str], deadline: float, offset: int
+) -> Tuple[List[float], int]:
+    latencies: List[float] = []
+    errors = 0
+    idx = offset
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(paths[idx % len(paths)])
+            await response.aread()
+            if response.status_code >= 400:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        idx += 1
+    return latencies, errors
+
+
+async def load_test(
+    base_url: str, paths: List[str], clients: int, duration: float, timeout: float
+) -> Result:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                run_client(client, paths, start + duration, offset)
+                for offset in range(clients)
+            )
+        )
+        return Result(
+            latencies=[latency for latencies, _ in results for latency in latencies],
+            errors=sum(errors for _, errors in results),
+            duration=time.perf_counter() - start,
+        )
+
+
+def report(base_url: str, result: Result) -> str:
+    latencies = sorted(result.latencies)
+    if not latencies:
+        return f"{base_url:<32} no requests completed"
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return (
+        f"{base_url:<32} {len(latencies) / result.duration:9.1f} req/s"
+        f"  median {statistics.median(latencies):8.1f} ms  p99 {p99:8.1f} ms"
+        f"  max {latencies[-1]:8.1f} ms  errors {result.errors}"
+    )
+
+
+def main() -> None:
+    args = parser.parse_args()
+    base_urls = args.base_urls or [str(settings.SERVER_HOST)]
+    paths = args.paths or DEFAULT_PATHS
+
+    rows = []
+    for base_url in base_urls:
+        print(f"{args.clients} clients for {args.duration}s against {base_url}")
+        result = asyncio.run(
+            load_test(base_url, paths, args.clients, args.duration, args.timeout)
+        )
+        rows.append(report(base_url, result))
+
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark the serialization of the `/all/` responses, validating the records with
+the response model as FastAPI does, or encoding them with `app.utils.encoders`.
+
+The records are generated, so the database is not needed.
+
+Usage (from the project root):
+    python -m app.benchmarks.serialization [--rows 100000]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, parse_obj_as
+from starlette.responses import JSONResponse
+
+from app import schemas
+from app.utils.encoders import json_response
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=100_000, help="Records per response")
+
+
+def species_rows(count: int) -> List[Any]:
+    return [
+        SimpleNamespace(
+            id=f"{idx:08x}-2f2d-5387-8374-bd04ff82ea58",
+            record_id=f"urn:lsid:marinespecies.org:taxname:{idx}",
+            matched_canonical_full_name=f"Genus species{idx}",
+            current_name=f"Genus species{idx}",
+            station_count=idx % 20,
+        )
+        for idx in range(count)
+    ]
+
+
+def station_rows(count: int) -> List[Any]:
+    return [
+        SimpleNamespace(
+            name=str(idx),
+            date=date(1873, 1, 1) + timedelta(days=idx % 1000),
+            coordinates=[-180 + idx % 360 + 0.25, -60 + idx % 120 + 0.5],
+            fao_area=34,
+            location="Off Cape Verde",
+            gear=None,
+            sediment_sample="Globigerina ooze",
+            species_count=idx % 100,
+        )
+        for idx in range(count)
+    ]
+
+
+def serialize_validated(rows: List[Any], schema: Type[BaseModel]) -> bytes:
+    """What FastAPI does with a `List[schema]` response model."""
+    return JSONResponse(jsonable_encoder(parse_obj_as(List[schema], rows))).body  # type: ignore
+
+
+def serialize_encoded(rows: List[Any], schema: Type[BaseModel]) -> bytes:
+    return json_response(rows, schema).body
+
+
+MODES: Dict[str, Callable[[List[Any], Type[BaseModel]], bytes]] = {
+    "response_model": serialize_validated,
+    "row_encoder": serialize_encoded,
+}
+
+
+def main() -> None:
+    args = parser.parse_args()
+    cases: List[Tuple[str, Type[BaseModel], List[Any]]] = [
+        ("species", schemas.SpeciesSummary, species_rows(args.rows)),
+        ("stations", schemas.StationSummary, station_rows(args.rows)),
+    ]
+    for name, schema, rows in cases:
+        bodies = set()
+        for mode, serialize in MODES.items():
+            start = time.perf_counter()
+            bodies.add(serialize(rows, schema))
+            duration = time.perf_counter() - start
+            print(
+                f"{name:<9} {mode:<15} {len(rows)} rows"
+                f"  {duration:6.2f} s  {len(rows) / duration:10.0f} rows/s"
+            )
+        assert len(bodies) == 1, "The responses are not the same"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark reading the coordinates of all the stations, as GeoJSON parsed in Python
+(as the stations used to be read) or as `ST_X` and `ST_Y` floats.
+
+Usage (from the project root):
+    python -m app.benchmarks.station_coordinates [--repeat 50]
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.db.session import engine
+from app.models import Station
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repeat", type=int, default=50)
+
+coordinates = Station.__table__.c.coordinates
+
+
+def read_geojson(connection: Connection) -> List[List[float]]:
+    result = connection.execute(select(func.ST_AsGeoJSON(coordinates)))
+    return [json.loads(point)["coordinates"] for point in result.scalars()]
+
+
+def read_floats(connection: Connection) -> List[List[float]]:
+    # The column expression of `app.utils.db.Point`
+    return list(connection.execute(select(coordinates)).scalars())
+
+
+MODES: Dict[str, Callable[[Connection], List[List[float]]]] = {
+    "ST_AsGeoJSON": read_geojson,
+    "ST_X/ST_Y": read_floats,
+}
+
+
+def main() -> None:
+    args = parser.parse_args()
+    with engine.connect() as connection:
+        points = {mode: read(connection) for mode, read in MODES.items()}
+        assert points["ST_AsGeoJSON"] == points["ST_X/ST_Y"]
+
+        for mode, read in MODES.items():
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                read(connection)
+                durations.append(time.perf_counter() - start)
+            median = statistics.median(durations)
+            print(
+                f"{mode:<13} {len(points[mode])} stations"
+                f"  median {median * 1000:7.2f} ms"
+                f"  {len(points[mode]) / median:10.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -78,6 +78,79 @@ class Settings(BaseSettings):
             path=f"/{db_name}",
         )
 
+    # The same database, through asyncpg, for the `async def` endpoints
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[PostgresDsn] = None
+
+    @validator("SQLALCHEMY_ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(
+        cls, v: Optional[str], values: Dict[str, Any]
+    ) -> Any:
+        db_name = values.get(
+            "POSTGRES_TEST_DB" if os.environ.get("PYTHON_TEST") else "POSTGRES_DB", ""
+        )
+        return PostgresDsn.build(
+            scheme="postgresql+asyncpg",
+            user=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            host=values.get("POSTGRES_SERVER"),
+            path=f"/{db_name}",
+        )
+
+    # Connection pool of each of the sync and async engines, per worker process.
+    # With the gunicorn workers of `docker/Dockerfile`, up to
+    # 2 * WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections can be open.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Replace the connections that are older than this, in seconds. -1 to disable.
+    DB_POOL_RECYCLE: int = 1800
+    # Wait at most this long for a connection from the pool, in seconds.
+    DB_POOL_TIMEOUT: float = 30
+    # Cancel statements that run longer than this, in milliseconds. 0 to disable.
+    # It also applies to `app/db/init_data.py`.
+    DB_STATEMENT_TIMEOUT: int = 0
+    # Connect through PgBouncer in transaction pooling mode: connections are not
+    # pooled in the workers, statements are not prepared, and the statement timeout
+    # is set for each transaction instead of each connection.
+    DB_PGBOUNCER: bool = False
+
+    # Export the metrics of the worker that serves the request at `/metrics`
+    METRICS_ENABLED: bool = False
+
+    # Totals of the paginated list endpoints are cached for this many seconds.
+    # Writes through the API invalidate them immediately.
+    COUNT_CACHE_TTL_SECONDS: int = 300
+    # Use the planner's row estimate instead of an exact count for tables
+    # larger than this. Set to 0 to always count exactly.
+    COUNT_ESTIMATE_THRESHOLD: int = 1_000_000
+
+    # Workers check for a new version of the dataset, e.g. after an import,
+    # at most this often. The caches of the dataset are keyed on the version.
+    DATASET_VERSION_TTL_SECONDS: float = 5
+    # How long clients and CDNs can reuse the responses of the species, stations and
+    # data source endpoints without revalidating them.
+    HTTP_CACHE_MAX_AGE: int = 60
+    # Identifies the deployed build, e.g. the git commit, in the ETags of those
+    # responses, so the clients revalidate them after a deploy. Defaults to a hash of
+    # the version and the source of the API.
+    BUILD_ID: Optional[str] = None
+
+    # Cache the responses of the search endpoints for this many seconds. They are
+    # keyed on the dataset version, so imports invalidate them.
+    RESPONSE_CACHE_TTL_SECONDS: float = 300
+    # Size of the in-process cache of each worker.
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Share the cache between the workers in Redis (or a server speaking its
+    # protocol) instead, e.g. redis://:password@localhost:6379/0
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None
+
+    # Compiled queries of the search endpoints kept per model, one per shape of the
+    # search expressions, whatever their search terms. Set to 0 to disable.
+    SEARCH_PLAN_CACHE_SIZE: int = 256
+
+    # Score `/species/fuzzymatch/` requests with an in-memory trigram index that is
+    # built at startup, instead of in the database.
+    FUZZY_INDEX_ENABLED: bool = False
+
     ENABLE_AUTH: bool = False
 
     SMTP_TLS: bool = True
@@ -1,9 +1,13 @@
 from typing import (
     Any,
+    AsyncIterator,
+    Callable,
     Dict,
     Generic,
+    Iterator,
     List,
     Optional,
+    Tuple,
     Type,
     TypedDict,
     TypeVar,
@@ -14,14 +18,41 @@ from typing import (
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import Column, Table, and_, asc, desc, func, or_
+from sqlalchemy import (
+    String,
+    Table,
+    and_,
+    asc,
+    bindparam,
+    desc,
+    false,
+    func,
+    inspect,
+    or_,
+    select,
+)
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Query, Session
-from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import BinaryExpression, ClauseElement
 from sqlalchemy.sql.functions import _FunctionGenerator
 
 from app.core.config import get_settings
 from app.db.base_class import Base
 from app.schemas import Expression, ExpressionGroup, Join
+from app.utils.count import count_cache
+from app.utils.dataset_version import dataset_version
+from app.utils.loading import Strategy, loader_options, projected_columns
+from app.utils.pagination import Cursor, decode_cursor, encode_cursor
+from app.utils.relations import Relation, correlation_clause, exists_in
+from app.utils.search_plan import (
+    SearchPlan,
+    SearchPlanCache,
+    clauses_key,
+    expression_shape,
+    search_terms,
+)
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -31,6 +62,9 @@ PaginationSchemaType = TypeVar("PaginationSchemaType", bound=BaseModel)
 settings = get_settings()
 
 page_URI = f"{settings.SERVER_HOST}{settings.API_V1_STR}" + "/{}/?skip={}&limit={}"
+cursor_page_URI = (
+    f"{settings.SERVER_HOST}{settings.API_V1_STR}" + "/{}/?cursor={}&limit={}"
+)
 
 API_Model_mapping = {
     "DataSource": "data_source",
@@ -40,9 +74,24 @@ API_Model_mapping = {
 }
 
 
+class OrderByColumn(TypedDict):
+    name: str
+    column: Any
+    descending: bool
+
+
+class Keyset(TypedDict):
+    cursor: Cursor
+    columns: List[OrderByColumn]
+
+
 class SearchExpressions(TypedDict):
     clauses: List[BinaryExpression]
     fuzzy_funcs: List[_FunctionGenerator]
+    fuzzy_thresholds: List[float]
+    columns: List[Any]
+    joins: List[Relation]
+    semi_join: Optional[Relation]
 
 
 class CRUDBase(
@@ -50,6 +99,13 @@ class CRUDBase(
 ):
     """CRUD object with default methods to Create, Read, Update, Delete (CRUD)."""
 
+    # Whether the records are part of the dataset, see `app.utils.dataset_version`
+    versioned = True
+    # How to load the relationships serialized by the response models, and which of
+    # their records, by the dotted path of the relationships. See `loader_options`.
+    loader_strategies: Dict[str, Strategy] = {}
+    relationship_filters: Dict[str, Callable[[], ClauseElement]] = {}
+
     def __init__(self, model: Type[ModelType]):
         """
 
@@ -59,9 +115,14 @@ class CRUDBase(
                 A SQLAlchemy model class
         """
         self.model = model
+        self.search_plans = SearchPlanCache(
+            model.__name__, maxsize=settings.SEARCH_PLAN_CACHE_SIZE
+        )
 
-    def order_by(self, query: Query, *, order_by: Optional[List[str]] = None) -> Query:
-        """Order the query by the given list of columns.
+    def order_by_columns(
+        self, query: Query, *, order_by: Optional[List[str]] = None
+    ) -> List[OrderByColumn]:
+        """Resolve the given list of column names to the columns of the query entities.
 
         Parameters
         ----------
@@ -72,18 +133,18 @@ class CRUDBase(
 
         Returns
         -------
-        Query
-            The ordered query.
+        List[OrderByColumn]
+            The resolved columns, in the given order. Unknown column names are skipped.
         """
-        order_by_args = []
+        order_by_columns: List[OrderByColumn] = []
         if order_by:
             for column in order_by:
                 if column.startswith("-"):
                     column_name = column[1:]
-                    order_func = desc
+                    descending = True
                 else:
                     column_name = column
-                    order_func = asc
+                    descending = False
 
                 for entity in query.column_descriptions:
                     if hasattr(entity["type"], column_name):
@@ -91,37 +152,168 @@ class CRUDBase(
                         #       have columns with the same name.
                         #       The query probably fails or won't work, which means we
                         #       we have to construct column names differently.
-                        order_by_args.append(
-                            order_func(getattr(entity["type"], column_name))
+                        order_by_columns.append(
+                            OrderByColumn(
+                                name=column_name,
+                                column=getattr(entity["type"], column_name),
+                                descending=descending,
+                            )
                         )
                         break
 
-        return query.order_by(*order_by_args)
+        return order_by_columns
+
+    def order_by(self, query: Query, *, order_by: Optional[List[str]] = None) -> Query:
+        """Order the query by the given list of columns.
+
+        Parameters
+        ----------
+        query : Query
+        order_by : Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+
+        Returns
+        -------
+        Query
+            The ordered query.
+        """
+        return query.order_by(
+            *(
+                desc(column["column"])
+                if column["descending"]
+                else asc(column["column"])
+                for column in self.order_by_columns(query, order_by=order_by)
+            )
+        )
+
+    def keyset_columns(
+        self, query: Query, *, order_by: Optional[List[str]] = None
+    ) -> List[OrderByColumn]:
+        """Return the columns that uniquely identify the position of a record in the
+        given order, i.e. the `order_by` columns followed by the primary key columns.
+
+        Parameters
+        ----------
+        query : Query
+        order_by : Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+
+        Returns
+        -------
+        List[OrderByColumn]
+        """
+        columns = self.order_by_columns(query, order_by=order_by)
+        column_names = {column["name"] for column in columns}
+        mapper = inspect(self.model)
+        for primary_key in mapper.primary_key:
+            name = mapper.get_property_by_column(primary_key).key
+            if name not in column_names:
+                columns.append(
+                    OrderByColumn(
+                        name=name, column=getattr(self.model, name), descending=False
+                    )
+                )
+        return columns
+
+    @staticmethod
+    def keyset_clause(columns: List[OrderByColumn], values: List[Any]) -> ClauseElement:
+        """Create a clause that matches the records coming after the given values
+        of the keyset columns in the order of the columns.
+
+        PostgreSQL sorts NULLs last in ascending and first in descending order, which
+        is taken into account for the nullable columns.
+
+        Parameters
+        ----------
+        columns : List[OrderByColumn]
+            The keyset columns, see `keyset_columns`.
+        values : List[Any]
+            The values of the keyset columns for the boundary record.
+
+        Returns
+        -------
+        ClauseElement
+        """
+        if len(columns) != len(values):
+            raise ValueError("Cursor does not match the order of the results")
+
+        clauses = []
+        for idx, (column, value) in enumerate(zip(columns, values)):
+            attribute = column["column"]
+            nullable = getattr(attribute.expression, "nullable", True)
+            if column["descending"]:
+                after = attribute.isnot(None) if value is None else attribute < value
+            elif value is None:
+                after = false()
+            else:
+                after = (
+                    or_(attribute > value, attribute.is_(None))
+                    if nullable
+                    else attribute > value
+                )
+            equals = [
+                previous["column"].is_(None)
+                if previous_value is None
+                else previous["column"] == previous_value
+                for previous, previous_value in zip(columns[:idx], values[:idx])
+            ]
+            clauses.append(and_(*equals, after))
+        return or_(*clauses)
 
     def create_search_expressions(
         self,
         expressions: Union[Expression, ExpressionGroup],
         *,
-        relations: Optional[List[Union[Type[Base], Table]]] = None,
+        relations: Optional[List[Relation]] = None,
+        columns: Optional[List[Any]] = None,
     ) -> SearchExpressions:
         """Create SQLAlchemy search expressions from the given Expression or
         ExpressionGroup.
-        Return a Dict with two keys: `clauses` and `fuzzy_funcs`. The former
-        can be passed to a query.filter() call, while the latter can be used to order
-        the query by the fuzzy_funcs.
+        Return a Dict with six keys: `clauses`, `fuzzy_funcs`, `fuzzy_thresholds`,
+        `columns`, `joins` and `semi_join`. The first can be passed to a
+        query.filter() call, the second can be used to order the query by the
+        fuzzy_funcs, the third holds the minimum similarity of the fuzzy
+        expressions, see `set_word_similarity_threshold`, the fourth the column of
+        each expression, and the fifth the relations the query must join.
+
+        The expressions on the columns of a one-to-many relation, i.e. one with a
+        foreign key to the model, are tested in `EXISTS` subqueries of the relation
+        instead of joining it, see `app.utils.relations`. The expressions of a group
+        on the same relation are tested in the same subquery, so e.g. the name and
+        the language of a common name must match the same common name. The other
+        relations are only joined if the expressions use their columns.
+
+        The search terms, and the minimum similarities, are bound parameters named
+        after the index of their expression in `search_terms`, e.g. `term_0` and
+        `similarity_0`, so the clauses can be run again with other terms, see
+        `search_parameters`.
 
         Parameters
         ----------
         expressions : Union[Expression, ExpressionGroup]
             The search expressions. See the `search` method for an example.
-        relations : Optional[List[Union[Type[Base], Table]]]
+        relations : Optional[List[Relation]]
             The relations to use for discovering columns.
+        columns : Optional[List[Any]]
+            The columns of the expressions already created, when creating the
+            expressions of a group. The clauses of such expressions are left for
+            the group to semi-join: `semi_join` is the relation all their columns
+            are from, if any.
 
         Returns
         -------
         SearchExpressions
         """
-        search_expressions = SearchExpressions(clauses=[], fuzzy_funcs=[])
+        search_expressions = SearchExpressions(
+            clauses=[],
+            fuzzy_funcs=[],
+            fuzzy_thresholds=[],
+            columns=[] if columns is None else columns,
+            joins=[],
+            semi_join=None,
+        )
 
         if isinstance(expressions, ExpressionGroup):
             if expressions.join == Join.AND:
@@ -131,75 +323,412 @@ class CRUDBase(
             else:
                 raise ValueError(f"Invalid join type: {expressions.join}")
 
-            sub_clauses: List[BinaryExpression] = []
-            for expression in expressions.expressions:
-                sub_search_expressions = self.create_search_expressions(
-                    expression, relations=relations
-                )
-                sub_clauses.append(
-                    cast(BinaryExpression, and_(*sub_search_expressions["clauses"]))
+            sub_expressions = [
+                self.create_search_expressions(
+                    expression,
+                    relations=relations,
+                    columns=search_expressions["columns"],
                 )
+                for expression in expressions.expressions
+            ]
+            for sub_search_expressions in sub_expressions:
                 search_expressions["fuzzy_funcs"].extend(
                     sub_search_expressions["fuzzy_funcs"]
                 )
+                search_expressions["fuzzy_thresholds"].extend(
+                    sub_search_expressions["fuzzy_thresholds"]
+                )
+                search_expressions["joins"].extend(sub_search_expressions["joins"])
+
+            semi_joins = {sub["semi_join"] for sub in sub_expressions}
+            sub_clauses: List[ClauseElement] = []
+            if len(semi_joins) == 1:
+                # All the expressions are on the same relation, or on the model
+                search_expressions["semi_join"] = semi_joins.pop()
+                sub_clauses = [and_(*sub["clauses"]) for sub in sub_expressions]
+            else:
+                relation_clauses: Dict[Relation, List[ClauseElement]] = {}
+                for sub in sub_expressions:
+                    if sub["semi_join"] is None:
+                        sub_clauses.append(and_(*sub["clauses"]))
+                    else:
+                        relation_clauses.setdefault(sub["semi_join"], []).append(
+                            and_(*sub["clauses"])
+                        )
+                for related, clauses in relation_clauses.items():
+                    sub_clauses.append(self.semi_join(related, join_func(*clauses)))
             search_expressions["clauses"].append(
                 cast(BinaryExpression, join_func(*sub_clauses))
             )
         else:
             expression = expressions
-            column: Optional[Column] = getattr(self.model, expression.column_name, None)
-            if not column:
-                has_column = False
-                if relations:
-                    for relation in relations:
-                        if isinstance(relation, Table):
-                            column = relation.c[expression.column_name]
-                            has_column = True
-                        else:
-                            column = getattr(relation, expression.column_name, None)
-                            if column is not None:
-                                has_column = True
-                        if has_column:
-                            break
-                if not has_column:
-                    raise ValueError(f"Invalid column name: {expression.column_name}")
-
-            if not hasattr(column, "type"):
-                raise ValueError(f"Invalid column name: {expression.column_name}")
-
-            if column.type.python_type == str and expression.fuzzy:  # type: ignore
-
-                similarity_func = func.word_similarity(expression.search_term, column)
+            column, relation = self.search_column(expression.column_name, relations)
 
-                search_expressions["clauses"].append(
-                    cast(
-                        BinaryExpression,
-                        similarity_func >= expression.min_string_similarity,
-                    ),
+            correlation = None
+            if relation is not None:
+                correlation = correlation_clause(self.model, relation)
+                if correlation is None:
+                    search_expressions["joins"].append(relation)
+                else:
+                    search_expressions["semi_join"] = relation
+
+            idx = len(search_expressions["columns"])
+            search_expressions["columns"].append(column)
+            if self.is_fuzzy(column, expression):
+                term = bindparam(f"term_{idx}", expression.search_term, type_=String)
+                similarity_func = func.word_similarity(term, column)
+
+                similarity_clause = cast(
+                    BinaryExpression,
+                    similarity_func
+                    >= bindparam(f"similarity_{idx}", expression.min_string_similarity),
                 )
+                if expression.min_string_similarity is not None:
+                    # `<%` is the trigram index-supported equivalent of
+                    # `word_similarity >= pg_trgm.word_similarity_threshold`.
+                    # The threshold is set per query to the lowest similarity of
+                    # the expressions, so the exact comparison is still needed.
+                    similarity_clause = cast(
+                        BinaryExpression,
+                        and_(term.op("<%")(column), similarity_clause),
+                    )
+                    search_expressions["fuzzy_thresholds"].append(
+                        expression.min_string_similarity
+                    )
+
+                search_expressions["clauses"].append(similarity_clause)
+                if correlation is not None:
+                    # The best similarity of the related rows, 0 without any
+                    similarity_func = func.coalesce(
+                        select(func.max(similarity_func))
+                        .where(correlation)
+                        .scalar_subquery(),
+                        0,
+                    )
                 search_expressions["fuzzy_funcs"].append(
                     cast(_FunctionGenerator, similarity_func)
                 )
             else:
-                operator_func = getattr(column, f"__{expression.operator}__", None)
+                operator_func = getattr(
+                    column, f"__{expression.operator.value}__", None
+                )
                 if not operator_func:
                     raise ValueError(f"Invalid operator: {expression.operator}")
 
                 search_expressions["clauses"].append(
-                    operator_func(expression.search_term)
+                    operator_func(
+                        bindparam(
+                            f"term_{idx}",
+                            self.search_value(column, expression.search_term),
+                        )
+                    )
                 )
 
+        semi_join = search_expressions["semi_join"]
+        if columns is None and semi_join is not None:
+            search_expressions["clauses"] = [
+                cast(
+                    BinaryExpression,
+                    self.semi_join(semi_join, and_(*search_expressions["clauses"])),
+                )
+            ]
+            search_expressions["semi_join"] = None
         return search_expressions
 
+    def search_column(
+        self, column_name: str, relations: Optional[List[Relation]]
+    ) -> Tuple[Any, Optional[Relation]]:
+        """Find a column of the search expressions in the model, or else in the
+        first of the relations that has it.
+
+        Returns
+        -------
+        Tuple[Any, Optional[Relation]]
+            The column, and its relation, or None if it's a column of the model.
+        """
+        column: Any = getattr(self.model, column_name, None)
+        relation: Optional[Relation] = None
+        if column is None:
+            for candidate in relations or []:
+                if isinstance(candidate, Table):
+                    column = candidate.c.get(column_name)
+                else:
+                    column = getattr(candidate, column_name, None)
+                if column is not None:
+                    relation = candidate
+                    break
+        if column is None or not hasattr(column, "type"):
+            raise ValueError(f"Invalid column name: {column_name}")
+        return column, relation
+
+    def semi_join(self, relation: Relation, clause: ClauseElement) -> ClauseElement:
+        """Create the `EXISTS` subquery of the rows of a one-to-many relation of the
+        model that match the clause, see `app.utils.relations`."""
+        correlation = correlation_clause(self.model, relation)
+        assert correlation is not None
+        return exists_in(relation, correlation, clause)
+
+    @staticmethod
+    def is_fuzzy(column: Any, expression: Expression) -> bool:
+        """Whether the expression compares the words of a text column to its term,
+        instead of comparing the column with its operator."""
+        return expression.fuzzy and column.type.python_type == str
+
+    def search_parameters(
+        self, expressions: Union[Expression, ExpressionGroup], columns: List[Any]
+    ) -> Tuple[Dict[str, Any], List[float]]:
+        """Return the values of the bound parameters of the clauses created by
+        `create_search_expressions` for expressions of the same shape, and the
+        minimum similarity of the fuzzy expressions.
+
+        Parameters
+        ----------
+        expressions : Union[Expression, ExpressionGroup]
+            The search expressions.
+        columns : List[Any]
+            The columns of the expressions, from `create_search_expressions`.
+
+        Returns
+        -------
+        Tuple[Dict[str, Any], List[float]]
+        """
+        parameters: Dict[str, Any] = {}
+        thresholds: List[float] = []
+        for idx, (expression, column) in enumerate(
+            zip(search_terms(expressions), columns)
+        ):
+            if self.is_fuzzy(column, expression):
+                parameters[f"term_{idx}"] = expression.search_term
+                parameters[f"similarity_{idx}"] = expression.min_string_similarity
+                if expression.min_string_similarity is not None:
+                    thresholds.append(expression.min_string_similarity)
+            else:
+                parameters[f"term_{idx}"] = self.search_value(
+                    column, expression.search_term
+                )
+        return parameters, thresholds
+
+    @staticmethod
+    def search_value(column: Any, search_term: str) -> Any:
+        """Convert the search term to the type of the numeric columns, e.g.
+        `fao_area`, as the driver doesn't convert the strings of their parameters.
+        """
+        try:
+            python_type = column.type.python_type
+        except (AttributeError, NotImplementedError):
+            return search_term
+        if python_type in (int, float):
+            try:
+                return python_type(search_term)
+            except ValueError:
+                raise ValueError(f"Invalid search term: {search_term}")
+        return search_term
+
+    @staticmethod
+    def word_similarity_threshold_statement(thresholds: List[float]) -> Select:
+        """Create the statement that sets `pg_trgm.word_similarity_threshold` for
+        the current transaction to the lowest of the given thresholds, so the `<%`
+        operator of the fuzzy search expressions matches the same records as their
+        `word_similarity` comparisons, and can use the trigram indexes.
+
+        The setting only accepts values from 0 to 1, so the threshold is clamped to
+        them: the `word_similarity` comparisons still filter with the given values.
+
+        Parameters
+        ----------
+        thresholds : List[float]
+            The minimum string similarity of the fuzzy search expressions.
+
+        Returns
+        -------
+        Select
+        """
+        threshold = min(max(min(thresholds), 0.0), 1.0)
+        return select(
+            func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)
+        )
+
+    def set_word_similarity_threshold(
+        self, db: Session, thresholds: List[float]
+    ) -> None:
+        """Run `word_similarity_threshold_statement`, if there are thresholds.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        thresholds : List[float]
+            The minimum string similarity of the fuzzy search expressions.
+        """
+        if thresholds:
+            db.execute(self.word_similarity_threshold_statement(thresholds))
+
+    def project(
+        self,
+        query: Query,
+        schema: Optional[Type[BaseModel]],
+        *,
+        include: Optional[List[str]] = None,
+    ) -> Query:
+        """Select only the columns of the records that the schema serializes, see
+        `projected_columns`. The query then returns rows of these columns, which are
+        lighter to fetch and to create than instances of the model.
+
+        Parameters
+        ----------
+        query : Query
+            A query of the model.
+        schema : Optional[Type[BaseModel]]
+            The response model of the records. If None, or if it needs the whole
+            records, the query is returned as is.
+        include : Optional[List[str]]
+            The names of other columns to select.
+
+        Returns
+        -------
+        Query
+        """
+        if schema is None:
+            return query
+        columns = projected_columns(self.model, schema, include=include or [])
+        return query if columns is None else query.with_entities(*columns)
+
+    def search_query(
+        self,
+        expressions: Union[Expression, ExpressionGroup],
+        *,
+        relations: Optional[List[Relation]] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Tuple[Query, List[float]]:
+        """Create the query of `search`, see `search` for the parameters.
+
+        Returns
+        -------
+        Tuple[Query, List[float]]
+            The query, not bound to a session, and the minimum similarity of the
+            fuzzy expressions, which must be passed to `set_word_similarity_threshold`
+            in the same transaction before running the query.
+        """
+        query, search_expressions = self._search_query(
+            expressions,
+            relations=relations,
+            order_by=order_by,
+            limit=limit,
+            filters=filters,
+            schema=schema,
+        )
+        return query, search_expressions["fuzzy_thresholds"]
+
+    def _search_query(
+        self,
+        expressions: Union[Expression, ExpressionGroup],
+        *,
+        relations: Optional[List[Relation]] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Tuple[Query, SearchExpressions]:
+        try:
+            search_expressions = self.create_search_expressions(
+                expressions, relations=relations
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400, detail=f"Error with search expressions: {e}"
+            )
+
+        query: Query = Query([self.model])
+
+        # Only the relations that are not semi-joined, see `create_search_expressions`
+        for relation in dict.fromkeys(search_expressions["joins"]):
+            query = query.join(relation, isouter=True)
+
+        if filters:
+            query = query.filter(*filters)
+
+        query = query.filter(*search_expressions["clauses"]).order_by(
+            *map(lambda f: f.desc(), search_expressions["fuzzy_funcs"])
+            # *map(lambda f: f.asc(), search_expressions["fuzzy_funcs"])
+        )
+
+        ordered_query = self.project(self.order_by(query, order_by=order_by), schema)
+
+        if limit > 0:
+            ordered_query = ordered_query.limit(bindparam("limit", limit))
+        return ordered_query, search_expressions
+
+    def search_plan(
+        self,
+        expressions: Union[Expression, ExpressionGroup],
+        *,
+        relations: Optional[List[Relation]] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Tuple[SearchPlan, Dict[str, Any], List[float]]:
+        """Return the plan of `search`, from the cache of the plans of the searches
+        of the same shape, see `app.utils.search_plan`, and the values of its
+        parameters. See `search` for the parameters.
+
+        Returns
+        -------
+        Tuple[SearchPlan, Dict[str, Any], List[float]]
+            The plan, the values of the parameters of its statement, and the
+            minimum similarity of the fuzzy expressions, which must be passed to
+            `set_word_similarity_threshold` in the same transaction before running
+            the statement.
+        """
+        filters_key = clauses_key(filters or [])
+        key = None
+        if filters_key is not None:
+            key = (
+                expression_shape(expressions),
+                tuple(relations or []),
+                tuple(order_by or []),
+                limit > 0,
+                filters_key,
+                schema,
+            )
+
+        def build() -> SearchPlan:
+            query, search_expressions = self._search_query(
+                expressions,
+                relations=relations,
+                order_by=order_by,
+                limit=limit,
+                filters=filters,
+                schema=schema,
+            )
+            statement = cast(Select, query.statement)
+            return SearchPlan(query, statement, search_expressions["columns"])
+
+        plan = self.search_plans.get(key, build)
+        try:
+            parameters, thresholds = self.search_parameters(expressions, plan.columns)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400, detail=f"Error with search expressions: {e}"
+            )
+        if limit > 0:
+            parameters["limit"] = limit
+        return plan, parameters, thresholds
+
     def search(
         self,
         db: Session,
         expressions: Union[Expression, ExpressionGroup],
         *,
-        relations: Optional[List[Union[Type[Base], Table]]] = None,
+        relations: Optional[List[Relation]] = None,
         order_by: Optional[List[str]] = None,
         limit: int = 0,
-    ) -> List[ModelType]:
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
         """Search all the records from the database using the given search expressions,
         then order the results by the columns in `order_by` and return
         the first limited results.
@@ -241,61 +770,158 @@ class CRUDBase(
             The database session.
         expressions : Union[Expression, ExpressionGroup]
             The search expressions.
-        relations : Optional[List[Union[Type[Base], Table]]]
-            The relations to be joined in the search.
+        relations : Optional[List[Relation]]
+            The relations whose columns the expressions can use. Only the ones they
+            use are joined, or semi-joined, see `create_search_expressions`.
         order_by : Optional[List[str]]
             List of column names to order by. If a column name is prefixed with '-',
             order it in descending order.
         limit : int, optional
             This value controls the number of results returned, by default 0.
+        filters : Optional[List[ClauseElement]]
+            Extra filter clauses that the results must match, applied before `limit`.
+        schema : Optional[Type[BaseModel]]
+            The response model of the results. If given, only the columns it
+            serializes are selected, see `project`.
 
         Returns
         -------
-        List[ModelType]
-            A list of SQLAlchemy model instances from the query.
+        List[Any]
+            A list of SQLAlchemy model instances from the query, or of rows of the
+            columns of the schema.
         """
-        try:
-            search_expressions = self.create_search_expressions(
-                expressions, relations=relations
-            )
-        except ValueError as e:
-            raise HTTPException(
-                status_code=400, detail=f"Error with search expressions: {e}"
-            )
+        plan, parameters, thresholds = self.search_plan(
+            expressions,
+            relations=relations,
+            order_by=order_by,
+            limit=limit,
+            filters=filters,
+            schema=schema,
+        )
+        self.set_word_similarity_threshold(db, thresholds)
+        return self.unique(db.execute(plan.statement, parameters), plan.query)
 
-        query = db.query(self.model)
+    async def search_async(
+        self,
+        db: AsyncSession,
+        expressions: Union[Expression, ExpressionGroup],
+        *,
+        relations: Optional[List[Relation]] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Same as `search`, with an `AsyncSession`."""
+        plan, parameters, thresholds = self.search_plan(
+            expressions,
+            relations=relations,
+            order_by=order_by,
+            limit=limit,
+            filters=filters,
+            schema=schema,
+        )
+        if thresholds:
+            await db.execute(self.word_similarity_threshold_statement(thresholds))
+        return self.unique(await db.execute(plan.statement, parameters), plan.query)
 
-        if relations:
-            for relation in relations:
-                query = query.join(relation, isouter=True)
+    @staticmethod
+    def unique(result: Result, query: Query) -> List[Any]:
+        """Return the results of the query, without the records repeated by joins.
 
-        query = query.filter(*search_expressions["clauses"]).order_by(
-            *map(lambda f: f.desc(), search_expressions["fuzzy_funcs"])
-            # *map(lambda f: f.asc(), search_expressions["fuzzy_funcs"])
-        )
+        The rows of a projected query (see `project`) are told apart by their
+        primary key columns, as the other columns may not be hashable. The rows of
+        the other queries of several columns are returned as they are.
 
-        ordered_query = self.order_by(query, order_by=order_by)
+        Parameters
+        ----------
+        result : Result
+            The result of the statement of the query.
+        query : Query
 
-        if limit > 0:
-            return ordered_query.limit(limit).all()
-        return ordered_query.all()
+        Returns
+        -------
+        List[Any]
+            The instances of the model of the query, or its rows.
+        """
+        if query.is_single_entity:
+            return result.scalars().unique().all()
+        key = [
+            idx
+            for idx, column in enumerate(query.column_descriptions)
+            if getattr(column["expr"], "primary_key", False)
+        ]
+        if not key:
+            return result.all()
+        return result.unique(lambda row: tuple(row[idx] for idx in key)).all()
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        """Get a database record by id.
+    @classmethod
+    def all(cls, db: Session, query: Query) -> List[Any]:
+        """Run a query that is not bound to a session.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        query : Query
+            A query of the model, e.g. from `search_query`.
+
+        Returns
+        -------
+        List[Any]
+            The instances of the model of the query, or its rows, see `unique`.
+        """
+        return cls.unique(db.execute(query.statement), query)
+
+    @classmethod
+    async def all_async(cls, db: AsyncSession, query: Query) -> List[Any]:
+        """Same as `all`, with an `AsyncSession`."""
+        return cls.unique(await db.execute(query.statement), query)
+
+    def get_query(self, id: Any, *, schema: Optional[Type[BaseModel]] = None) -> Query:
+        """Create the query of `get`, see it for the parameters."""
+        primary_key = inspect(self.model).primary_key[0]
+        query: Query = Query([self.model]).filter(primary_key == id)
+        if schema:
+            query = query.options(
+                *loader_options(
+                    self.model,
+                    schema,
+                    strategies=self.loader_strategies,
+                    filters=self.relationship_filters,
+                )
+            )
+        return query
+
+    def get(
+        self, db: Session, id: Any, *, schema: Optional[Type[BaseModel]] = None
+    ) -> Optional[ModelType]:
+        """Get a database record by its primary key.
 
         Parameters
         ----------
         db : Session
             The database session.
         id : Any
-            The object id to fetch from the database.
+            The primary key of the object to fetch from the database.
+        schema : Optional[Type[BaseModel]]
+            The response model the record is serialized with. The relationships it
+            serializes are loaded with the record, see `app.utils.loading`.
+            They must be, with `get_async`.
 
         Returns
         -------
         Optional[ModelType]
             An instance of the SQLAlchemy for the fetched object, if it exists.
         """
-        return db.query(self.model).filter(self.model.id == id).first()
+        return self.get_query(id, schema=schema).with_session(db).one_or_none()
+
+    async def get_async(
+        self, db: AsyncSession, id: Any, *, schema: Optional[Type[BaseModel]] = None
+    ) -> Optional[ModelType]:
+        """Same as `get`, with an `AsyncSession`."""
+        result = await db.execute(self.get_query(id, schema=schema).statement)
+        return result.scalars().unique().one_or_none()
 
     def get_multi(
         self,
@@ -304,9 +930,15 @@ class CRUDBase(
         skip: int = 0,
         limit: int = 100,
         order_by: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
     ) -> PaginationSchemaType:
         """Get multiple records from the database.
 
+        Records are paginated by `skip` (offset pagination), unless a `cursor` is
+        given. An empty cursor starts the cursor (keyset) pagination, and the returned
+        page links carry the cursors for the other pages.
+
         Parameters
         ----------
         db : Session
@@ -318,17 +950,78 @@ class CRUDBase(
         order_by: Optional[List[str]]
             List of column names to order by. If a column name is prefixed with '-',
             order it in descending order.
+        cursor: Optional[str]
+            An opaque cursor from the page links of a previous response.
+        schema : Optional[Type[BaseModel]]
+            The response model of the records. If given, only the columns it
+            serializes are selected, see `project`.
 
         Returns
         -------
-        List[ModelType]
-            A list of SQLAlchemy model instances from the query.
+        PaginationSchemaType
+            The page, with SQLAlchemy model instances, or rows of the columns of the
+            schema, as results.
         """
-        query = self.order_by(db.query(self.model), order_by=order_by)
-        data_from_db = query.offset(skip).limit(limit).all()
-        count = query.count()
+        if cursor is not None:
+            return self.get_multi_by_cursor(
+                db, cursor=cursor, limit=limit, order_by=order_by, schema=schema
+            )
+
+        query = self.project(
+            self.order_by(Query([self.model]), order_by=order_by), schema
+        )
+        data_from_db = self.all(db, query.offset(skip).limit(limit))
+        count, count_estimated = count_cache.get(db, self.model)
+        return self.offset_page(
+            data_from_db,
+            skip=skip,
+            limit=limit,
+            count=count,
+            count_estimated=count_estimated,
+        )
+
+    async def get_multi_async(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> PaginationSchemaType:
+        """Same as `get_multi`, with an `AsyncSession`."""
+        if cursor is not None:
+            return await self.get_multi_by_cursor_async(
+                db, cursor=cursor, limit=limit, order_by=order_by, schema=schema
+            )
+
+        query = self.project(
+            self.order_by(Query([self.model]), order_by=order_by), schema
+        )
+        data_from_db = await self.all_async(db, query.offset(skip).limit(limit))
+        count, count_estimated = await count_cache.get_async(db, self.model)
+        return self.offset_page(
+            data_from_db,
+            skip=skip,
+            limit=limit,
+            count=count,
+            count_estimated=count_estimated,
+        )
+
+    def offset_page(
+        self,
+        data_from_db: List[Any],
+        *,
+        skip: int,
+        limit: int,
+        count: int,
+        count_estimated: bool,
+    ) -> PaginationSchemaType:
+        """Create the page of `get_multi` for the records fetched by offset."""
         data = {
             "count": count,
+            "count_estimated": count_estimated,
             "first_page": page_URI.format(
                 API_Model_mapping[self.model.__name__], 0, limit
             ),
@@ -353,9 +1046,210 @@ class CRUDBase(
         }
         return cast(PaginationSchemaType, data)
 
+    def get_multi_by_cursor(
+        self,
+        db: Session,
+        *,
+        cursor: str,
+        limit: int = 100,
+        order_by: Optional[List[str]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> PaginationSchemaType:
+        """Get a page of records from the database using keyset pagination.
+
+        Instead of skipping the records of the previous pages, the page is filtered
+        by the values of the `order_by` and primary key columns of the record at its
+        boundary, so fetching a page has the same cost wherever it is in the results.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        cursor : str
+            An opaque cursor from the page links of a previous response.
+            An empty string points to the first page.
+        limit : int
+            The number of records to return.
+        order_by : Optional[List[str]]
+            List of column names to order by, only used when the cursor is empty.
+            Otherwise, the order is carried by the cursor.
+        schema : Optional[Type[BaseModel]]
+            The response model of the records. If given, only the columns it
+            serializes, and the keyset columns, are selected, see `project`.
+
+        Returns
+        -------
+        PaginationSchemaType
+        """
+        query, keyset = self.cursor_query(
+            cursor, limit=limit, order_by=order_by, schema=schema
+        )
+        data_from_db = self.all(db, query)
+        count, count_estimated = count_cache.get(db, self.model)
+        return self.cursor_page(
+            data_from_db,
+            keyset=keyset,
+            limit=limit,
+            count=count,
+            count_estimated=count_estimated,
+        )
+
+    async def get_multi_by_cursor_async(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: str,
+        limit: int = 100,
+        order_by: Optional[List[str]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> PaginationSchemaType:
+        """Same as `get_multi_by_cursor`, with an `AsyncSession`."""
+        query, keyset = self.cursor_query(
+            cursor, limit=limit, order_by=order_by, schema=schema
+        )
+        data_from_db = await self.all_async(db, query)
+        count, count_estimated = await count_cache.get_async(db, self.model)
+        return self.cursor_page(
+            data_from_db,
+            keyset=keyset,
+            limit=limit,
+            count=count,
+            count_estimated=count_estimated,
+        )
+
+    def cursor_query(
+        self,
+        cursor: str,
+        *,
+        limit: int,
+        order_by: Optional[List[str]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Tuple[Query, Keyset]:
+        """Create the query of `get_multi_by_cursor`, which fetches one record more
+        than `limit` to tell whether there are more pages after it.
+
+        Returns
+        -------
+        Tuple[Query, Keyset]
+            The query, not bound to a session, and the decoded cursor with the
+            keyset columns, which `cursor_page` needs to create the page.
+        """
+        try:
+            decoded_cursor = decode_cursor(cursor, order_by=order_by)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        query: Query = Query([self.model])
+        columns = self.keyset_columns(query, order_by=decoded_cursor["order_by"])
+        if decoded_cursor["before"]:
+            # Walk backward from the boundary, then restore the requested order.
+            columns = [
+                OrderByColumn(
+                    name=column["name"],
+                    column=column["column"],
+                    descending=not column["descending"],
+                )
+                for column in columns
+            ]
+
+        if decoded_cursor["values"] is not None:
+            try:
+                query = query.filter(
+                    self.keyset_clause(columns, decoded_cursor["values"])
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        query = query.order_by(
+            *(
+                desc(column["column"])
+                if column["descending"]
+                else asc(column["column"])
+                for column in columns
+            )
+        ).limit(limit + 1)
+        # The cursors of the page links are made of the keyset columns of its rows
+        query = self.project(
+            query, schema, include=[column["name"] for column in columns]
+        )
+        return query, Keyset(cursor=decoded_cursor, columns=columns)
+
+    def cursor_page(
+        self,
+        data_from_db: List[Any],
+        *,
+        keyset: Keyset,
+        limit: int,
+        count: int,
+        count_estimated: bool,
+    ) -> PaginationSchemaType:
+        """Create the page of `get_multi_by_cursor` for the records fetched by the
+        query of `cursor_query`."""
+        order_by = keyset["cursor"]["order_by"]
+        values = keyset["cursor"]["values"]
+        before = keyset["cursor"]["before"]
+        columns = keyset["columns"]
+
+        has_more = len(data_from_db) > limit
+        data_from_db = data_from_db[:limit]
+        if before:
+            data_from_db.reverse()
+
+        def page(row: Optional[Any], *, before: bool) -> str:
+            return cursor_page_URI.format(
+                API_Model_mapping[self.model.__name__],
+                encode_cursor(
+                    order_by,
+                    None
+                    if row is None
+                    else [getattr(row, column["name"]) for column in columns],
+                    before=before,
+                ),
+                limit,
+            )
+
+        has_previous = has_more if before else values is not None
+        has_next = values is not None if before else has_more
+        data = {
+            "count": count,
+            "count_estimated": count_estimated,
+            "first_page": page(None, before=False),
+            "last_page": page(None, before=True),
+            "previous_page": (
+                page(data_from_db[0], before=True)
+                if has_previous and data_from_db
+                else None
+            ),
+            "next_page": (
+                page(data_from_db[-1], before=False)
+                if has_next and data_from_db
+                else None
+            ),
+            "results": data_from_db,
+        }
+        return cast(PaginationSchemaType, data)
+
+    def all_query(
+        self,
+        *,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of `get_all` and `stream_all`."""
+        query: Query = Query([self.model])
+        if filters:
+            query = query.filter(*filters)
+        return self.project(self.order_by(query, order_by=order_by), schema)
+
     def get_all(
-        self, db: Session, *, order_by: Optional[List[str]] = None
-    ) -> List[ModelType]:
+        self,
+        db: Session,
+        *,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
         """Get all records from the database.
 
         Parameters
@@ -365,14 +1259,112 @@ class CRUDBase(
         order_by: Optional[List[str]]
             List of column names to order by. If a column name is prefixed with '-',
             order it in descending order.
+        filters : Optional[List[ClauseElement]]
+            Extra filter clauses that the records must match.
+        schema : Optional[Type[BaseModel]]
+            The response model of the records. If given, only the columns it
+            serializes are selected, see `project`.
+
+        Returns
+        -------
+        List[Any]
+            A list of SQLAlchemy model instances from the query, or of rows of the
+            columns of the schema.
+        """
+        return self.all(
+            db, self.all_query(order_by=order_by, filters=filters, schema=schema)
+        )
+
+    async def get_all_async(
+        self,
+        db: AsyncSession,
+        *,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Same as `get_all`, with an `AsyncSession`."""
+        return await self.all_async(
+            db, self.all_query(order_by=order_by, filters=filters, schema=schema)
+        )
+
+    def stream_all(
+        self,
+        db: Session,
+        *,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        batch_size: int = 1000,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Iterator[Any]:
+        """Iterate over all the records from the database, fetching them in batches
+        through a server-side cursor, so the whole result set is never held in memory.
+
+        Parameters
+        ----------
+        db : Session
+            The database session. It must stay open until the iteration ends.
+        order_by: Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+        filters : Optional[List[ClauseElement]]
+            Extra filter clauses that the records must match.
+        batch_size : int
+            The number of records fetched from the cursor at a time.
+        schema : Optional[Type[BaseModel]]
+            The response model of the records. If given, only the columns it
+            serializes are selected, see `project`.
 
         Returns
         -------
-        List[ModelType]
-            A list of SQLAlchemy model instances from the query.
+        Iterator[Any]
+            SQLAlchemy model instances from the query, or rows of the columns of the
+            schema.
+        """
+        query = self.all_query(
+            order_by=order_by, filters=filters, schema=schema
+        ).with_session(db)
+        return iter(query.execution_options(stream_results=True).yield_per(batch_size))
+
+    async def stream_all_async(
+        self,
+        db: AsyncSession,
+        *,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        batch_size: int = 1000,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> AsyncIterator[Any]:
+        """Same as `stream_all`, with an `AsyncSession`."""
+        query = self.all_query(order_by=order_by, filters=filters, schema=schema)
+        result = await db.stream(
+            query.statement.execution_options(yield_per=batch_size)
+        )
+        if query.is_single_entity:
+            async for instance in result.scalars():
+                yield instance
+        else:
+            async for row in result:
+                yield row
+
+    def commit(self, db: Session) -> None:
+        """Commit the changes to the records, bumping the dataset version with them,
+        and drop the cached data about the records.
+
+        The aggregates of `app.db.aggregates` are not refreshed, as it rebuilds the
+        views of the whole dataset: they are refreshed by the imports, or by
+        `app/db/refresh_aggregates.py`.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
         """
-        query = self.order_by(db.query(self.model), order_by=order_by)
-        return query.all()
+        if self.versioned:
+            dataset_version.bump(db)
+        db.commit()
+        dataset_version.clear()
+        count_cache.invalidate(self.model)
 
     def create(
         self, db: Session, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]
@@ -395,7 +1387,7 @@ class CRUDBase(
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
-        db.commit()
+        self.commit(db)
         db.refresh(db_obj)
         return db_obj
 
@@ -432,7 +1424,7 @@ class CRUDBase(
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
+        self.commit(db)
         db.refresh(db_obj)
         return db_obj
 
@@ -454,6 +1446,6 @@ class CRUDBase(
         obj = db.query(self.model).get(id)
         if obj:
             db.delete(obj)
-            db.commit()
+            self.commit(db)
             return obj
         return None
@@ -1,6 +1,7 @@
 from typing import Any, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
 
 from app.crud.base import CRUDBase
 from app.models import DataSource, Species
@@ -12,11 +13,17 @@ class CRUDDataSource(
         DataSource, DataSourceCreate, DataSourceUpdate, DataSourceSummaryPagination
     ]
 ):
-    def get_species(self, db: Session, id: Any) -> List[Species]:
+    def get_species_query(self, id: Any) -> Query:
         return self.order_by(
-            db.query(Species).filter(Species.data_source_id == id),
+            Query([Species]).filter(Species.data_source_id == id),
             order_by=["matched_canonical_full_name"],
-        ).all()
+        )
+
+    def get_species(self, db: Session, id: Any) -> List[Species]:
+        return self.get_species_query(id).with_session(db).all()
+
+    async def get_species_async(self, db: AsyncSession, id: Any) -> List[Species]:
+        return await self.all_async(db, self.get_species_query(id))
 
 
 data_source = CRUDDataSource(DataSource)
@@ -1,5 +1,30 @@
+from typing import Any, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    Integer,
+    Numeric,
+    String,
+    bindparam,
+    cast,
+    func,
+    literal_column,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.elements import ClauseElement
+
 from app.crud.base import CRUDBase
-from app.models import Species, SpeciesCommonNames, SpeciesExtra, SpeciesSynonyms
+from app.models import (
+    Species,
+    SpeciesCommonNames,
+    SpeciesExtra,
+    SpeciesSynonyms,
+    stations_species_table,
+)
 from app.schemas import (
     SpeciesCommonNamesCreate,
     SpeciesCommonNamesPagination,
@@ -14,13 +39,255 @@ from app.schemas import (
     SpeciesSynonymsUpdate,
     SpeciesUpdate,
 )
+from app.utils.fuzzy_index import NAME_FIELDS, SCORE_DIGITS
+from app.utils.species import binomial_only
 
 
 # Species
 class CRUDSpecies(
     CRUDBase[Species, SpeciesCreate, SpeciesUpdate, SpeciesSummaryPagination]
 ):
-    pass
+    def get_multi_by_ids_query(
+        self,
+        ids: List[str],
+        *,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of `get_multi_by_ids`, see it for the parameters."""
+        query: Query = Query([self.model]).filter(self.model.id.in_(ids))
+        if filters:
+            query = query.filter(*filters)
+        if station:
+            query = query.join(stations_species_table).filter(
+                stations_species_table.c.station_id == station
+            )
+        return self.project(self.order_by(query, order_by=order_by), schema)
+
+    def get_multi_by_ids(
+        self,
+        db: Session,
+        ids: List[str],
+        *,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Get the species with the given ids.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        ids : List[str]
+            The species ids.
+        station : Optional[str]
+            If given, only return the species recorded at this station.
+        order_by: Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+        filters : Optional[List[ClauseElement]]
+            Extra filter clauses that the species must match.
+        schema : Optional[Type[BaseModel]]
+            The response model of the species. If given, only the columns it
+            serializes are selected, see `CRUDBase.project`.
+
+        Returns
+        -------
+        List[Any]
+            The species, or rows of the columns of the schema.
+        """
+        return self.all(
+            db,
+            self.get_multi_by_ids_query(
+                ids, station=station, order_by=order_by, filters=filters, schema=schema
+            ),
+        )
+
+    async def get_multi_by_ids_async(
+        self,
+        db: AsyncSession,
+        ids: List[str],
+        *,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        filters: Optional[List[ClauseElement]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Same as `get_multi_by_ids`, with an `AsyncSession`."""
+        return await self.all_async(
+            db,
+            self.get_multi_by_ids_query(
+                ids, station=station, order_by=order_by, filters=filters, schema=schema
+            ),
+        )
+
+    def name_sources(self) -> List[Tuple[str, Any, Any]]:
+        """Return the names matched by the fuzzy search, in the order of
+        `NAME_FIELDS`: the field, the species id column, and the name column."""
+        sources = {
+            "matched_canonical_full_name": (
+                Species.id,
+                Species.matched_canonical_full_name,
+            ),
+            "current_name": (Species.id, Species.current_name),
+            "common_name": (SpeciesCommonNames.species_id, SpeciesCommonNames.name),
+            "synonym": (SpeciesSynonyms.species_id, SpeciesSynonyms.scientific_name),
+        }
+        return [(field, *sources[field]) for field in NAME_FIELDS]
+
+    def fuzzy_match_query(
+        self,
+        query_str: str,
+        *,
+        min_similarity: float,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of `fuzzy_match`, see it for the parameters.
+
+        The names of all the sources are matched in one `UNION ALL`, with the
+        trigram indexes of their columns, then `DISTINCT ON` keeps the best match of
+        each species, so each species is scored once, whatever its number of names.
+
+        Returns
+        -------
+        Query
+            The query, not bound to a session, which returns the species, or rows
+            of the columns of the schema, with the `score`, `matched_field` and
+            `matched_name` of their best match.
+        """
+        term = bindparam("term", query_str, type_=String)
+        names = union_all(
+            *(
+                select(
+                    species_id.label("species_id"),
+                    # Constants, so their types are known in the union
+                    literal_column(str(rank), Integer).label("rank"),
+                    literal_column(f"'{field}'", String).label("matched_field"),
+                    name.label("matched_name"),
+                    # The `real` of pg_trgm, read as a double like the scores of
+                    # `FuzzyIndex`
+                    cast(func.word_similarity(term, name), DOUBLE_PRECISION).label(
+                        "score"
+                    ),
+                ).where(term.op("<%")(name))
+                for rank, (field, species_id, name) in enumerate(self.name_sources())
+            )
+        ).subquery("names")
+        # The first of the best names of each species, in the order of the fields
+        best = (
+            select(names)
+            .where(names.c.score >= bindparam("min_similarity", min_similarity))
+            .distinct(names.c.species_id)
+            .order_by(names.c.species_id, names.c.score.desc(), names.c.rank)
+            .subquery("best")
+        )
+
+        query: Query = (
+            Query([self.model])
+            .join(best, best.c.species_id == Species.id)
+            .filter(binomial_only())
+        )
+        if station:
+            query = query.filter(
+                self.semi_join(
+                    stations_species_table,
+                    stations_species_table.c.station_id == station,
+                )
+            )
+        # `order_by` only breaks the ties between the scores
+        query = self.order_by(query.order_by(best.c.score.desc()), order_by=order_by)
+        # Rounded as `round_score` does for the index
+        score = cast(
+            func.round(cast(best.c.score, Numeric), SCORE_DIGITS), DOUBLE_PRECISION
+        )
+        query = self.project(query, schema).add_columns(
+            score.label("score"), best.c.matched_field, best.c.matched_name
+        )
+        return query.limit(limit) if limit > 0 else query
+
+    def fuzzy_match(
+        self,
+        db: Session,
+        query_str: str,
+        *,
+        min_similarity: float,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Get the species with a name, common name or synonym similar to the
+        query, from the most similar, as `FuzzyIndex.search` does in memory.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        query_str : str
+            The name to search.
+        min_similarity : float
+            The minimum word similarity of the names with the query.
+        station : Optional[str]
+            If given, only return the species recorded at this station.
+        order_by: Optional[List[str]]
+            List of column names to order the species with the same score by. If a
+            column name is prefixed with '-', order it in descending order.
+        limit : int
+            The maximum number of species, by default 0, i.e. all of them.
+        schema : Optional[Type[BaseModel]]
+            The response model of the species, without the match, see
+            `CRUDBase.project`.
+
+        Returns
+        -------
+        List[Any]
+            Rows of the species, or of the columns of the schema, and of their
+            `score`, `matched_field` and `matched_name`.
+        """
+        self.set_word_similarity_threshold(db, [min_similarity])
+        return self.all(
+            db,
+            self.fuzzy_match_query(
+                query_str,
+                min_similarity=min_similarity,
+                station=station,
+                order_by=order_by,
+                limit=limit,
+                schema=schema,
+            ),
+        )
+
+    async def fuzzy_match_async(
+        self,
+        db: AsyncSession,
+        query_str: str,
+        *,
+        min_similarity: float,
+        station: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> List[Any]:
+        """Same as `fuzzy_match`, with an `AsyncSession`."""
+        await db.execute(self.word_similarity_threshold_statement([min_similarity]))
+        return await self.all_async(
+            db,
+            self.fuzzy_match_query(
+                query_str,
+                min_similarity=min_similarity,
+                station=station,
+                order_by=order_by,
+                limit=limit,
+                schema=schema,
+            ),
+        )
 
 
 species = CRUDSpecies(Species)
@@ -1,23 +1,356 @@
-from typing import Any, Optional, cast
+from typing import Any, List, Optional, Sequence, Tuple, Type, Union
 
-from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from sqlalchemy import Float, and_, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ClauseElement
 
 from app.crud.base import CRUDBase
-from app.models import Station
-from app.schemas import StationCreate, StationSummaryPagination, StationUpdate
+from app.db.aggregates import fao_area_counts
+from app.models import Station, stations_species_table
+from app.schemas import (
+    Expression,
+    ExpressionGroup,
+    Join,
+    Operator,
+    StationCreate,
+    StationSummaryPagination,
+    StationUpdate,
+)
+from app.utils.db import SRID, geography, point
 from app.utils.species import binomial_only
 
+# The projection of the map tiles
+WEB_MERCATOR = 3857
+# The width of the world in Web Mercator meters
+WEB_MERCATOR_WIDTH = 2 * 20037508.342789244
+# The size of a vector tile, in its own coordinates, and of the margin around it in
+# which the points are kept, so the symbols at the edges aren't clipped
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+# The stations are clustered in a grid of this many cells per tile width
+CLUSTER_CELLS_PER_TILE = 8
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return the bounds of a tile of the XYZ scheme of web maps, in Web Mercator
+    meters: the minimum x and y, then the maximum x and y."""
+    size = WEB_MERCATOR_WIDTH / 2**z
+    min_x = -WEB_MERCATOR_WIDTH / 2 + x * size
+    max_y = WEB_MERCATOR_WIDTH / 2 - y * size
+    return min_x, max_y - size, min_x + size, max_y
+
+
+def tile_margin_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Return the bounds of a tile with the margin of `TILE_BUFFER` around it, within
+    the bounds of the world, past which Web Mercator has no longitudes and
+    latitudes."""
+    min_x, min_y, max_x, max_y = tile_bounds(z, x, y)
+    margin = (max_x - min_x) * TILE_BUFFER / TILE_EXTENT
+    half_width = WEB_MERCATOR_WIDTH / 2
+    return (
+        max(min_x - margin, -half_width),
+        max(min_y - margin, -half_width),
+        min(max_x + margin, half_width),
+        min(max_y + margin, half_width),
+    )
+
+
+def any_of(
+    column_name: str, values: Sequence[Any]
+) -> Union[Expression, ExpressionGroup]:
+    """Create the search expressions matching any of the values of the column."""
+    expressions = [
+        Expression(
+            column_name=column_name, search_term=str(value), operator=Operator.eq
+        )
+        for value in values
+    ]
+    if len(expressions) == 1:
+        return expressions[0]
+    return ExpressionGroup(join=Join.OR, expressions=expressions)
+
 
 class CRUDStation(
     CRUDBase[Station, StationCreate, StationUpdate, StationSummaryPagination]
 ):
-    def get(self, db: Session, id: Any) -> Optional[Station]:
-        station = cast(
-            Station, db.query(self.model).filter(self.model.name == id).first()
+    # The genera recorded at the stations are not species
+    relationship_filters = {"species": binomial_only}
+
+    def bbox_clause(
+        self,
+        min_longitude: float,
+        min_latitude: float,
+        max_longitude: float,
+        max_latitude: float,
+    ) -> ClauseElement:
+        """Create the clause matching the stations in the bounding box, which uses
+        the GiST index of the coordinates.
+
+        A box with a minimum longitude greater than its maximum longitude crosses
+        the antimeridian, and is split in two.
+        """
+
+        def envelope(west: float, east: float) -> ClauseElement:
+            return func.ST_Intersects(
+                self.model.coordinates,
+                func.ST_MakeEnvelope(west, min_latitude, east, max_latitude, SRID),
+            )
+
+        if min_longitude <= max_longitude:
+            return envelope(min_longitude, max_longitude)
+        return or_(envelope(min_longitude, 180), envelope(-180, max_longitude))
+
+    def bbox_query(
+        self,
+        min_longitude: float,
+        min_latitude: float,
+        max_longitude: float,
+        max_latitude: float,
+        *,
+        order_by: Optional[List[str]] = None,
+        limit: int = 0,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of the stations in a bounding box, in degrees.
+
+        Parameters
+        ----------
+        min_longitude : float
+        min_latitude : float
+        max_longitude : float
+        max_latitude : float
+        order_by : Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+        limit : int
+            The maximum number of stations, by default 0, i.e. all of them.
+        schema : Optional[Type[BaseModel]]
+            The response model of the stations, see `CRUDBase.project`.
+
+        Returns
+        -------
+        Query
+            The query, not bound to a session, see `CRUDBase.all_async`.
+        """
+        query: Query = Query([self.model]).filter(
+            self.bbox_clause(min_longitude, min_latitude, max_longitude, max_latitude)
         )
-        if station:
-            station.species = binomial_only(station.species)
-        return station
+        query = self.project(self.order_by(query, order_by=order_by), schema)
+        return query.limit(limit) if limit > 0 else query
+
+    def nearest_query(
+        self,
+        longitude: float,
+        latitude: float,
+        *,
+        radius: Optional[float] = None,
+        limit: int = 0,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of the stations nearest to a point, from the nearest,
+        with their `distance` to it.
+
+        The distances are measured on the spheroid, with the geography of the
+        coordinates, whose GiST index supports the `ST_DWithin` filter and the
+        `<->` (k-nearest neighbour) ordering.
+
+        Parameters
+        ----------
+        longitude : float
+        latitude : float
+        radius : Optional[float]
+            If given, only return the stations within this distance, in meters.
+        limit : int
+            The maximum number of stations, by default 0, i.e. all of them.
+        schema : Optional[Type[BaseModel]]
+            The response model of the stations, without the distance, see
+            `CRUDBase.project`.
+
+        Returns
+        -------
+        Query
+            The query, not bound to a session, which returns rows of the stations,
+            or of the columns of the schema, and of the distances.
+        """
+        origin = geography(point(longitude, latitude))
+        coordinates = geography(self.model.coordinates)
+        query = self.project(Query([self.model]), schema)
+        if radius is not None:
+            query = query.filter(func.ST_DWithin(coordinates, origin, radius))
+        query = query.add_columns(
+            func.ST_Distance(coordinates, origin, type_=Float).label("distance")
+        ).order_by(coordinates.op("<->")(origin))
+        return query.limit(limit) if limit > 0 else query
+
+    def map_filter(
+        self,
+        *,
+        species_ids: Optional[List[str]] = None,
+        fao_areas: Optional[List[int]] = None,
+    ) -> Optional[ClauseElement]:
+        """Create the clause matching the stations of the map endpoints, the same as
+        a search for the species or the FAO areas would.
+
+        Parameters
+        ----------
+        species_ids : Optional[List[str]]
+            Only match the stations where one of the species was recorded.
+        fao_areas : Optional[List[int]]
+            Only match the stations in one of the FAO areas.
+
+        Returns
+        -------
+        Optional[ClauseElement]
+            The clause, or None if there are no filters.
+        """
+        expressions: List[Union[Expression, ExpressionGroup]] = []
+        if species_ids:
+            expressions.append(any_of("species_id", species_ids))
+        if fao_areas:
+            expressions.append(any_of("fao_area", fao_areas))
+        if not expressions:
+            return None
+
+        # The species are semi-joined, which doesn't repeat the stations with
+        # several species, see `create_search_expressions`
+        search_expressions = self.create_search_expressions(
+            expressions[0]
+            if len(expressions) == 1
+            else ExpressionGroup(join=Join.AND, expressions=expressions),
+            relations=[stations_species_table],
+        )
+        return and_(*search_expressions["clauses"])
+
+    def tile_query(
+        self, z: int, x: int, y: int, *, filter: Optional[ClauseElement] = None
+    ) -> Select:
+        """Create the query of the Mapbox Vector Tile of the stations in the tile
+        (with the XYZ scheme of web maps), in a `stations` layer.
+
+        The stations in the tile are matched with the GiST index of the coordinates.
+
+        Parameters
+        ----------
+        z : int
+        x : int
+        y : int
+        filter : Optional[ClauseElement]
+            Only include the matching stations, see `map_filter`.
+
+        Returns
+        -------
+        Select
+            The query of the tile, as a single `bytea` value.
+        """
+        envelope = func.ST_MakeEnvelope(*tile_bounds(z, x, y), WEB_MERCATOR)
+        margin_envelope = func.ST_MakeEnvelope(
+            *tile_margin_bounds(z, x, y), WEB_MERCATOR
+        )
+        features = select(
+            func.ST_AsMVTGeom(
+                func.ST_Transform(
+                    self.model.coordinates, literal_column(str(WEB_MERCATOR))
+                ),
+                envelope,
+                TILE_EXTENT,
+                TILE_BUFFER,
+                True,
+            ).label("geom"),
+            self.model.name,
+            self.model.fao_area,
+            self.model.location,
+        ).where(
+            self.model.coordinates.op("&&")(
+                func.ST_Transform(margin_envelope, literal_column(str(SRID)))
+            )
+        )
+        if filter is not None:
+            features = features.where(filter)
+        tile = features.subquery("tile")
+        return select(
+            func.ST_AsMVT(literal_column("tile"), "stations", TILE_EXTENT, "geom")
+        ).select_from(tile)
+
+    def clusters_query(
+        self, zoom: int, *, filter: Optional[ClauseElement] = None
+    ) -> Select:
+        """Create the query of the clusters of stations at a zoom level of a web
+        map: the stations are grouped by the cell of a grid whose cells are an
+        eighth of a tile wide.
+
+        Parameters
+        ----------
+        zoom : int
+        filter : Optional[ClauseElement]
+            Only cluster the matching stations, see `map_filter`.
+
+        Returns
+        -------
+        Select
+            The query of the clusters, with the `longitude` and `latitude` of their
+            center, the `count` of their stations, and the names of the `stations`.
+        """
+        cell_size = WEB_MERCATOR_WIDTH / 2**zoom / CLUSTER_CELLS_PER_TILE
+        mercator = func.ST_Transform(
+            self.model.coordinates, literal_column(str(WEB_MERCATOR))
+        )
+        center = func.ST_Transform(
+            func.ST_Centroid(func.ST_Collect(mercator)), literal_column(str(SRID))
+        )
+        query = (
+            select(
+                func.ST_X(center, type_=Float).label("longitude"),
+                func.ST_Y(center, type_=Float).label("latitude"),
+                func.count().label("count"),
+                func.array_agg(
+                    aggregate_order_by(self.model.name, self.model.order)
+                ).label("stations"),
+            )
+            .group_by(func.ST_SnapToGrid(mercator, cell_size))
+            .order_by(func.min(self.model.order))
+        )
+        if filter is not None:
+            query = query.where(filter)
+        return query
+
+    def by_species_query(
+        self,
+        species_id: str,
+        *,
+        order_by: Optional[List[str]] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> Query:
+        """Create the query of the stations where a species was recorded.
+
+        Parameters
+        ----------
+        species_id : str
+        order_by : Optional[List[str]]
+            List of column names to order by. If a column name is prefixed with '-',
+            order it in descending order.
+        schema : Optional[Type[BaseModel]]
+            The response model of the stations, see `CRUDBase.project`.
+
+        Returns
+        -------
+        Query
+            The query, not bound to a session, see `CRUDBase.all_async`.
+        """
+        query: Query = (
+            Query([self.model])
+            .join(stations_species_table)
+            .filter(stations_species_table.c.species_id == species_id)
+        )
+        return self.project(self.order_by(query, order_by=order_by), schema)
+
+    def fao_area_counts_query(self) -> Select:
+        """Create the query of the number of stations, and of species recorded at
+        them, in each FAO area, from the `fao_area_counts` materialized view.
+        """
+        return select(fao_area_counts).order_by(fao_area_counts.c.fao_area)
 
 
 station = CRUDStation(Station)
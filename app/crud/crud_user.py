@@ -9,6 +9,8 @@ from app.schemas import UserCreate, UserPagination, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate, UserPagination]):
+    versioned = False
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         """get_by_email function fetches a User from the
             Database based on their email.
@@ -50,7 +52,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate, UserPagination]):
             is_superuser=obj_in.is_superuser,
         )
         db.add(db_obj)
-        db.commit()
+        self.commit(db)
         db.refresh(db_obj)
         return db_obj
 
@@ -0,0 +1,50 @@
+"""The aggregates of the stations and species, precomputed in materialized views.
+
+The views are created by the migrations, and refreshed with the data by
+`app/db/init_data.py`, so the counts are never computed per request. The changes
+made through the API are only counted after the next import, or after running
+`scripts/refresh_aggregates.sh`. The views are not part of `Base.metadata`, as
+they are not tables.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, text
+from sqlalchemy.orm import Session
+
+views_metadata = MetaData()
+
+# The number of species recorded at each station (without the genera, as in
+# `StationDetails.species`)
+station_species_counts = Table(
+    "station_species_counts",
+    views_metadata,
+    Column("station_id", String(length=20), primary_key=True),
+    Column("species_count", Integer, nullable=False),
+)
+
+# The number of stations where each species was recorded
+species_station_counts = Table(
+    "species_station_counts",
+    views_metadata,
+    Column("species_id", String(length=300), primary_key=True),
+    Column("station_count", Integer, nullable=False),
+)
+
+# The number of stations, and of the species recorded at them, in each FAO area
+fao_area_counts = Table(
+    "fao_area_counts",
+    views_metadata,
+    Column("fao_area", Integer, primary_key=True),
+    Column("station_count", Integer, nullable=False),
+    Column("species_count", Integer, nullable=False),
+)
+
+MATERIALIZED_VIEWS = [station_species_counts, species_station_counts, fao_area_counts]
+
+
+def refresh_aggregates(db: Session) -> None:
+    """Refresh the materialized views in the transaction of the session.
+
+    They are refreshed concurrently, so the API keeps reading the previous counts
+    until the transaction is committed.
+    """
+    for view in MATERIALIZED_VIEWS:
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
@@ -0,0 +1,113 @@
+"""Set-based loading of records, used by `app/db/init_data.py`.
+
+The records are written in batches of multi-row `INSERT ... ON CONFLICT`
+statements, in the transaction of the session, instead of one round-trip and one
+commit per record.
+"""
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type, Union
+
+from sqlalchemy import Table, delete, inspect, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def batched(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def table_of(model: Union[Type[Base], Table]) -> Table:
+    return model if isinstance(model, Table) else inspect(model).local_table
+
+
+def unique_by_key(rows: List[Dict[str, Any]], key: List[str]) -> List[Dict[str, Any]]:
+    """Keep the last of the rows with the same key, as a statement can't insert and
+    then update the same row."""
+    return list({tuple(row[name] for name in key): row for row in rows}.values())
+
+
+def upsert(
+    db: Session,
+    model: Union[Type[Base], Table],
+    rows: Iterable[Dict[str, Any]],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Insert the rows, or update them if a row with the same primary key exists.
+    The rows that only have the primary key are inserted if they don't exist.
+
+    Parameters
+    ----------
+    db : Session
+    model : Union[Type[Base], Table]
+    rows : Iterable[Dict[str, Any]]
+        The values of the columns, with the same columns in every row.
+    batch_size : int
+        The number of rows per statement.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    table = table_of(model)
+    key = [column.name for column in table.primary_key.columns]
+    count = 0
+    for batch in batched(rows, batch_size):
+        batch = unique_by_key(batch, key)
+        statement = insert(table)
+        columns = [name for name in batch[0] if name not in key]
+        if columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=key,
+                set_={name: statement.excluded[name] for name in columns},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=key)
+        db.execute(statement, batch)
+        count += len(batch)
+    return count
+
+
+def delete_keys(
+    db: Session,
+    model: Union[Type[Base], Table],
+    keys: List[Tuple[Any, ...]],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Delete the rows with the primary keys.
+
+    Returns
+    -------
+    int
+        The number of keys given.
+    """
+    table = table_of(model)
+    for batch in batched(keys, batch_size):
+        db.execute(delete(table).where(tuple_(*table.primary_key.columns).in_(batch)))
+    return len(keys)
+
+
+class Throughput:
+    """Measure the rows written per second."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.start
+
+    def __str__(self) -> str:
+        seconds = self.seconds
+        rate = self.rows / seconds if seconds > 0 else 0
+        return f"{self.rows} rows in {seconds:.2f} s ({rate:.0f} rows/s)"
@@ -0,0 +1,47 @@
+"""The files of the `data` submodule imported by `app/db/init_data.py`.
+
+The large files are parsed incrementally, one record at a time, so the memory used
+by the import doesn't grow with their size.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Tuple
+
+import ijson
+
+from app import PROJECT_ROOT
+
+DATA_ROOT = PROJECT_ROOT / "data"
+
+
+class DataFiles(NamedTuple):
+    species: Path
+    species_extra: Path
+    stations: Path
+    data_sources: Path
+    hathitrust: Path
+
+    @classmethod
+    def for_mode(cls, test_mode: bool) -> "DataFiles":
+        oceans1876 = DATA_ROOT / "Oceans1876"
+        data_dir = oceans1876 if not test_mode else DATA_ROOT / "Oceans1876_test"
+        return cls(
+            species=data_dir / "species.json",
+            species_extra=oceans1876 / "index_species_verified_extra.json",
+            stations=data_dir / "stations.json",
+            data_sources=oceans1876 / "data_sources.json",
+            hathitrust=DATA_ROOT / "HathiTrust" / "sections.csv",
+        )
+
+
+def read_species(path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield the record id and the data of each species of a `species.json` or an
+    `index_species_verified_extra.json` file."""
+    with open(path, "rb") as f:
+        # Floats instead of Decimals, as `json.load` returns
+        yield from ijson.kvitems(f, "species", use_float=True)
+
+
+def read_stations(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the data of each station of a `stations.json` file."""
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
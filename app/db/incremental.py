@@ -0,0 +1,144 @@
+"""Incremental imports, which only write the records whose content changed.
+
+The hash of the content of every imported record is stored in the
+`import_hashes` table, keyed on its table and primary key. The records of a new
+import are compared to the stored hashes to find the inserted, updated and
+deleted records.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Set, Type, Union
+
+from sqlalchemy import Table, delete, select
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+from app.db.bulk import DEFAULT_BATCH_SIZE, batched, delete_keys, table_of, upsert
+from app.models import ImportHash
+
+
+class Changes(NamedTuple):
+    table_name: str
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.table_name}: {self.inserted} inserted, {self.updated} updated, "
+            f"{self.deleted} deleted, {self.unchanged} unchanged"
+        )
+
+
+def row_key(table: Table, row: Dict[str, Any]) -> str:
+    return json.dumps([row[column.name] for column in table.primary_key.columns])
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    content = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def stored_hashes(db: Session, table: Table) -> Dict[str, str]:
+    result = db.execute(
+        select(ImportHash.key, ImportHash.hash).where(
+            ImportHash.table_name == table.name
+        )
+    )
+    return {key: hash for key, hash in result}
+
+
+def last_of_each_key(
+    table: Table, rows: Iterable[Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    """Keep the last of the consecutive rows with the same key, which is the one
+    `upsert` writes, e.g. of the common names of a species, which share its id."""
+    previous_key = None
+    previous = None
+    for row in rows:
+        key = row_key(table, row)
+        if previous is not None and key != previous_key:
+            yield previous
+        previous_key, previous = key, row
+    if previous is not None:
+        yield previous
+
+
+class TableDiff:
+    """Compare the rows of a table to their stored hashes, as they are read."""
+
+    def __init__(self, db: Session, model: Union[Type[Base], Table]) -> None:
+        self.table = table_of(model)
+        self.stored = stored_hashes(db, self.table)
+        self.seen: Set[str] = set()
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def changed(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the rows that are new or have changed. Of the consecutive rows with
+        the same key, only the last one is compared, as it is the one written."""
+        for row in last_of_each_key(self.table, rows):
+            key = row_key(self.table, row)
+            self.seen.add(key)
+            previous = self.stored.get(key)
+            if previous == row_hash(row):
+                self.unchanged += 1
+                continue
+            if previous is None:
+                self.inserted += 1
+            else:
+                self.updated += 1
+            yield row
+
+    def deleted(self) -> List[str]:
+        """The keys of the stored rows that were not read."""
+        return [key for key in self.stored if key not in self.seen]
+
+    def changes(self) -> Changes:
+        return Changes(
+            table_name=self.table.name,
+            inserted=self.inserted,
+            updated=self.updated,
+            deleted=len(self.deleted()),
+            unchanged=self.unchanged,
+        )
+
+
+def store_hashes(
+    db: Session, model: Union[Type[Base], Table], rows: List[Dict[str, Any]]
+) -> None:
+    """Store the hashes of the written rows."""
+    table = table_of(model)
+    upsert(
+        db,
+        ImportHash,
+        (
+            {
+                "table_name": table.name,
+                "key": row_key(table, row),
+                "hash": row_hash(row),
+            }
+            for row in rows
+        ),
+        batch_size=len(rows) or 1,
+    )
+
+
+def delete_rows(
+    db: Session,
+    model: Union[Type[Base], Table],
+    keys: List[str],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> None:
+    """Delete the rows with the keys, and their hashes."""
+    table = table_of(model)
+    for batch in batched(keys, batch_size):
+        delete_keys(db, table, [tuple(json.loads(key)) for key in batch])
+        db.execute(
+            delete(ImportHash).where(
+                ImportHash.table_name == table.name, ImportHash.key.in_(batch)
+            )
+        )
@@ -2,61 +2,84 @@ import argparse
 import csv
 import json
 import logging
+import multiprocessing
 from datetime import datetime
 from functools import reduce
-from typing import Dict, List
-
-from app import PROJECT_ROOT, crud, models, schemas
+from multiprocessing.pool import Pool
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from sqlalchemy import Table, select
+
+from app import crud, models, schemas
 from app.core.config import get_settings
 from app.db import base  # noqa: F401
+from app.db.aggregates import refresh_aggregates
+from app.db.base_class import Base
+from app.db.bulk import (
+    DEFAULT_BATCH_SIZE,
+    Throughput,
+    batched,
+    delete_keys,
+    table_of,
+    upsert,
+)
+from app.db.data_files import DataFiles, read_species, read_stations
+from app.db.incremental import Changes, TableDiff, delete_rows, store_hashes
+from app.db.records import (
+    species_common_name_row,
+    species_extra_row,
+    species_row,
+    species_synonym_row,
+    transform,
+)
 from app.db.session import SessionLocal
+from app.utils.dataset_version import dataset_version
+from app.utils.fuzzy_index import FuzzyIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Data Import")
 
 settings = get_settings()
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--testing", action="store_true")
-args = parser.parse_args()
-
 
 class Data:
-    def __init__(self, test_mode: bool) -> None:
+    def __init__(
+        self,
+        test_mode: bool,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        incremental: bool = False,
+        workers: int = 1,
+        report: bool = False,
+    ) -> None:
         self.db = SessionLocal()
-        self.data_sources: Dict[int, models.DataSource] = {}
-
-        species_path = (
-            PROJECT_ROOT
-            / "data"
-            / ("Oceans1876" if not test_mode else "Oceans1876_test")
-            / "species.json"
-        )
-
-        species_extra_path = (
-            PROJECT_ROOT / "data" / "Oceans1876" / "index_species_verified_extra.json"
-        )
-
-        stations_path = (
-            PROJECT_ROOT
-            / "data"
-            / ("Oceans1876" if not test_mode else "Oceans1876_test")
-            / "stations.json"
-        )
-
-        data_sources_path = PROJECT_ROOT / "data" / "Oceans1876" / "data_sources.json"
-
-        hathitrust_path = PROJECT_ROOT / "data" / "HathiTrust" / "sections.csv"
-
-        with open(species_path, "r") as f:
-            self.species = json.load(f)["species"]
-        with open(species_extra_path, "r") as f:
-            self.species_extra = json.load(f)["species"]
-        with open(stations_path, "r") as f:
-            self.stations = json.load(f)
-        with open(data_sources_path, "r") as f:
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self.workers = workers
+        self.report = report
+        # The worker processes converting the records, while this one writes them
+        self.pool: Optional[Pool] = None
+        self.changes: List[Changes] = []
+        # The keys of the removed records of each table, in the order of the imports
+        self.removed: List[Tuple[Union[Type[Base], Table], List[str]]] = []
+
+        self.files = DataFiles.for_mode(test_mode)
+        # The species ids by record id, of the species with a best result
+        self.species_ids: Dict[str, str] = {}
+
+        with open(self.files.data_sources, "r") as f:
             self.data_sources_dict = json.load(f)
-        with open(hathitrust_path, "r") as f:
+        with open(self.files.hathitrust, "r") as f:
             self.hathitrust_urls: Dict[str, str] = reduce(
                 lambda all_urls, section_props: all_urls.update(
                     {section_props["Section"]: section_props["Url"]}
@@ -69,9 +92,38 @@ class Data:
     def create_all(self) -> None:
         if settings.ENABLE_AUTH:
             self.create_superuser()
-        self.import_data_sources()
-        self.import_species()
-        self.import_stations()
+        # Everything is imported in one transaction, committed at the end.
+        throughput = Throughput()
+        if self.workers > 1:
+            self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+        try:
+            throughput.rows += self.import_data_sources()
+            throughput.rows += self.import_species()
+            throughput.rows += self.import_stations()
+        finally:
+            if self.pool:
+                self.pool.terminate()
+                self.pool = None
+        # The records referencing others are deleted first
+        for model, keys in reversed(self.removed):
+            delete_rows(self.db, model, keys, batch_size=self.batch_size)
+        refresh_aggregates(self.db)
+        # The API workers pick up the new version within DATASET_VERSION_TTL_SECONDS,
+        # which invalidates what they have cached of the previous data, including
+        # the totals of the paginated endpoints.
+        dataset_version.bump(self.db)
+        self.db.commit()
+        logger.info(f"Imported {throughput}")
+        if self.incremental:
+            logger.info("Changes:")
+            for changes in self.changes:
+                logger.info(f"  {changes}")
+        dataset_version.clear()
+        if self.report:
+            # The API workers rebuild their index when they read the new version
+            logger.info(
+                f"Fuzzy index of the data: {FuzzyIndex.from_db(self.db).report()}"
+            )
 
     def create_superuser(self) -> None:
         if settings.FIRST_SUPERUSER and settings.FIRST_SUPERUSER_PASSWORD:
@@ -91,12 +143,29 @@ class Data:
         else:
             logger.warning("Skipping creation of initial user")
 
-    def import_data_sources(self) -> None:
+    def load(self, model: Union[Type[Base], Table], rows: Iterable[Dict]) -> int:
+        """Write the rows of the table and their hashes, in batches. In incremental
+        mode, only the rows that changed are written, and the removed rows are
+        recorded to be deleted at the end of the import."""
+        throughput = Throughput()
+        table_diff = None
+        if self.incremental:
+            table_diff = TableDiff(self.db, model)
+            rows = table_diff.changed(rows)
+        for batch in batched(rows, self.batch_size):
+            throughput.rows += upsert(self.db, model, batch, batch_size=self.batch_size)
+            store_hashes(self.db, model, batch)
+        if table_diff:
+            self.changes.append(table_diff.changes())
+            self.removed.append((model, table_diff.deleted()))
+        logger.info(f"Imported {table_of(model).name}: {throughput}")
+        return throughput.rows
+
+    def import_data_sources(self) -> int:
         logger.info("Importing data sources")
 
+        data_sources = []
         for data_source_data in self.data_sources_dict.values():
-            logger.info(f"Importing Data Source: {data_source_data['title']}")
-
             obj_in = {
                 "id": data_source_data["id"],
                 "title": data_source_data["title"],
@@ -108,140 +177,60 @@ class Data:
                 "home_url": data_source_data.get("home_url"),
                 "url_template": data_source_data.get("urls", {}).get("web"),
             }
+            data_sources.append(schemas.DataSourceCreate(**obj_in).dict())
 
-            data_source = crud.data_source.get(self.db, data_source_data["id"])
-            if data_source:
-                data_source = crud.data_source.update(
-                    self.db,
-                    obj_in=schemas.DataSourceUpdate(**obj_in),
-                    db_obj=data_source,
-                )
-            else:
-                data_source = crud.data_source.create(
-                    self.db, obj_in=schemas.DataSourceCreate(**obj_in)
-                )
-            self.data_sources[data_source.id] = data_source
+        return self.load(models.DataSource, data_sources)
 
-    def import_species(self) -> None:
+    def import_species(self) -> int:
         logger.info("Importing species")
 
-        for record_id, sp in self.species.items():
-            logger.info(f"Importing species: {sp['name']} ({record_id})")
+        return (
+            self.load(models.Species, self.transform(species_row, self.species()))
+            + self.load(
+                models.SpeciesExtra,
+                self.transform(species_extra_row, self.species_extra("records")),
+            )
+            + self.load(
+                models.SpeciesSynonyms,
+                self.transform(species_synonym_row, self.species_extra("synonyms")),
+            )
+            + self.load(
+                models.SpeciesCommonNames,
+                self.transform(
+                    species_common_name_row, self.species_extra("common_names")
+                ),
+            )
+        )
+
+    def transform(
+        self, function: Callable[..., Dict], records: Iterable[Tuple]
+    ) -> Iterator[Dict]:
+        return transform(
+            function,
+            records,
+            pool=self.pool,
+            chunk_size=self.batch_size,
+            # Each worker converts a chunk while the next one waits
+            max_pending=2 * self.workers,
+        )
+
+    def species(self) -> Iterator[Tuple[Dict, Dict]]:
+        """Yield the data and the best result of the species with a best result."""
+        for record_id, sp in read_species(self.files.species):
             sp_data = sp.get("bestResult")
             if not sp_data:
                 continue
-            data_source = self.data_sources[sp_data["dataSourceId"]]
-            records = self.species_extra.get(record_id, {}).get("records", [])
-            synonyms = self.species_extra.get(record_id, {}).get("synonyms", [])
-            common_names = self.species_extra.get(record_id, {}).get("common_names", [])
-
-            obj_in = {
-                "id": sp["id"],
-                "record_id": sp_data["recordId"],
-                "current_record_id": sp_data["currentRecordId"],
-                "matched_name": sp_data["matchedName"],
-                "matched_canonical_simple_name": sp_data.get("matchedCanonicalSimple"),
-                "matched_canonical_full_name": sp_data.get("matchedCanonicalFull"),
-                "current_name": sp_data.get("currentName"),
-                "current_canonical_simple_name": sp_data.get("currentCanonicalSimple"),
-                "current_canonical_full_name": sp_data.get("currentCanonicalFull"),
-                "common_name": "",
-                "classification_path": sp_data.get("classificationPath"),
-                "classification_ranks": sp_data.get("classificationRanks"),
-                "classification_ids": sp_data.get("classificationIds"),
-                "outlink": sp_data.get("outlink"),
-                "data_source_id": data_source.id,
-            }
-
-            species = crud.species.get(self.db, sp["id"])
-            if species:
-                inserted_sp = crud.species.update(
-                    self.db, obj_in=schemas.SpeciesUpdate(**obj_in), db_obj=species
-                )
-            else:
-                inserted_sp = crud.species.create(
-                    self.db, obj_in=schemas.SpeciesCreate(**obj_in)
-                )
-
-            for record in records:
-
-                sp_extra_in = {
-                    "id": str(record["id"]),
-                    "scientific_name": f"{record['scientificname']} {record['authority']}",
-                    "status": True if record["status"] == "accepted" else False,
-                    "unaccepted_reason": record["unacceptreason"],
-                    "valid_name": f"{record['valid_name']} {record['valid_authority']}",
-                    "lsid": record["lsid"],
-                    "isBrackish": record["isBrackish"]
-                    if record["isBrackish"] is not None
-                    else False,
-                    "isExtinct": record["isExtinct"]
-                    if record["isExtinct"] is not None
-                    else False,
-                    "isFreshwater": record["isFreshwater"]
-                    if record["isFreshwater"] is not None
-                    else False,
-                    "isMarine": record["isMarine"]
-                    if record["isMarine"] is not None
-                    else False,
-                    "isTerrestrial": record["isTerrestrial"]
-                    if record["isTerrestrial"] is not None
-                    else False,
-                    "species_id": inserted_sp.id,
-                }
-
-                species_ex = crud.species_extra.get(self.db, str(record["id"]))
-                if species_ex:
-                    crud.species_extra.update(
-                        self.db,
-                        obj_in=schemas.SpeciesExtraUpdate(**sp_extra_in),
-                        db_obj=species_ex,
-                    )
-                else:
-                    crud.species_extra.create(
-                        self.db, obj_in=schemas.SpeciesExtraCreate(**sp_extra_in)
-                    )
-
-            for syn in synonyms:
-                sp_syn_in = {
-                    "id": str(syn["id"]),
-                    "scientific_name": f"{syn['scientificname']} {syn['authority']}",
-                    "outlink": syn["url"],
-                    "species_id": inserted_sp.id,
-                }
-
-                species_syn = crud.species_synonyms.get(self.db, str(syn["id"]))
-                if species_syn:
-                    crud.species_synonyms.update(
-                        self.db,
-                        obj_in=schemas.SpeciesSynonymsUpdate(**sp_syn_in),
-                        db_obj=species_syn,
-                    )
-                else:
-                    crud.species_synonyms.create(
-                        self.db, obj_in=schemas.SpeciesSynonymsCreate(**sp_syn_in)
-                    )
-
-            for comm_name in common_names:
-                sp_comm_name_in = {
-                    "id": sp["id"],
-                    "language": comm_name["language"],
-                    "name": comm_name["vernacular"],
-                    "species_id": inserted_sp.id,
-                }
-
-                species_comm_name = crud.species_common_names.get(self.db, sp["id"])
-                if species_comm_name:
-                    crud.species_common_names.update(
-                        self.db,
-                        obj_in=schemas.SpeciesCommonNamesUpdate(**sp_comm_name_in),
-                        db_obj=species_comm_name,
-                    )
-                else:
-                    crud.species_common_names.create(
-                        self.db,
-                        obj_in=schemas.SpeciesCommonNamesCreate(**sp_comm_name_in),
-                    )
+            self.species_ids[record_id] = sp["id"]
+            yield sp, sp_data
+
+    def species_extra(self, field: str) -> Iterator[Tuple[str, Dict]]:
+        """Yield the species id and each item of a field of the extra data of the
+        imported species."""
+        for record_id, extra in read_species(self.files.species_extra):
+            species_id = self.species_ids.get(record_id)
+            if species_id:
+                for item in extra.get(field, []):
+                    yield species_id, item
 
     def get_hathitrust_url(self, ranges: List[List[str]]) -> List[str]:
         urls = []
@@ -252,69 +241,136 @@ class Data:
             )
         return urls
 
-    def import_stations(self) -> None:
+    def import_stations(self) -> int:
         logger.info("Importing stations")
 
-        # First remove all stations species relations
-        models.stations_species_table.delete()
-
-        for idx, station_data in enumerate(self.stations, start=1):
-            logger.info(f"Importing Station {station_data['Station']}")
-
-            longitude = station_data["Decimal Longitude"]
-            latitude = station_data["Decimal Latitude"]
-            coordinates = f"POINT ({longitude} {latitude})"
-
-            obj_in = {
-                "name": station_data["Station"],
-                "order": idx,
-                "sediment_sample": station_data.get("Sediment sample"),
-                "coordinates": coordinates,
-                "location": station_data["Location"],
-                "water_body": station_data["Water body"],
-                "sea_area": station_data.get("Sea Area"),
-                "place": station_data.get("Place"),
-                "date": datetime.strptime(station_data["Date"], "%d/%m/%Y"),
-                "fao_area": station_data["FAOarea"],
-                "gear": station_data.get("Gear"),
-                "depth_fathoms": station_data.get("Depth (fathoms)"),
-                "bottom_water_temp_c": station_data.get("Bottom water temperature (C)"),
-                "bottom_water_depth_fathoms": station_data.get(
-                    "Bottom water depth D (fathoms)"
-                ),
-                "specific_gravity_at_bottom": station_data.get(
-                    "Specific Gravity at bottom"
-                ),
-                "surface_temp_c": station_data.get("Surface temp (C)"),
-                "specific_gravity_at_surface": station_data.get(
-                    "Specific Gravity at surface"
-                ),
-                "water_temp_c_at_depth_fathoms": station_data["Temp (F) at Fathoms"],
-                "text": station_data["HathiTrust"]["Text"],
-                "hathitrust_urls": self.get_hathitrust_url(
-                    station_data["HathiTrust"]["Range"]
-                ),
-            }
-
-            station = crud.station.get(self.db, station_data["Station"])
-            if station:
-                station = crud.station.update(self.db, obj_in=obj_in, db_obj=station)
-            else:
-                station = crud.station.create(self.db, obj_in=obj_in)
-
-            station_species = set()
-            for sp in station_data["Species"]:
-                if sp.get("recordId") and sp["recordId"] not in station_species:
-                    station_species.add(sp["recordId"])
-                    species = crud.species.get(
-                        self.db, self.species[sp["recordId"]]["id"]
-                    )
-                    if species:
-                        station.species.append(species)
+        # The (station name, species id) pairs of the links in the data file
+        links: Set[Tuple[str, str]] = set()
+
+        def station_rows() -> Iterator[Dict]:
+            for idx, station_data in enumerate(
+                read_stations(self.files.stations), start=1
+            ):
+                yield self.station_row(idx, station_data)
+                for sp in station_data["Species"]:
+                    species_id = self.species_ids.get(sp.get("recordId"))
+                    # Only link the imported species, i.e. with a best result
+                    if species_id:
+                        links.add((station_data["Station"], species_id))
+
+        # The stations are written before their links to the species
+        count = self.load(models.Station, station_rows())
+        return count + self.link_species(links)
+
+    def link_species(self, links: Set[Tuple[str, str]]) -> int:
+        """Make the links between the stations and the species match the data file,
+        deleting the stale links and inserting the missing ones."""
+        throughput = Throughput()
+        table = models.stations_species_table
+        existing = {
+            (station_id, species_id)
+            for station_id, species_id in self.db.execute(
+                select(table.c.station_id, table.c.species_id)
+            )
+        }
+        stale = existing - links
+        missing = links - existing
+        delete_keys(self.db, table, list(stale), batch_size=self.batch_size)
+        throughput.rows = upsert(
+            self.db,
+            table,
+            (
+                {"station_id": station_id, "species_id": species_id}
+                for station_id, species_id in missing
+            ),
+            batch_size=self.batch_size,
+        )
+        changes = Changes(
+            table_name=table.name,
+            inserted=len(missing),
+            updated=0,
+            deleted=len(stale),
+            unchanged=len(links) - len(missing),
+        )
+        self.changes.append(changes)
+        logger.info(f"Imported {table.name}: {throughput}")
+        return throughput.rows
+
+    def station_row(self, idx: int, station_data: Dict) -> Dict:
+        longitude = station_data["Decimal Longitude"]
+        latitude = station_data["Decimal Latitude"]
+        coordinates = f"POINT ({longitude} {latitude})"
+
+        return {
+            "name": station_data["Station"],
+            "order": idx,
+            "sediment_sample": station_data.get("Sediment sample"),
+            "coordinates": coordinates,
+            "location": station_data["Location"],
+            "water_body": station_data["Water body"],
+            "sea_area": station_data.get("Sea Area"),
+            "place": station_data.get("Place"),
+            "date": datetime.strptime(station_data["Date"], "%d/%m/%Y"),
+            "fao_area": station_data["FAOarea"],
+            "gear": station_data.get("Gear"),
+            "depth_fathoms": station_data.get("Depth (fathoms)"),
+            "bottom_water_temp_c": station_data.get("Bottom water temperature (C)"),
+            "bottom_water_depth_fathoms": station_data.get(
+                "Bottom water depth D (fathoms)"
+            ),
+            "specific_gravity_at_bottom": station_data.get(
+                "Specific Gravity at bottom"
+            ),
+            "surface_temp_c": station_data.get("Surface temp (C)"),
+            "specific_gravity_at_surface": station_data.get(
+                "Specific Gravity at surface"
+            ),
+            "water_temp_c_at_depth_fathoms": station_data["Temp (F) at Fathoms"],
+            "text": station_data["HathiTrust"]["Text"],
+            "hathitrust_urls": self.get_hathitrust_url(
+                station_data["HathiTrust"]["Range"]
+            ),
+        }
 
 
 if __name__ == "__main__":
+    # Not parsed on import, e.g. by the worker processes, which are spawned
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--testing", action="store_true")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="The number of rows written per statement.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only write the records that changed since the last import, and delete "
+        "the records that were removed.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="The number of processes converting the species records to rows, while "
+        "the main process writes them.",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="Report the footprint of the in-memory fuzzy index of the imported "
+        "species, see FUZZY_INDEX_ENABLED.",
+    )
+    args = parser.parse_args()
+
     logger.info("Creating initial data")
-    data = Data(test_mode=args.testing)
+    data = Data(
+        test_mode=args.testing,
+        batch_size=args.batch_size,
+        incremental=args.incremental,
+        workers=args.workers,
+        report=args.report,
+    )
     data.create_all()
     logger.info("Initial data created")
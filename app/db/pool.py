@@ -0,0 +1,75 @@
+"""Connection pools that export their checkout wait time and saturation as metrics.
+
+The pools are labeled with the `pool_logging_name` of their engine.
+"""
+import time
+from typing import Any
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.utils.metrics import counter, gauge, histogram
+
+checkout_wait = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+checkout_timeouts = counter(
+    "db_pool_checkout_timeouts_total",
+    "Number of times no connection was available before the pool timeout.",
+    ["pool"],
+)
+checked_out = gauge(
+    "db_pool_checked_out_connections",
+    "Number of connections in use.",
+    ["pool"],
+)
+saturation = gauge(
+    "db_pool_saturation_ratio",
+    "Connections in use over the maximum number of connections of the pool.",
+    ["pool"],
+)
+
+
+class InstrumentedPoolMixin:
+    def _do_get(self) -> Any:
+        pool_name = getattr(self, "_orig_logging_name", None) or "default"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore
+        except TimeoutError:
+            checkout_timeouts.inc(pool=pool_name)
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - start, pool=pool_name)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def register_pool_gauges(engine: Engine, name: str) -> None:
+    """Export the number of connections in use by the pool of the engine.
+    The pool is looked up at collection time, as disposing the engine replaces it."""
+
+    def in_use() -> float:
+        pool = engine.pool
+        return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+    def ratio() -> float:
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return 0
+        # A negative max overflow means there is no limit
+        size = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return pool.checkedout() / size if size else 0
+
+    checked_out.set_function(in_use, pool=name)
+    saturation.set_function(ratio, pool=name)
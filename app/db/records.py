@@ -0,0 +1,126 @@
+"""The conversion of the records of the data files to the rows of the tables.
+
+The conversions are pure functions of the records, so `transform` can run them in
+worker processes.
+"""
+from collections import deque
+from multiprocessing.pool import AsyncResult, Pool
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app import schemas
+from app.db.bulk import batched
+
+Row = Dict[str, Any]
+
+
+def species_row(sp: Dict, sp_data: Dict) -> Row:
+    obj_in = {
+        "id": sp["id"],
+        "record_id": sp_data["recordId"],
+        "current_record_id": sp_data["currentRecordId"],
+        "matched_name": sp_data["matchedName"],
+        "matched_canonical_simple_name": sp_data.get("matchedCanonicalSimple"),
+        "matched_canonical_full_name": sp_data.get("matchedCanonicalFull"),
+        "current_name": sp_data.get("currentName"),
+        "current_canonical_simple_name": sp_data.get("currentCanonicalSimple"),
+        "current_canonical_full_name": sp_data.get("currentCanonicalFull"),
+        "common_name": "",
+        "classification_path": sp_data.get("classificationPath"),
+        "classification_ranks": sp_data.get("classificationRanks"),
+        "classification_ids": sp_data.get("classificationIds"),
+        "outlink": sp_data.get("outlink"),
+        "data_source_id": sp_data["dataSourceId"],
+    }
+    return schemas.SpeciesCreate(**obj_in).dict()
+
+
+def species_extra_row(species_id: str, record: Dict) -> Row:
+    sp_extra_in = {
+        "id": str(record["id"]),
+        "scientific_name": f"{record['scientificname']} {record['authority']}",
+        "status": True if record["status"] == "accepted" else False,
+        "unaccepted_reason": record["unacceptreason"],
+        "valid_name": f"{record['valid_name']} {record['valid_authority']}",
+        "lsid": record["lsid"],
+        "isBrackish": record["isBrackish"]
+        if record["isBrackish"] is not None
+        else False,
+        "isExtinct": record["isExtinct"] if record["isExtinct"] is not None else False,
+        "isFreshwater": record["isFreshwater"]
+        if record["isFreshwater"] is not None
+        else False,
+        "isMarine": record["isMarine"] if record["isMarine"] is not None else False,
+        "isTerrestrial": record["isTerrestrial"]
+        if record["isTerrestrial"] is not None
+        else False,
+        "species_id": species_id,
+    }
+    return schemas.SpeciesExtraCreate(**sp_extra_in).dict()
+
+
+def species_synonym_row(species_id: str, syn: Dict) -> Row:
+    sp_syn_in = {
+        "id": str(syn["id"]),
+        "scientific_name": f"{syn['scientificname']} {syn['authority']}",
+        "outlink": syn["url"],
+        "species_id": species_id,
+    }
+    return schemas.SpeciesSynonymsCreate(**sp_syn_in).dict()
+
+
+def species_common_name_row(species_id: str, comm_name: Dict) -> Row:
+    # The common names of a species share its id, so only the last one is kept, see
+    # `app.db.incremental.last_of_each_key`.
+    sp_comm_name_in = {
+        "id": species_id,
+        "language": comm_name["language"],
+        "name": comm_name["vernacular"],
+        "species_id": species_id,
+    }
+    return schemas.SpeciesCommonNamesCreate(**sp_comm_name_in).dict()
+
+
+def transform_chunk(function: Callable[..., Row], chunk: List[Tuple]) -> List[Row]:
+    return [function(*args) for args in chunk]
+
+
+def transform(
+    function: Callable[..., Row],
+    records: Iterable[Tuple],
+    *,
+    pool: Optional[Pool] = None,
+    chunk_size: int = 1000,
+    max_pending: int = 4,
+) -> Iterator[Row]:
+    """Convert the records to rows, in the order of the records.
+
+    Parameters
+    ----------
+    function : Callable[..., Row]
+        The conversion, called with the items of each record as arguments.
+    records : Iterable[Tuple]
+    pool : Optional[Pool]
+        Convert chunks of records in the worker processes of the pool, while the
+        rows of the previous chunks are consumed, instead of in this process.
+    chunk_size : int
+        The number of records sent to a worker at once.
+    max_pending : int
+        The number of chunks sent to the workers ahead of the consumer, which bounds
+        the records held in memory.
+
+    Yields
+    ------
+    Row
+    """
+    if pool is None:
+        for args in records:
+            yield function(*args)
+        return
+
+    pending: Deque[AsyncResult] = deque()
+    for chunk in batched(records, chunk_size):
+        pending.append(pool.apply_async(transform_chunk, (function, chunk)))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().get()
+    while pending:
+        yield from pending.popleft().get()
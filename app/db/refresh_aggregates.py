@@ -0,0 +1,18 @@
+"""Refresh the materialized views of `app.db.aggregates`, e.g. after changing the
+stations or the species through the API, which doesn't refresh them."""
+import logging
+
+from app.db.aggregates import refresh_aggregates
+from app.db.session import SessionLocal
+from app.utils.dataset_version import dataset_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("Aggregates")
+
+if __name__ == "__main__":
+    with SessionLocal() as db:
+        refresh_aggregates(db)
+        # The cached responses include the counts
+        dataset_version.bump(db)
+        db.commit()
+    logger.info("Aggregates refreshed")
@@ -1,9 +1,92 @@
-from sqlalchemy import create_engine
+import os
+from typing import Any, Dict, Type
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, Pool
 
 from app.core.config import get_settings
+from app.db.pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    register_pool_gauges,
+)
 
 settings = get_settings()
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), pool_pre_ping=True)
+
+def engine_options(pool_name: str, *, is_async: bool = False) -> Dict[str, Any]:
+    """Return the `create_engine` arguments for the pool and timeout settings."""
+    poolclass: Type[Pool] = (
+        InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool
+    )
+    # asyncpg connections belong to the event loop they are opened in, and the test
+    # client runs a new loop for each test module, so they are not pooled in tests.
+    if settings.DB_PGBOUNCER or (is_async and os.environ.get("PYTHON_TEST")):
+        poolclass = NullPool
+
+    options: Dict[str, Any] = {
+        "poolclass": poolclass,
+        "pool_logging_name": pool_name,
+        "pool_pre_ping": True,
+    }
+    if poolclass is not NullPool:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    connect_args: Dict[str, Any] = {}
+    if settings.DB_PGBOUNCER:
+        if is_async:
+            # PgBouncer can't keep prepared statements across transactions.
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+    elif settings.DB_STATEMENT_TIMEOUT:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT)
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": timeout}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def set_statement_timeout_per_transaction(engine: Engine) -> None:
+    """Set the statement timeout at the start of every transaction, as session
+    settings would leak to the other clients of a PgBouncer server connection."""
+
+    @event.listens_for(engine, "begin")
+    def set_statement_timeout(connection: Connection) -> None:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT)}"
+        )
+
+
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **engine_options("sync"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_ASYNC_DATABASE_URI),
+    **engine_options("async", is_async=True),
+)
+# The endpoints serialize the records after the session is done with them,
+# so they must not be expired, and lazy loading isn't possible with asyncio.
+AsyncSessionLocal = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT:
+    set_statement_timeout_per_transaction(engine)
+    set_statement_timeout_per_transaction(async_engine.sync_engine)
+
+register_pool_gauges(engine, "sync")
+register_pool_gauges(async_engine.sync_engine, "async")
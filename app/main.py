@@ -5,12 +5,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import PlainTextResponse, Response
 
 from app import PROJECT_ROOT
 from app.api.v1.router import api_router
 from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.utils.fuzzy_index import refresh_fuzzy_index
+from app.utils.http_cache import http_cache_middleware
 from app.utils.logger import logger
+from app.utils.metrics import registry
 
 settings = get_settings()
 
@@ -42,6 +46,9 @@ if settings.BACKEND_CORS_ORIGINS:
     )
 
 
+app.middleware("http")(http_cache_middleware)
+
+
 async def catch_exceptions_middleware(
     request: Request, call_next: Callable[[Request], Awaitable[Response]]
 ) -> Response:
@@ -68,4 +75,27 @@ async def catch_exceptions_middleware(
 
 app.middleware("http")(catch_exceptions_middleware)
 
+
+@app.on_event("startup")
+def build_fuzzy_index() -> None:
+    """Build the in-memory fuzzy index of the species names, if it's enabled.
+    It is rebuilt after an import, see `refresh_fuzzy_index_if_stale`."""
+    if settings.FUZZY_INDEX_ENABLED:
+        db = SessionLocal()
+        try:
+            refresh_fuzzy_index(db)
+        finally:
+            db.close()
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> Response:
+        """Export the metrics in the Prometheus text format."""
+        return PlainTextResponse(
+            registry.render(), media_type="text/plain; version=0.0.4"
+        )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
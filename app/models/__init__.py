@@ -1,4 +1,6 @@
 from .data_source import DataSource
+from .dataset_version import DatasetVersion
+from .import_hash import ImportHash
 from .species import Species, SpeciesCommonNames, SpeciesExtra, SpeciesSynonyms
 from .station import Station, stations_species_table
 from .user import User
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, func
+
+from app.db.base_class import Base
+
+
+class DatasetVersion(Base):
+    """The version of the species, stations and data sources, bumped every time
+    they change. It has a single row."""
+
+    __tablename__ = "dataset_version"
+
+    id: int = Column(Integer, primary_key=True, default=1)
+    version: int = Column(Integer, nullable=False, default=1)
+    updated_at: datetime = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
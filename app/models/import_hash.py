@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String
+
+from app.db.base_class import Base
+
+
+class ImportHash(Base):
+    """The hash of the content of each imported record, for the incremental imports
+    of `app/db/init_data.py` to only write what changed."""
+
+    __tablename__ = "import_hashes"
+
+    table_name: str = Column(String(length=100), primary_key=True)
+    # The JSON array of the primary key of the record
+    key: str = Column(String(length=700), primary_key=True)
+    hash: str = Column(String(length=64), nullable=False)
@@ -1,8 +1,19 @@
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
-
+from sqlalchemy import (
+    Boolean,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+    select,
+)
+from sqlalchemy.orm import column_property, relationship
+
+from app.db.aggregates import species_station_counts
 from app.db.base_class import Base
 from app.models.station import stations_species_table
 
@@ -32,6 +43,14 @@ class SpeciesExtra(Base):
 
 class SpeciesCommonNames(Base):
     __tablename__ = "species_common_names"
+    __table_args__ = (
+        Index(
+            "ix_species_common_names_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: str = Column(String(length=300), primary_key=True, index=True)
     language: str = Column(String(length=300), nullable=False)
@@ -44,6 +63,14 @@ class SpeciesCommonNames(Base):
 
 class SpeciesSynonyms(Base):
     __tablename__ = "species_synonyms"
+    __table_args__ = (
+        Index(
+            "ix_species_synonyms_scientific_name_trgm",
+            "scientific_name",
+            postgresql_using="gin",
+            postgresql_ops={"scientific_name": "gin_trgm_ops"},
+        ),
+    )
 
     id: str = Column(String(length=300), primary_key=True, index=True)
     scientific_name: Optional[str] = Column(String(length=300), nullable=True)
@@ -56,6 +83,21 @@ class SpeciesSynonyms(Base):
 
 class Species(Base):
     __tablename__ = "species"
+    # Trigram indexes for fuzzy search on the names
+    __table_args__ = (
+        Index(
+            "ix_species_matched_canonical_full_name_trgm",
+            "matched_canonical_full_name",
+            postgresql_using="gin",
+            postgresql_ops={"matched_canonical_full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_species_current_name_trgm",
+            "current_name",
+            postgresql_using="gin",
+            postgresql_ops={"current_name": "gin_trgm_ops"},
+        ),
+    )
 
     id: str = Column(String(length=300), primary_key=True, index=True)
     record_id: str = Column(String(length=300), index=True, unique=True, nullable=False)
@@ -73,6 +115,15 @@ class Species(Base):
     outlink: Optional[str] = Column(String(length=300))
 
     data_source_id: int = Column(Integer, ForeignKey("data_sources.id"), nullable=False)
+    # Read from the materialized view, 0 until it is refreshed with the species
+    station_count: int = column_property(
+        func.coalesce(
+            select(species_station_counts.c.station_count)
+            .where(species_station_counts.c.species_id == id)
+            .scalar_subquery(),
+            0,
+        )
+    )
 
     data_source: "DataSource" = relationship("DataSource", back_populates="species")
     stations: List["Station"] = relationship(
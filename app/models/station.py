@@ -1,22 +1,25 @@
 from datetime import date  # noqa
 from typing import TYPE_CHECKING, Dict, List, Optional
 
-from geoalchemy2 import WKBElement
 from sqlalchemy import (
     JSON,
     Column,
     Date,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
     Text,
+    func,
+    select,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 
+from app.db.aggregates import station_species_counts
 from app.db.base_class import Base
-from app.utils.db import Geometry
+from app.utils.db import Point, geography
 
 if TYPE_CHECKING:
     from app.models import Species
@@ -35,8 +38,9 @@ class Station(Base):
     name: str = Column(String(length=20), primary_key=True, index=True)
     order: int = Column(Integer, nullable=False)
     sediment_sample: Optional[str] = Column(String(length=50))
-    coordinates: WKBElement = Column(
-        Geometry("POINT", srid=4326, spatial_index=True),
+    # [longitude, latitude]
+    coordinates: List[float] = Column(
+        Point("POINT", srid=4326, spatial_index=True),
         nullable=False,
     )
     location: str = Column(String(length=200), nullable=False)
@@ -57,7 +61,25 @@ class Station(Base):
     )
     text: str = Column(Text, nullable=False)
     hathitrust_urls: List[str] = Column(JSON, default=[], nullable=False)
+    # Read from the materialized view, 0 until it is refreshed with the station
+    species_count: int = column_property(
+        func.coalesce(
+            select(station_species_counts.c.species_count)
+            .where(station_species_counts.c.station_id == name)
+            .scalar_subquery(),
+            0,
+        )
+    )
 
     species: List["Species"] = relationship(
         "Species", back_populates="stations", secondary=stations_species_table
     )
+
+
+# For the distances in meters of the radius and nearest neighbour queries, see
+# `CRUDStation`. The geometry index of the coordinates is used by the bounding boxes.
+Index(
+    "ix_stations_coordinates_geography",
+    geography(Station.coordinates),
+    postgresql_using="gist",
+)
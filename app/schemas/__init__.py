@@ -20,6 +20,7 @@ from .species import (
     SpeciesExtraSummary,
     SpeciesExtraSummaryPagination,
     SpeciesExtraUpdate,
+    SpeciesFuzzyMatch,
     SpeciesFuzzySummary,
     SpeciesSummary,
     SpeciesSummaryPagination,
@@ -29,9 +30,12 @@ from .species import (
     SpeciesUpdate,
 )
 from .station import (
+    FAOAreaCount,
+    StationCluster,
     StationCreate,
     StationDetails,
     StationDetailsInDB,
+    StationDistance,
     StationSummary,
     StationSummaryInDB,
     StationSummaryPagination,
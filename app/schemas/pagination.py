@@ -5,6 +5,8 @@ from pydantic import BaseModel
 
 class PaginationBase(BaseModel):
     count: int
+    # Whether `count` is the planner's estimate of the number of records
+    count_estimated: bool = False
     first_page: str
     last_page: str
     previous_page: Optional[str]
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Union
 
 from pydantic import BaseModel, Field, validator
 
@@ -27,6 +27,9 @@ class Expression(BaseModel):
     fuzzy: bool = False
     min_string_similarity: Optional[float] = Field(default=0.1)
 
+    def column_names(self) -> Set[str]:
+        return {self.column_name}
+
     def uses_column(self, name: str) -> bool:
         return self.column_name == name
 
@@ -49,11 +52,16 @@ class ExpressionGroup(BaseModel):
             raise ValueError("a join operator is not needed for one expression")
         return v
 
-    def uses_column(self, name: str) -> bool:
+    def column_names(self) -> Set[str]:
+        """Return the names of the columns of the expressions, and of the
+        expressions of the nested groups."""
+        names: Set[str] = set()
         for expression in self.expressions:
-            if expression.uses_column(name):
-                return True
-        return False
+            names |= expression.column_names()
+        return names
+
+    def uses_column(self, name: str) -> bool:
+        return name in self.column_names()
 
 
 ExpressionGroup.update_forward_refs()
@@ -124,6 +124,9 @@ class SpeciesBase(BaseModel):
 
 
 class SpeciesSummaryInDB(SpeciesBase):
+    # The number of stations where the species was recorded
+    station_count: int
+
     class Config:
         orm_mode = True
 
@@ -132,6 +135,15 @@ class SpeciesSummary(SpeciesSummaryInDB):
     pass
 
 
+class SpeciesFuzzyMatch(SpeciesSummary):
+    # The word similarity of the best matching name with the query, rounded to
+    # `app.utils.fuzzy_index.SCORE_DIGITS`
+    score: float
+    # See `app.utils.fuzzy_index.NAME_FIELDS`
+    matched_field: str
+    matched_name: str
+
+
 class SpeciesFuzzySummary(SpeciesSummaryInDB):
     species_synonyms: List[SpeciesSynonyms]
     species_common_names: List[SpeciesCommonNames]
@@ -1,11 +1,9 @@
 """Pydantic models for representing station data extracted by `challenger-workflows`.
 """
-import json
 from datetime import date
 from typing import Dict, List, Optional
 
-from geoalchemy2 import WKBElement
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field
 
 from app.schemas import PaginationBase
 from app.schemas.species import SpeciesSummary
@@ -20,13 +18,11 @@ class StationBase(BaseModel):
     gear: Optional[str]
     sediment_sample: Optional[str]
 
-    @validator("coordinates", pre=True)
-    def to_point(cls, value: WKBElement) -> List[float]:
-        """Convert the WKBElement received from SQLAlchemy to a list of long and lat."""
-        return json.loads(value.data)["coordinates"]
-
 
 class StationSummaryInDB(StationBase):
+    # The number of species recorded at the station
+    species_count: int
+
     class Config:
         orm_mode = True
 
@@ -35,6 +31,29 @@ class StationSummary(StationSummaryInDB):
     pass
 
 
+class StationDistance(StationSummary):
+    # In meters, from the point of the query
+    distance: float
+
+
+class StationCluster(BaseModel):
+    # The center of the stations, [longitude, latitude]
+    coordinates: List[float] = Field(min_items=2, max_items=2)
+    count: int
+    # The names of the stations, in the order of the expedition
+    stations: List[str]
+
+
+class FAOAreaCount(BaseModel):
+    fao_area: int
+    station_count: int
+    # The species recorded at the stations of the area
+    species_count: int
+
+    class Config:
+        orm_mode = True
+
+
 class StationSummaryPagination(PaginationBase):
     results: List[StationSummary]
 
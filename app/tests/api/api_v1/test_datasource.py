@@ -1,7 +1,10 @@
+from datetime import date
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app import crud, schemas
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -10,6 +13,34 @@ settings = get_settings()
 def test_read_data_sources(client: TestClient, db: Session) -> None:
     r = client.get(f"{settings.API_V1_STR}/data_source/")
     assert r.status_code == 200
+    data_sources = r.json()
+    assert data_sources["count"] == len(data_sources["results"])
+    assert data_sources["count_estimated"] is False
+
+
+def read_count(client: TestClient) -> int:
+    r = client.get(f"{settings.API_V1_STR}/data_source/")
+    assert r.status_code == 200
+    return r.json()["count"]
+
+
+def test_data_source_count_follows_the_writes(client: TestClient, db: Session) -> None:
+    count = read_count(client)
+    data_source_in = schemas.DataSourceCreate(
+        id=1_000_000,
+        title="Test data source",
+        title_short="Test",
+        curation="Not curated",
+        updated_at=date(1876, 5, 24),
+        is_out_link_ready=False,
+    )
+    crud.data_source.create(db, obj_in=data_source_in)
+    try:
+        # The cached count of the data sources is dropped by the write
+        assert read_count(client) == count + 1
+    finally:
+        crud.data_source.remove(db, id=data_source_in.id)
+    assert read_count(client) == count
 
 
 # [1, 2, 3, 4] are the ID's of the data sources which should be tested in the database.
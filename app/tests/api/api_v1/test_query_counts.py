@@ -0,0 +1,33 @@
+"""The number of SQL statements each endpoint runs, to catch the relationships
+loaded with a query per record."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.db.session import async_engine
+from app.tests.utils.utils import record_statements
+
+settings = get_settings()
+
+
+@pytest.mark.parametrize(
+    "path, statements_count",
+    [
+        # The species, then its extra records, synonyms and common names
+        ("/species/136d74e4-2f2d-5387-8374-bd04ff82ea58", 4),
+        # The station, then its species
+        ("/stations/I", 2),
+        ("/data_source/1", 1),
+    ],
+)
+def test_detail_endpoint_statements(
+    client: TestClient, path: str, statements_count: int
+) -> None:
+    # Caches the dataset version, which the next request doesn't query then
+    r = client.get(f"{settings.API_V1_STR}{path}")
+    assert r.status_code == 200
+
+    with record_statements(async_engine.sync_engine) as statements:
+        r = client.get(f"{settings.API_V1_STR}{path}")
+    assert r.status_code == 200
+    assert len(statements) == statements_count, statements
@@ -1,8 +1,13 @@
+from typing import Any, Dict
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app import crud
 from app.core.config import get_settings
+from app.utils import fuzzy_index
+from app.utils.fuzzy_index import NAME_FIELDS, refresh_fuzzy_index
 
 settings = get_settings()
 
@@ -27,3 +32,131 @@ def test_return_200_for_existing_species(
     assert 200 <= r.status_code < 300
     sp = r.json()
     assert sp["id"] == species_id
+
+
+def test_read_species_by_cursor(client: TestClient, db: Session) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/species/",
+        params={"cursor": "", "limit": 5, "order_by": "-matched_canonical_full_name"},
+    )
+    assert r.status_code == 200
+    first_page = r.json()
+    assert first_page["previous_page"] is None
+    assert first_page["next_page"]
+
+    r = client.get(first_page["next_page"])
+    assert r.status_code == 200
+    second_page = r.json()
+    first_ids = {sp["id"] for sp in first_page["results"]}
+    assert not first_ids & {sp["id"] for sp in second_page["results"]}
+
+    r = client.get(second_page["previous_page"])
+    assert r.status_code == 200
+    assert [sp["id"] for sp in r.json()["results"]] == [
+        sp["id"] for sp in first_page["results"]
+    ]
+
+
+def test_read_species_with_invalid_cursor(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/species/", params={"cursor": "invalid"})
+    assert r.status_code == 400
+
+
+def test_search_species_returns_full_pages_of_binomial_species(
+    client: TestClient, db: Session
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/species/search/",
+        params={"limit": 5},
+        json={"column_name": "id", "search_term": "", "operator": "ne"},
+    )
+    assert r.status_code == 200
+    species = r.json()
+    assert len(species) == 5
+    for sp in species:
+        species_in_db = crud.species.get(db, id=sp["id"])
+        assert species_in_db and species_in_db.current_canonical_simple_name
+        assert " " in species_in_db.current_canonical_simple_name
+
+
+@pytest.mark.parametrize("species_id", ["136d74e4-2f2d-5387-8374-bd04ff82ea58"])
+def test_read_species_stations(
+    client: TestClient, species_id: str, db: Session
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/species/{species_id}/stations/",
+        params={"order_by": "-species_count"},
+    )
+    assert r.status_code == 200
+    stations = r.json()
+    species = crud.species.get(db, id=species_id)
+    assert species is not None
+    assert len(stations) == species.station_count > 0
+    counts = [station["species_count"] for station in stations]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_fuzzy_search_ranks_each_species_once(client: TestClient, db: Session) -> None:
+    params: Dict[str, Any] = {
+        "query_str": "ophiura",
+        "min_string_similarity_score": 0.5,
+    }
+    r = client.get(f"{settings.API_V1_STR}/species/fuzzymatch/", params=params)
+    assert r.status_code == 200
+    species = r.json()
+    assert species
+    assert len({sp["id"] for sp in species}) == len(species)
+    scores = [sp["score"] for sp in species]
+    assert scores == sorted(scores, reverse=True)
+    assert min(scores) >= 0.5
+    assert {sp["matched_field"] for sp in species} <= set(NAME_FIELDS)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/species/fuzzymatch/", params={**params, "limit": 3}
+    )
+    assert r.status_code == 200
+    assert [sp["score"] for sp in r.json()] == scores[:3]
+
+
+def test_fuzzy_search_with_the_fuzzy_index(client: TestClient, db: Session) -> None:
+    params: Dict[str, Any] = {
+        "query_str": "ophiura",
+        "min_string_similarity_score": 0.4,
+    }
+    r = client.get(f"{settings.API_V1_STR}/species/fuzzymatch/", params=params)
+    assert r.status_code == 200
+    species = r.json()
+
+    refresh_fuzzy_index(db)
+    try:
+        r = client.get(f"{settings.API_V1_STR}/species/fuzzymatch/", params=params)
+    finally:
+        fuzzy_index._fuzzy_index = None
+    assert r.status_code == 200
+    # The same scores, in the same JSON, whichever computed them
+    assert sorted(r.json(), key=lambda sp: sp["id"]) == sorted(
+        species, key=lambda sp: sp["id"]
+    )
+
+
+@pytest.mark.parametrize("similarity, found", [(1.5, False), (-0.1, True)])
+def test_fuzzy_search_out_of_range_similarity(
+    client: TestClient, db: Session, similarity: float, found: bool
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/species/fuzzymatch/",
+        params={"query_str": "ophiura", "min_string_similarity_score": similarity},
+    )
+    assert r.status_code == 200
+    assert bool(r.json()) is found
+
+    expressions = {
+        "column_name": "current_name",
+        "search_term": "ophiura",
+        "operator": "eq",
+        "fuzzy": True,
+        "min_string_similarity": similarity,
+    }
+    r = client.post(f"{settings.API_V1_STR}/species/search/", json=expressions)
+    assert r.status_code == 200
+    assert bool(r.json()) is found
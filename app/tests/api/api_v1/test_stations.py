@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -29,3 +31,184 @@ def test_return_404_for_non_existing_station(
 ) -> None:
     r = client.get(f"{settings.API_V1_STR}/stations/{station_id}")
     assert r.status_code == 404
+
+
+@pytest.mark.parametrize("stream", ["json", "ndjson"])
+def test_read_all_stations_streaming(
+    client: TestClient, stream: str, db: Session
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/all/", params={"order_by": "name"})
+    assert r.status_code == 200
+    stations = r.json()
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/all/",
+        params={"order_by": "name", "stream": stream},
+    )
+    assert r.status_code == 200
+    if stream == "json":
+        assert r.json() == stations
+    else:
+        assert [json.loads(line) for line in r.text.splitlines()] == stations
+
+
+def test_read_all_stations_not_modified(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/all/")
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"].startswith("public")
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/all/",
+        headers={"If-None-Match": r.headers["ETag"]},
+    )
+    assert r.status_code == 304
+    assert not r.content
+
+
+def test_search_stations_cached(client: TestClient, db: Session) -> None:
+    expressions: dict = {
+        "join": "OR",
+        "expressions": [
+            {"column_name": "name", "search_term": "I", "operator": "eq"},
+            {"column_name": "name", "search_term": "II", "operator": "eq"},
+        ],
+    }
+    r = client.post(f"{settings.API_V1_STR}/stations/search/", json=expressions)
+    assert r.status_code == 200
+    stations = r.json()
+    assert {station["name"] for station in stations} == {"I", "II"}
+
+    # The same search with the expressions in another order is served from the cache
+    expressions["expressions"].reverse()
+    r = client.post(f"{settings.API_V1_STR}/stations/search/", json=expressions)
+    assert r.status_code == 200
+    assert r.json() == stations
+
+
+def test_read_stations_in_bbox(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/I")
+    longitude, latitude = r.json()["coordinates"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/bbox/",
+        params={
+            "min_longitude": longitude - 0.5,
+            "min_latitude": latitude - 0.5,
+            "max_longitude": longitude + 0.5,
+            "max_latitude": latitude + 0.5,
+        },
+    )
+    assert r.status_code == 200
+    stations = r.json()
+    assert "I" in [station["name"] for station in stations]
+    for station in stations:
+        assert abs(station["coordinates"][0] - longitude) <= 0.5
+        assert abs(station["coordinates"][1] - latitude) <= 0.5
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/bbox/",
+        params={
+            "min_longitude": 0,
+            "min_latitude": 10,
+            "max_longitude": 1,
+            "max_latitude": -10,
+        },
+    )
+    assert r.status_code == 400
+
+
+def test_read_nearest_stations(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/I")
+    longitude, latitude = r.json()["coordinates"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/nearest/",
+        params={"longitude": longitude, "latitude": latitude, "limit": 5},
+    )
+    assert r.status_code == 200
+    stations = r.json()
+    assert len(stations) == 5
+    assert stations[0]["name"] == "I"
+    assert stations[0]["distance"] == 0
+    distances = [station["distance"] for station in stations]
+    assert distances == sorted(distances)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/nearest/",
+        params={
+            "longitude": longitude,
+            "latitude": latitude,
+            "radius": distances[2],
+            "limit": 0,
+        },
+    )
+    assert r.status_code == 200
+    assert [station["distance"] for station in r.json()] == distances[:3]
+
+
+def test_read_stations_tile(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/tiles/0/0/0")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert r.content
+
+    # The tile is served from the response cache
+    assert client.get(f"{settings.API_V1_STR}/stations/tiles/0/0/0").content == (
+        r.content
+    )
+
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/tiles/0/0/0", params={"fao_area": -1}
+    )
+    assert r.status_code == 200
+    assert r.content == b""
+
+    r = client.get(f"{settings.API_V1_STR}/stations/tiles/1/2/0")
+    assert r.status_code == 404
+
+
+def test_read_station_clusters(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/all/")
+    stations = r.json()
+
+    r = client.get(f"{settings.API_V1_STR}/stations/clusters/", params={"zoom": 0})
+    assert r.status_code == 200
+    clusters = r.json()
+    assert sum(cluster["count"] for cluster in clusters) == len(stations)
+    assert sorted(name for cluster in clusters for name in cluster["stations"]) == (
+        sorted(station["name"] for station in stations)
+    )
+
+    fao_area = stations[0]["fao_area"]
+    r = client.get(
+        f"{settings.API_V1_STR}/stations/clusters/",
+        params={"zoom": 3, "fao_area": fao_area},
+    )
+    assert r.status_code == 200
+    assert sum(cluster["count"] for cluster in r.json()) == len(
+        [station for station in stations if station["fao_area"] == fao_area]
+    )
+
+
+@pytest.mark.parametrize("station_id", ["I"])
+def test_station_species_count_matches_details(
+    client: TestClient, station_id: str, db: Session
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/all/")
+    assert r.status_code == 200
+    [summary] = [station for station in r.json() if station["name"] == station_id]
+
+    r = client.get(f"{settings.API_V1_STR}/stations/{station_id}")
+    assert r.status_code == 200
+    assert summary["species_count"] == len(r.json()["species"])
+
+
+def test_read_fao_area_counts(client: TestClient, db: Session) -> None:
+    r = client.get(f"{settings.API_V1_STR}/stations/fao_areas/")
+    assert r.status_code == 200
+    areas = r.json()
+    stations = crud.station.get_all(db)
+    assert [area["fao_area"] for area in areas] == sorted(
+        {station.fao_area for station in stations}
+    )
+    assert sum(area["station_count"] for area in areas) == len(stations)
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.db.session import AsyncSessionLocal
+from app.utils.fuzzy_index import FuzzyIndex, round_score
+
+T = TypeVar("T")
+
+
+def run_async(func: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    async def run() -> T:
+        async with AsyncSessionLocal() as db:
+            return await func(db)
+
+    return asyncio.run(run())
+
+
+def test_get_multi_async_matches_sync(db: Session) -> None:
+    order_by = ["-matched_canonical_full_name"]
+    page: Any = crud.species.get_multi(db, skip=10, limit=20, order_by=order_by)
+    async_page: Any = run_async(
+        lambda async_db: crud.species.get_multi_async(
+            async_db, skip=10, limit=20, order_by=order_by
+        )
+    )
+    assert [sp.id for sp in async_page["results"]] == [sp.id for sp in page["results"]]
+    assert async_page["count"] == page["count"]
+
+
+def test_get_async_loads_the_details(db: Session) -> None:
+    species_id = "136d74e4-2f2d-5387-8374-bd04ff82ea58"
+    species = run_async(
+        lambda async_db: crud.species.get_async(
+            async_db, species_id, schema=schemas.SpeciesDetails
+        )
+    )
+    species_in_db = crud.species.get(db, species_id)
+    assert species and species_in_db
+    # The relationships can't be lazy loaded once the async session is closed.
+    assert {synonym.id for synonym in species.species_synonyms} == {
+        synonym.id for synonym in species_in_db.species_synonyms
+    }
+
+
+def test_get_multi_projects_the_schema_columns(db: Session) -> None:
+    order_by = ["-matched_canonical_full_name"]
+    page: Any = crud.species.get_multi(db, skip=10, limit=20, order_by=order_by)
+    projected_page: Any = crud.species.get_multi(
+        db, skip=10, limit=20, order_by=order_by, schema=schemas.SpeciesSummary
+    )
+    assert [
+        schemas.SpeciesSummary.from_orm(sp) for sp in projected_page["results"]
+    ] == [schemas.SpeciesSummary.from_orm(sp) for sp in page["results"]]
+
+    cursor_page: Any = crud.species.get_multi(
+        db, cursor="", limit=20, order_by=order_by, schema=schemas.SpeciesSummary
+    )
+    assert cursor_page["next_page"]
+
+
+def test_fuzzy_match_matches_the_fuzzy_index(db: Session) -> None:
+    index = FuzzyIndex.from_db(db)
+    for query_str in ["ophiura", "ljungmani", "sea star"]:
+        matches = index.search(query_str, min_similarity=0.4)
+        species = crud.species.fuzzy_match(
+            db, query_str, min_similarity=0.4, schema=schemas.SpeciesSummary
+        )
+        assert {sp.id: (sp.matched_field, sp.score) for sp in species} == {
+            match.species_id: (match.matched_field, round_score(match.score))
+            for match in matches
+        }
@@ -0,0 +1,65 @@
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.orm import Query, Session
+
+from app import crud, schemas
+from app.crud.crud_station import (
+    TILE_BUFFER,
+    TILE_EXTENT,
+    WEB_MERCATOR_WIDTH,
+    tile_bounds,
+    tile_margin_bounds,
+)
+
+
+def explain(db: Session, query: Query) -> List[str]:
+    """The plan of the query, without the sequential scans that the planner prefers
+    on a table as small as the test stations."""
+    statement = query.statement.compile(
+        dialect=PGDialect_psycopg2(), compile_kwargs={"literal_binds": True}
+    )
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(text(f"EXPLAIN {statement}")).scalars().all()
+    db.rollback()
+    return plan
+
+
+def test_bbox_query_uses_the_gist_index(db: Session) -> None:
+    query = crud.station.bbox_query(-20, -10, 20, 10, schema=schemas.StationSummary)
+    assert "idx_stations_coordinates" in "\n".join(explain(db, query))
+
+
+def test_nearest_query_uses_the_geography_index(db: Session) -> None:
+    query = crud.station.nearest_query(
+        -10, 30, radius=1_000_000, limit=5, schema=schemas.StationSummary
+    )
+    assert "ix_stations_coordinates_geography" in "\n".join(explain(db, query))
+
+
+def test_bbox_clause_crossing_the_antimeridian() -> None:
+    clause = crud.station.bbox_clause(170, -10, -170, 10)
+    sql = str(
+        clause.compile(
+            dialect=PGDialect_psycopg2(), compile_kwargs={"literal_binds": True}
+        )
+    )
+    assert "ST_MakeEnvelope(170, -10, 180, 10, 4326)" in sql
+    assert "ST_MakeEnvelope(-180, -10, -170, 10, 4326)" in sql
+
+
+def test_tile_bounds() -> None:
+    half_width = WEB_MERCATOR_WIDTH / 2
+    assert tile_bounds(0, 0, 0) == (-half_width, -half_width, half_width, half_width)
+    # The y of the tiles grows to the south
+    assert tile_bounds(1, 1, 0) == (0, 0, half_width, half_width)
+    assert tile_bounds(1, 0, 1) == (-half_width, -half_width, 0, 0)
+
+
+def test_tile_margin_bounds() -> None:
+    half_width = WEB_MERCATOR_WIDTH / 2
+    assert tile_margin_bounds(0, 0, 0) == tile_bounds(0, 0, 0)
+    # Only the edges of the tile inside the world have a margin
+    margin = half_width * TILE_BUFFER / TILE_EXTENT
+    assert tile_margin_bounds(1, 1, 0) == (-margin, -margin, half_width, half_width)
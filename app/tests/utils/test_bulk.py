@@ -0,0 +1,71 @@
+from datetime import date
+from typing import Any, Dict
+
+from app.db.bulk import batched, table_of, unique_by_key
+from app.db.incremental import TableDiff, last_of_each_key, row_hash, row_key
+from app.models import SpeciesCommonNames, stations_species_table
+
+
+def test_batched() -> None:
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_unique_by_key_keeps_last_row() -> None:
+    rows = [
+        {"id": "a", "name": "first"},
+        {"id": "b", "name": "other"},
+        {"id": "a", "name": "last"},
+    ]
+    assert unique_by_key(rows, ["id"]) == [
+        {"id": "a", "name": "last"},
+        {"id": "b", "name": "other"},
+    ]
+
+
+def test_row_key_and_hash() -> None:
+    table = table_of(stations_species_table)
+    row = {"station_id": "I", "species_id": "sp-1"}
+    assert row_key(table, row) == '["I", "sp-1"]'
+    assert row_hash(row) == row_hash({"species_id": "sp-1", "station_id": "I"})
+    assert row_hash(row) != row_hash({**row, "species_id": "sp-2"})
+    assert row_hash({"date": date(1873, 3, 1)}) != row_hash({"date": date(1873, 3, 2)})
+
+
+def test_last_of_each_key() -> None:
+    table = table_of(SpeciesCommonNames)
+    rows = [
+        {"id": "sp-1", "name": "brittle star"},
+        {"id": "sp-1", "name": "serpent star"},
+        {"id": "sp-2", "name": "sea star"},
+    ]
+    assert list(last_of_each_key(table, rows)) == rows[1:]
+    assert list(last_of_each_key(table, [])) == []
+
+
+class StoredHashes:
+    """Stand-in of the session, with the hashes stored by the previous import."""
+
+    def __init__(self, hashes: Dict[str, str]) -> None:
+        self.hashes = hashes
+
+    def execute(self, statement: Any) -> Any:
+        return self.hashes.items()
+
+
+def test_table_diff_of_rows_with_the_same_key_converges() -> None:
+    table = table_of(SpeciesCommonNames)
+    rows = [
+        {"id": "sp-1", "name": "brittle star"},
+        {"id": "sp-1", "name": "serpent star"},
+    ]
+    hashes: Dict[str, str] = {}
+    diff = TableDiff(StoredHashes(hashes), SpeciesCommonNames)  # type: ignore
+    changed = list(diff.changed(rows))
+    assert changed == rows[1:]
+    assert diff.changes().inserted == 1
+    hashes.update({row_key(table, row): row_hash(row) for row in changed})
+
+    diff = TableDiff(StoredHashes(hashes), SpeciesCommonNames)  # type: ignore
+    assert list(diff.changed(rows)) == []
+    assert diff.changes()[1:] == (0, 0, 0, 1)
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pytest
+
+from app import schemas
+from app.utils.cache import (
+    CacheBackend,
+    LRUCacheBackend,
+    RedisCacheBackend,
+    encode_command,
+    read_reply,
+    search_cache_key,
+)
+
+
+def key(expressions: dict) -> str:
+    return search_cache_key(
+        "species_search",
+        schemas.ExpressionGroup(**expressions),
+        order_by=None,
+        limit=0,
+        version=1,
+    )
+
+
+def test_search_cache_key() -> None:
+    genus = {"column_name": "genus", "search_term": "Abra", "operator": "eq"}
+    family = {"column_name": "family", "search_term": "Semelidae", "operator": "eq"}
+    fuzzy: dict = {**genus, "fuzzy": True}
+
+    assert key({"join": "AND", "expressions": [genus, family]}) == key(
+        {"join": "AND", "expressions": [family, genus]}
+    )
+    assert key({"join": "AND", "expressions": [genus, family]}) != key(
+        {"join": "OR", "expressions": [genus, family]}
+    )
+    # The minimum similarity only matters for fuzzy expressions
+    assert key({"join": "AND", "expressions": [genus, family]}) == key(
+        {
+            "join": "AND",
+            "expressions": [{**genus, "min_string_similarity": 0.9}, family],
+        }
+    )
+    # The fuzzy expressions give the order of the results
+    assert key({"join": "AND", "expressions": [fuzzy, family]}) != key(
+        {"join": "AND", "expressions": [family, fuzzy]}
+    )
+    expressions = schemas.ExpressionGroup(join="AND", expressions=[genus, family])
+    assert search_cache_key(
+        "species_search", expressions, order_by=None, limit=0, version=1
+    ) != search_cache_key(
+        "species_search", expressions, order_by=None, limit=0, version=2
+    )
+
+
+def test_cache_backends_implement_get_and_set() -> None:
+    class GetOnlyBackend(CacheBackend):
+        async def get(self, key: str) -> Optional[bytes]:
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()  # type: ignore[abstract]
+
+
+def test_lru_cache_backend() -> None:
+    async def run() -> None:
+        cache = LRUCacheBackend(max_bytes=10)
+        await cache.set("a", b"aaaa", ttl=60)
+        await cache.set("b", b"bbbb", ttl=60)
+        assert await cache.get("a") == b"aaaa"
+        # Evicts "b", the least recently used
+        await cache.set("c", b"cccc", ttl=60)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == b"aaaa"
+        assert cache.size == 8
+        # Larger than the whole cache
+        await cache.set("d", b"d" * 11, ttl=60)
+        assert await cache.get("d") is None
+        await cache.set("e", b"e", ttl=0)
+        assert await cache.get("e") is None
+
+    asyncio.run(run())
+
+
+async def redis_stand_in(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, values: Dict
+) -> None:
+    """Serve GET and SET of a Redis server."""
+    while not reader.at_eof():
+        try:
+            command = await read_reply(reader)
+        except asyncio.IncompleteReadError:
+            break
+        if command[0] == b"SET":
+            values[command[1]] = command[2]
+            writer.write(b"+OK\r\n")
+        elif command[0] == b"GET" and command[1] in values:
+            value = values[command[1]]
+            writer.write(b"$%d\r\n%s\r\n" % (len(value), value))
+        elif command[0] == b"GET":
+            writer.write(b"$-1\r\n")
+        else:
+            writer.write(b"-ERR unknown command\r\n")
+        await writer.drain()
+    writer.close()
+
+
+def test_redis_cache_backend() -> None:
+    async def run() -> None:
+        values: Dict[bytes, bytes] = {}
+        server = await asyncio.start_server(
+            lambda r, w: redis_stand_in(r, w, values), "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            cache = RedisCacheBackend(f"redis://127.0.0.1:{port}", prefix="test:")
+            assert await cache.get("a") is None
+            await cache.set("a", b"[1,2]", ttl=60)
+            assert values == {b"test:a": b"[1,2]"}
+            assert await cache.get("a") == b"[1,2]"
+            cache.close_idle()
+
+    asyncio.run(run())
+
+
+def wait_for_eof(reader: asyncio.StreamReader) -> bool:
+    for _ in range(100):
+        if reader.at_eof():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_redis_cache_backend_closes_the_connections_of_other_loops() -> None:
+    values: Dict[bytes, bytes] = {}
+    connected: List[asyncio.StreamReader] = []
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connected.append(reader)
+        await redis_stand_in(reader, writer, values)
+
+    server_loop = asyncio.new_event_loop()
+    server = server_loop.run_until_complete(asyncio.start_server(serve, "127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        cache = RedisCacheBackend(f"redis://127.0.0.1:{port}")
+        # Each run has its own event loop, closed when it returns
+        asyncio.run(cache.set("a", b"1", ttl=60))
+        assert asyncio.run(cache.get("a")) == b"1"
+        assert len(connected) == 2
+        # The server reads the end of the connection of the first loop
+        assert wait_for_eof(connected[0])
+        assert not connected[1].at_eof()
+        cache.close_idle()
+        assert wait_for_eof(connected[1])
+    finally:
+        server_loop.call_soon_threadsafe(server_loop.stop)
+        thread.join()
+        server.close()
+        server_loop.close()
+
+
+def test_encode_command() -> None:
+    assert encode_command("SET", "a", b"b", "PX", 100) == (
+        b"*5\r\n$3\r\nSET\r\n$1\r\na\r\n$1\r\nb\r\n$2\r\nPX\r\n$3\r\n100\r\n"
+    )
@@ -0,0 +1,28 @@
+import json
+from pathlib import Path
+
+from app.db.data_files import read_species, read_stations
+
+
+def test_read_species(tmp_path: Path) -> None:
+    data = {
+        "species": {
+            "1": {"id": "sp-1", "bestResult": {"dataSourceId": 9}},
+            "2": {"id": "sp-2", "bestResult": None},
+        }
+    }
+    path = tmp_path / "species.json"
+    path.write_text(json.dumps(data))
+    assert list(read_species(path)) == list(data["species"].items())
+
+
+def test_read_stations_as_json_load(tmp_path: Path) -> None:
+    stations = [
+        {"Station": "I", "Decimal Latitude": 27.4, "Temp (F) at Fathoms": {"0": 64.5}},
+        {"Station": "II", "Decimal Latitude": -3, "Temp (F) at Fathoms": {}},
+    ]
+    path = tmp_path / "stations.json"
+    path.write_text(json.dumps(stations))
+    records = list(read_stations(path))
+    assert records == json.loads(path.read_text())
+    assert isinstance(records[0]["Decimal Latitude"], float)
@@ -0,0 +1,93 @@
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, List, Optional, Type
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, ValidationError, parse_obj_as, root_validator
+from starlette.responses import JSONResponse
+
+from app import schemas
+from app.utils.encoders import json_response, row_encoder
+
+
+def fastapi_body(rows: List[Any], schema: Type[BaseModel]) -> bytes:
+    """The body FastAPI renders for the rows with a `List[schema]` response model."""
+    return JSONResponse(jsonable_encoder(parse_obj_as(List[schema], rows))).body  # type: ignore
+
+
+def station(name: str, longitude: float, latitude: float, **fields: Any) -> Any:
+    values = dict(
+        name=name,
+        date=date(1873, 2, 28),
+        coordinates=[longitude, latitude],
+        fao_area=34,
+        location="Off Cape Verde",
+        gear=None,
+        sediment_sample="Glob. ooze",
+        species_count=12,
+        # Not serialized
+        text="A long text",
+    )
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_json_response_matches_fastapi() -> None:
+    stations = [
+        station("1", -17.0, 24.5),
+        station("2", 1e-07, -0.5, location="Île aux “quotes”   <tag>"),
+        station("3", 123456789.125, 1e16, gear="Dredge", fao_area=True),
+    ]
+    assert json_response(stations, schemas.StationSummary).body == fastapi_body(
+        stations, schemas.StationSummary
+    )
+
+    species = [
+        SimpleNamespace(
+            id=str(idx),
+            record_id=f"record {idx}",
+            matched_canonical_full_name=None if idx % 2 else f"Genus species {idx}",
+            current_name="Genus species",
+            station_count=idx,
+        )
+        for idx in range(10)
+    ]
+    assert json_response(species, schemas.SpeciesSummary).body == fastapi_body(
+        species, schemas.SpeciesSummary
+    )
+    assert json_response([], schemas.SpeciesSummary).body == b"[]"
+
+
+def test_row_encoder_converts_the_values() -> None:
+    class Schema(BaseModel):
+        count: int
+        ratio: float
+        label: str
+        flag: Optional[bool] = None
+
+    encode = row_encoder(Schema)
+    row = SimpleNamespace(count=3.0, ratio=1, label=12)
+    assert encode(row) == jsonable_encoder(Schema(**vars(row)))
+    assert encode(row) == {"count": 3, "ratio": 1.0, "label": "12", "flag": None}
+
+
+def test_row_encoder_validates_the_other_fields() -> None:
+    with pytest.raises(ValidationError):
+        row_encoder(schemas.StationSummary)(station("1", 0, 0, coordinates=[0]))
+
+
+def test_row_encoder_with_root_validators() -> None:
+    class Schema(BaseModel):
+        first: str
+        last: str
+
+        @root_validator
+        def swap(cls, values: dict) -> dict:
+            return {"first": values["last"], "last": values["first"]}
+
+        class Config:
+            orm_mode = True
+
+    row = SimpleNamespace(first="a", last="b")
+    assert row_encoder(Schema)(row) == {"first": "b", "last": "a"}
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+
+from app import crud, schemas
+from app.utils.encoders import row_encoder
+from app.utils.fuzzy_index import (
+    FuzzyIndex,
+    FuzzyMatch,
+    MatchedRecord,
+    to_float4,
+    trigrams,
+    word_similarity,
+)
+
+
+def test_trigrams() -> None:
+    assert trigrams("Two words") == [
+        "  t",
+        " tw",
+        "two",
+        "wo ",
+        "  w",
+        " wo",
+        "wor",
+        "ord",
+        "rds",
+        "ds ",
+    ]
+
+
+@pytest.mark.parametrize(
+    "query, name, similarity",
+    [
+        # Values returned by PostgreSQL's pg_trgm
+        ("word", "two words", 0.8),
+        ("two words", "word", 0.4),
+        ("word", "word", 1.0),
+        ("word", "", 0.0),
+        ("", "word", 0.0),
+    ],
+)
+def test_word_similarity(query: str, name: str, similarity: float) -> None:
+    assert word_similarity(query, name) == to_float4(similarity)
+
+
+def test_fuzzy_index_search() -> None:
+    index = FuzzyIndex()
+    index.build(
+        [
+            ("a", "matched_canonical_full_name", "Ophiura ljungmani"),
+            ("a", "synonym", "Ophioglypha ljungmani"),
+            ("b", "current_name", "Ophiomusium lymani"),
+            ("c", "common_name", "brittle star"),
+            ("d", "current_name", None),
+        ]
+    )
+
+    matches = index.search("ljungmani", min_similarity=0.5)
+    assert [match.species_id for match in matches] == ["a"]
+    assert matches[0].score == 1.0
+
+    matches = index.search("ophiura", min_similarity=0.3)
+    assert [match.species_id for match in matches] == ["a", "b"]
+    assert matches[0].matched_field == "matched_canonical_full_name"
+    assert index.search("ophiura", min_similarity=0.3, limit=1) == matches[:1]
+
+    for match in matches:
+        assert match.score == word_similarity("ophiura", match.matched_name)
+
+    assert sum(index.memory_usage().values()) > 0
+
+
+def test_matched_records_are_rounded_as_in_the_database() -> None:
+    record = SimpleNamespace(id="a", matched_canonical_full_name="Ophiura ljungmani")
+    score = word_similarity("ljungman", "Ophioglypha ljungmani")
+    match = FuzzyMatch("a", score, "synonym", "Ophioglypha ljungmani")
+    encoded = row_encoder(schemas.SpeciesFuzzyMatch)(MatchedRecord(record, match))
+    assert encoded["id"] == "a"
+    assert encoded["score"] == 0.8889
+    assert encoded["matched_field"] == "synonym"
+
+    query = crud.species.fuzzy_match_query(
+        "ophiura", min_similarity=0.5, schema=schemas.SpeciesSummary
+    )
+    sql = str(query.statement.compile(dialect=PGDialect_psycopg2()))
+    assert (
+        "CAST(word_similarity(%(term)s, species.current_name) AS DOUBLE PRECISION)"
+        in sql
+    )
+    assert (
+        "CAST(round(CAST(best.score AS NUMERIC), %(round_1)s) AS DOUBLE PRECISION)"
+        in sql
+    )
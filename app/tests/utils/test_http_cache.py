@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+from app.utils.dataset_version import Version
+from app.utils.http_cache import (
+    BUILD_ID,
+    STARTED_AT,
+    etag_matches,
+    last_modified,
+    make_etag,
+    not_modified_since,
+)
+
+updated_at = datetime(2026, 10, 18, 8, 0, 0, 500, tzinfo=timezone.utc)
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('W/"7"', 'W/"7"')
+    assert etag_matches('"7"', 'W/"7"')
+    assert etag_matches('W/"6", W/"7"', 'W/"7"')
+    assert etag_matches("*", 'W/"7"')
+    assert not etag_matches('W/"6"', 'W/"7"')
+    assert not etag_matches('W/"77"', 'W/"7"')
+
+
+def test_etags_of_other_builds_do_not_match() -> None:
+    etag = make_etag(Version(number=7, updated_at=updated_at))
+    assert etag == f'W/"{BUILD_ID}-7"'
+    assert not etag_matches('W/"0123456789ab-7"', etag)
+
+
+def test_not_modified_since() -> None:
+    assert not_modified_since("Sun, 18 Oct 2026 08:00:00 GMT", updated_at)
+    assert not_modified_since("Sun, 18 Oct 2026 09:00:00 GMT", updated_at)
+    assert not not_modified_since("Sun, 18 Oct 2026 07:59:59 GMT", updated_at)
+    assert not not_modified_since("yesterday", updated_at)
+
+
+def test_last_modified_by_the_deploy() -> None:
+    # Versions bumped before the worker started were rendered by another build
+    version = Version(number=7, updated_at=datetime(1876, 8, 1, tzinfo=timezone.utc))
+    assert last_modified(version) == STARTED_AT
+    version = Version(number=8, updated_at=datetime(2100, 1, 1, tzinfo=timezone.utc))
+    assert last_modified(version) == version.updated_at
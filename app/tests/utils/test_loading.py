@@ -0,0 +1,28 @@
+from app import schemas
+from app.models import Species, Station
+from app.utils.loading import loader_options, projected_columns
+
+
+def test_loader_options_follow_the_schema() -> None:
+    assert loader_options(Species, schemas.SpeciesSummary) == []
+    assert len(loader_options(Species, schemas.SpeciesDetails)) == 3
+    assert len(loader_options(Station, schemas.StationDetails)) == 1
+
+
+def test_projected_columns_follow_the_schema() -> None:
+    columns = projected_columns(Station, schemas.StationSummary, include=["order"])
+    assert columns is not None
+    # The primary key comes first
+    assert [column.key for column in columns] == [
+        "name",
+        "date",
+        "coordinates",
+        "fao_area",
+        "location",
+        "gear",
+        "sediment_sample",
+        "species_count",
+        "order",
+    ]
+    # The relationships need the whole records
+    assert projected_columns(Station, schemas.StationDetails) is None
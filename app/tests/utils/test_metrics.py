@@ -0,0 +1,56 @@
+import pytest
+
+from app.utils.metrics import Counter, Gauge, Histogram, Metric, Registry
+
+
+def test_render_counter_and_gauge() -> None:
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ["path"])
+    registry.register(requests)
+    in_use = Gauge("in_use", "In use.")
+    registry.register(in_use)
+
+    requests.inc(path="/a")
+    requests.inc(2, path='/"b"')
+    in_use.set_function(lambda: 3)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a"} 1',
+        'requests_total{path="/\\"b\\""} 2',
+        "# HELP in_use In use.",
+        "# TYPE in_use gauge",
+        "in_use 3",
+    ]
+
+
+def test_render_histogram() -> None:
+    registry = Registry()
+    wait = Histogram("wait_seconds", "Wait.", buckets=[0.1, 1])
+    registry.register(wait)
+
+    for value in (0.05, 0.5, 0.5, 5):
+        wait.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'wait_seconds_bucket{le="0.1"} 1',
+        'wait_seconds_bucket{le="1"} 3',
+        'wait_seconds_bucket{le="+Inf"} 4',
+        "wait_seconds_count 4",
+        "wait_seconds_sum 6.05",
+    ]
+
+
+def test_labels_must_match() -> None:
+    requests = Counter("requests_total", "Requests.", ["path"])
+    with pytest.raises(ValueError):
+        requests.inc(method="GET")
+
+
+def test_metrics_implement_samples() -> None:
+    class NoSamples(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        NoSamples("no_samples", "Not a metric.")  # type: ignore[abstract]
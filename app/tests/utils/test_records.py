@@ -0,0 +1,31 @@
+import multiprocessing
+
+from app.db.records import species_common_name_row, transform
+
+
+def test_transform_in_worker_processes_keeps_order() -> None:
+    records = [
+        (f"sp-{i}", {"language": "English", "vernacular": f"name {i}"})
+        for i in range(25)
+    ]
+    rows = list(transform(species_common_name_row, records))
+    assert rows[3] == {
+        "id": "sp-3",
+        "language": "English",
+        "name": "name 3",
+        "species_id": "sp-3",
+    }
+
+    with multiprocessing.get_context("spawn").Pool(2) as pool:
+        assert (
+            list(
+                transform(
+                    species_common_name_row,
+                    iter(records),
+                    pool=pool,
+                    chunk_size=4,
+                    max_pending=2,
+                )
+            )
+            == rows
+        )
@@ -0,0 +1,107 @@
+from typing import Any
+
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+
+from app import crud, schemas
+from app.models import (
+    DataSource,
+    Species,
+    SpeciesCommonNames,
+    SpeciesSynonyms,
+    Station,
+    stations_species_table,
+)
+from app.utils.relations import correlation_clause
+
+
+def sql(query: Any) -> str:
+    return str(query.statement.compile(dialect=PGDialect_psycopg2()))
+
+
+def test_correlation_clause_of_one_to_many_relations() -> None:
+    assert correlation_clause(Species, SpeciesSynonyms) is not None
+    assert correlation_clause(Station, stations_species_table) is not None
+    # The species reference their data source
+    assert correlation_clause(Species, DataSource) is None
+
+
+def test_nested_groups_semi_join_their_relations() -> None:
+    expressions = schemas.ExpressionGroup(
+        join="AND",
+        expressions=[
+            {"column_name": "fao_area", "search_term": "27", "operator": "eq"},
+            {
+                "join": "OR",
+                "expressions": [
+                    {"column_name": "gear", "search_term": "Dredge", "operator": "eq"},
+                    {
+                        "join": "AND",
+                        "expressions": [
+                            {
+                                "column_name": "species_id",
+                                "search_term": "a",
+                                "operator": "eq",
+                            },
+                            {
+                                "column_name": "species_id",
+                                "search_term": "b",
+                                "operator": "ne",
+                            },
+                        ],
+                    },
+                ],
+            },
+        ],
+    )
+    assert expressions.column_names() == {"fao_area", "gear", "species_id"}
+    assert expressions.uses_column("species_id")
+
+    query, _ = crud.station.search_query(
+        expressions, relations=[stations_species_table]
+    )
+    statement = sql(query)
+    assert "JOIN" not in statement
+    # The expressions of the nested group match the same row of the relation
+    assert statement.count("EXISTS") == 1
+    assert (
+        "EXISTS (SELECT 1 \nFROM stations_species \n"
+        "WHERE stations_species.station_id = stations.name "
+        "AND stations_species.species_id = %(term_2)s "
+        "AND stations_species.species_id != %(term_3)s)"
+    ) in statement
+
+
+def test_unused_relations_are_not_joined() -> None:
+    expressions = schemas.Expression(
+        column_name="fao_area", search_term="27", operator="eq"
+    )
+    query, _ = crud.station.search_query(
+        expressions, relations=[stations_species_table]
+    )
+    assert "stations_species" not in sql(query)
+
+
+def test_fuzzy_expressions_on_relations() -> None:
+    expressions = schemas.ExpressionGroup(
+        join="OR",
+        expressions=[
+            {
+                "column_name": column_name,
+                "search_term": "ophiura",
+                "operator": "eq",
+                "fuzzy": True,
+            }
+            for column_name in ["current_name", "name", "scientific_name"]
+        ],
+    )
+    query, thresholds = crud.species.search_query(
+        expressions, relations=[SpeciesCommonNames, SpeciesSynonyms]
+    )
+    statement = sql(query)
+    assert thresholds == [0.1, 0.1, 0.1]
+    assert "JOIN" not in statement
+    assert statement.count("EXISTS") == 2
+    # Ordered by the best similarity of the related rows
+    assert "max(word_similarity(%(term_2)s, species_synonyms.scientific_name))" in (
+        statement
+    )
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List, Optional, cast
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.sql.elements import ClauseElement
+
+from app import crud, schemas
+from app.crud.crud_station import CRUDStation
+from app.models import Station, stations_species_table
+from app.utils.search_plan import plan_requests
+from app.utils.species import binomial_only
+
+
+def search(
+    crud_station: CRUDStation,
+    fao_area: str,
+    species_id: str,
+    *,
+    limit: int = 0,
+    filters: Optional[List[ClauseElement]] = None,
+) -> Any:
+    expressions = schemas.ExpressionGroup(
+        join="AND",
+        expressions=[
+            {"column_name": "fao_area", "search_term": fao_area, "operator": "eq"},
+            {"column_name": "species_id", "search_term": species_id, "operator": "eq"},
+        ],
+    )
+    return crud_station.search_plan(
+        expressions,
+        relations=[stations_species_table],
+        limit=limit,
+        filters=filters,
+        schema=schemas.StationSummary,
+    )
+
+
+def compiled(statement: Any, parameters: Dict[str, Any]) -> Any:
+    sql = statement.compile(dialect=PGDialect_psycopg2())
+    return str(sql), sql.construct_params(parameters)
+
+
+def test_search_plans_are_reused_across_search_terms() -> None:
+    crud_station = CRUDStation(Station)
+    misses = plan_requests.get(model="Station", result="miss")
+
+    plan, parameters, thresholds = search(crud_station, "27", "a", limit=10)
+    other_plan, other_parameters, _ = search(crud_station, "34", "b", limit=20)
+    assert other_plan is plan
+    assert len(crud_station.search_plans) == 1
+    assert plan_requests.get(model="Station", result="miss") == misses + 1
+    assert thresholds == []
+
+    # The terms are converted to the types of the columns
+    assert parameters == {"term_0": 27, "term_1": "a", "limit": 10}
+    assert other_parameters == {"term_0": 34, "term_1": "b", "limit": 20}
+    sql, values = compiled(plan.statement, other_parameters)
+    assert values.items() >= other_parameters.items()
+    # The same as the statement created for the terms
+    query, _ = crud_station.search_query(
+        schemas.ExpressionGroup(
+            join="AND",
+            expressions=[
+                {"column_name": "fao_area", "search_term": "34", "operator": "eq"},
+                {"column_name": "species_id", "search_term": "b", "operator": "eq"},
+            ],
+        ),
+        relations=[stations_species_table],
+        limit=20,
+        schema=schemas.StationSummary,
+    )
+    assert (sql, values) == compiled(query.statement, {})
+
+    # Without a limit, or with filters, the statements are not the same
+    assert search(crud_station, "27", "a")[0] is not plan
+    filtered_plan = search(crud_station, "27", "a", filters=[binomial_only()])[0]
+    assert search(crud_station, "34", "b", filters=[binomial_only()])[0] is (
+        filtered_plan
+    )
+    assert len(crud_station.search_plans) == 3
+
+
+def test_search_plans_bind_the_fuzzy_expressions() -> None:
+    expressions = schemas.ExpressionGroup(
+        join="OR",
+        expressions=[
+            {
+                "column_name": "current_name",
+                "search_term": term,
+                "operator": "eq",
+                "fuzzy": True,
+                "min_string_similarity": similarity,
+            }
+            for term, similarity in [("ophiura", 0.5), ("ljungmani", 0.3)]
+        ],
+    )
+    plan, parameters, thresholds = crud.species.search_plan(expressions)
+    assert parameters == {
+        "term_0": "ophiura",
+        "similarity_0": 0.5,
+        "term_1": "ljungmani",
+        "similarity_1": 0.3,
+    }
+    assert thresholds == [0.5, 0.3]
+    sql, _ = compiled(plan.statement, parameters)
+    assert "word_similarity(%(term_1)s, species.current_name)" in sql
+    assert "ophiura" not in sql
+
+
+def test_search_plans_validate_the_search_terms() -> None:
+    crud_station = CRUDStation(Station)
+    search(crud_station, "27", "a")
+    with pytest.raises(HTTPException) as e:
+        search(crud_station, "North Atlantic", "a")
+    assert cast(HTTPException, e.value).status_code == 400
+
+
+def test_search_plans_can_be_disabled() -> None:
+    crud_station = CRUDStation(Station)
+    crud_station.search_plans.maxsize = 0
+    assert search(crud_station, "27", "a")[0] is not search(crud_station, "27", "a")[0]
+    assert len(crud_station.search_plans) == 0
+
+
+@pytest.mark.parametrize(
+    "thresholds, threshold", [([0.5, 0.3], "0.3"), ([1.5], "1.0"), ([-0.1], "0.0")]
+)
+def test_word_similarity_threshold_is_clamped(
+    thresholds: List[float], threshold: str
+) -> None:
+    statement = crud.species.word_similarity_threshold_statement(thresholds)
+    _, values = compiled(statement, {})
+    assert threshold in values.values()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional
+
+from pydantic import BaseModel
+
+from app.utils.streaming import (
+    stream_json_array,
+    stream_json_array_async,
+    stream_ndjson,
+    stream_ndjson_async,
+)
+
+
+class Row:
+    def __init__(self, id: int, name: Optional[str]) -> None:
+        self.id = id
+        self.name = name
+
+
+class RowSchema(BaseModel):
+    id: int
+    name: Optional[str]
+
+    class Config:
+        orm_mode = True
+
+
+def test_stream_json_array() -> None:
+    rows = [Row(idx, f"name {idx}" if idx % 2 else None) for idx in range(100)]
+    chunks = list(stream_json_array(rows, RowSchema, chunk_size=64))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == [
+        {"id": row.id, "name": row.name} for row in rows
+    ]
+
+
+def test_stream_json_array_without_rows() -> None:
+    assert b"".join(stream_json_array([], RowSchema)) == b"[]"
+
+
+def test_stream_ndjson() -> None:
+    rows = [Row(idx, "é") for idx in range(3)]
+    lines = b"".join(stream_ndjson(rows, RowSchema)).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": row.id, "name": "é"} for row in rows
+    ]
+
+
+def test_stream_async_matches_sync() -> None:
+    rows = [Row(idx, f"name {idx}") for idx in range(100)]
+
+    async def async_rows() -> AsyncIterator[Row]:
+        for row in rows:
+            yield row
+
+    async def collect(chunks: AsyncIterator[bytes]) -> List[bytes]:
+        return [chunk async for chunk in chunks]
+
+    assert asyncio.run(
+        collect(stream_json_array_async(async_rows(), RowSchema, chunk_size=64))
+    ) == list(stream_json_array(rows, RowSchema, chunk_size=64))
+    assert asyncio.run(
+        collect(stream_ndjson_async(async_rows(), RowSchema, chunk_size=64))
+    ) == list(stream_ndjson(rows, RowSchema, chunk_size=64))
@@ -1,8 +1,11 @@
 import random
 import string
-from typing import Dict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
 
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 from app.core.config import get_settings
 
@@ -30,3 +33,18 @@ def get_superuser_token_headers(client: TestClient) -> Dict[str, str]:
     a_token = tokens["access_token"]
     headers = {"Authorization": f"Bearer {a_token}"}
     return headers
+
+
+@contextmanager
+def record_statements(engine: Engine) -> Iterator[List[str]]:
+    """Record the SQL statements run by the engine in the block."""
+    statements: List[str] = []
+
+    def before_cursor_execute(_: Any, __: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
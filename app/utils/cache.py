@@ -0,0 +1,442 @@
+"""Server-side cache of serialized responses, with an in-process LRU backend and a
+backend for servers speaking the Redis protocol.
+
+The keys include the dataset version, so the cached responses of the previous data
+are never served after an import, and are evicted by their TTL or by the size limit.
+"""
+import asyncio
+import hashlib
+import json
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union
+from urllib.parse import unquote, urlparse
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app.core.config import get_settings
+from app.schemas import Expression, ExpressionGroup
+from app.utils.dataset_version import dataset_version
+from app.utils.logger import logger
+from app.utils.metrics import counter
+from app.utils.streaming import stream_json_array
+
+settings = get_settings()
+
+cache_requests = counter(
+    "response_cache_requests_total",
+    "Lookups in the response cache, by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+cache_errors = counter(
+    "response_cache_errors_total",
+    "Failed operations of the response cache backend, served as misses.",
+    ["cache"],
+)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        ...
+
+
+class LRUCacheBackend(CacheBackend):
+    """Keep the values in the memory of the worker process, evicting the least
+    recently used ones when their total size is over `max_bytes`."""
+
+    def __init__(self, *, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._values: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._values:
+                self._pop(key)
+            self._values[key] = (value, time.monotonic() + ttl)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._values)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.size = 0
+
+    def _pop(self, key: str) -> None:
+        value, _ = self._values.pop(key)
+        self.size -= len(value)
+
+
+class RedisError(Exception):
+    pass
+
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Keep the values in a server speaking the Redis protocol (RESP), shared by the
+    workers. Its size is bounded by the `maxmemory` setting of the server, which
+    should use an LRU eviction policy, e.g. `allkeys-lru`.
+
+    Connections are reused within the event loop they were opened in, and closed
+    when it is used from another one.
+    """
+
+    def __init__(
+        self, url: str, *, prefix: str = "", timeout: float = 1, max_idle: int = 10
+    ) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Invalid Redis URL: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: List[Connection] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", self.prefix + key)
+
+    async def set(self, key: str, value: bytes, *, ttl: float) -> None:
+        await self.execute("SET", self.prefix + key, value, "PX", int(ttl * 1000))
+
+    async def execute(self, *args: Union[str, bytes, int]) -> Any:
+        """Send a command and return its reply.
+
+        Raises
+        ------
+        RedisError
+            If the server replies with an error.
+        OSError, asyncio.TimeoutError
+            If the server can't be reached or doesn't reply in time.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self.close_idle()
+            self._loop = loop
+
+        connection = self._idle.pop() if self._idle else await self._connect()
+        try:
+            reply = await asyncio.wait_for(
+                self._command(connection, args), self.timeout
+            )
+        except BaseException:
+            connection[1].close()
+            raise
+        if len(self._idle) < self.max_idle:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        return reply
+
+    def close_idle(self) -> None:
+        """Close the idle connections, from any thread or event loop."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            if self._loop is not None and not self._loop.is_closed():
+                # The transports can only be closed in their event loop
+                self._loop.call_soon_threadsafe(writer.close)
+                continue
+            # The transports of a closed loop can't be closed, but the connections
+            # can be ended, and their sockets are released with the transports.
+            try:
+                writer.get_extra_info("socket").shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    async def _connect(self) -> Connection:
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        try:
+            if self.password:
+                await asyncio.wait_for(
+                    self._command(connection, ("AUTH", self.password)), self.timeout
+                )
+            if self.db:
+                await asyncio.wait_for(
+                    self._command(connection, ("SELECT", self.db)), self.timeout
+                )
+        except BaseException:
+            connection[1].close()
+            raise
+        return connection
+
+    @staticmethod
+    async def _command(
+        connection: Connection, args: Tuple[Union[str, bytes, int], ...]
+    ) -> Any:
+        reader, writer = connection
+        writer.write(encode_command(*args))
+        await writer.drain()
+        return await read_reply(reader)
+
+
+def encode_command(*args: Union[str, bytes, int]) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP reply."""
+    line = await reader.readuntil(b"\r\n")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        raise RedisError(rest.decode())
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Invalid reply: {line!r}")
+
+
+class ResponseCache:
+    """Cache serialized responses in the backend, counting the hits and misses.
+    The failures of the backend are logged and served as misses."""
+
+    def __init__(self, backend: CacheBackend, *, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get(self, name: str, key: str) -> Optional[bytes]:
+        try:
+            value = await self.backend.get(key)
+        except (OSError, asyncio.TimeoutError, RedisError) as exc:
+            logger.warning(f"Response cache {name}: {exc!r}")
+            cache_errors.inc(cache=name)
+            value = None
+        cache_requests.inc(cache=name, result="miss" if value is None else "hit")
+        return value
+
+    async def set(self, name: str, key: str, value: bytes) -> None:
+        try:
+            await self.backend.set(key, value, ttl=self.ttl)
+        except (OSError, asyncio.TimeoutError, RedisError) as exc:
+            logger.warning(f"Response cache {name}: {exc!r}")
+            cache_errors.inc(cache=name)
+
+
+def has_fuzzy(expressions: Union[Expression, ExpressionGroup]) -> bool:
+    if isinstance(expressions, ExpressionGroup):
+        return any(has_fuzzy(expression) for expression in expressions.expressions)
+    return expressions.fuzzy
+
+
+def canonical_expressions(expressions: Union[Expression, ExpressionGroup]) -> Any:
+    """Return a JSON-serializable form of the expressions, which is the same for
+    expressions that always give the same results.
+
+    The expressions of a group are sorted, unless they have fuzzy expressions,
+    whose order is the order of the results. The minimum similarity is dropped
+    from the expressions that are not fuzzy.
+    """
+    if isinstance(expressions, ExpressionGroup):
+        children = [canonical_expressions(e) for e in expressions.expressions]
+        if not has_fuzzy(expressions):
+            children.sort(key=lambda child: json.dumps(child, sort_keys=True))
+        return {
+            "join": expressions.join.value if expressions.join else None,
+            "expressions": children,
+        }
+
+    canonical: Dict[str, Any] = {
+        "column_name": expressions.column_name,
+        "search_term": expressions.search_term,
+        "operator": expressions.operator.value,
+        "fuzzy": expressions.fuzzy,
+    }
+    if expressions.fuzzy:
+        canonical["min_string_similarity"] = expressions.min_string_similarity
+    return canonical
+
+
+def cache_key(name: str, request: Dict[str, Any], *, version: int) -> str:
+    """Create the cache key of a request.
+
+    Parameters
+    ----------
+    name : str
+        The name of the endpoint.
+    request : Dict[str, Any]
+        The JSON-serializable parameters the response depends on.
+    version : int
+        The dataset version, see `app.utils.dataset_version`.
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.sha256(
+        json.dumps(request, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+    return f"{name}:{version}:{digest}"
+
+
+def search_cache_key(
+    name: str,
+    expressions: Union[Expression, ExpressionGroup],
+    *,
+    order_by: Optional[List[str]],
+    limit: int,
+    version: int,
+) -> str:
+    """Create the cache key of a search request.
+
+    Parameters
+    ----------
+    name : str
+        The name of the search endpoint.
+    expressions : Union[Expression, ExpressionGroup]
+    order_by : Optional[List[str]]
+    limit : int
+    version : int
+        The dataset version, see `app.utils.dataset_version`.
+
+    Returns
+    -------
+    str
+    """
+    request = {
+        "expressions": canonical_expressions(expressions),
+        "order_by": order_by or [],
+        "limit": max(limit, 0),
+    }
+    return cache_key(name, request, version=version)
+
+
+async def cached_response(
+    name: str,
+    db: AsyncSession,
+    key: Callable[[int], str],
+    render: Callable[[], Awaitable[bytes]],
+    *,
+    media_type: str,
+) -> Response:
+    """Return the response body from the response cache, or render it and cache it.
+
+    Parameters
+    ----------
+    name : str
+        The name of the endpoint.
+    db : AsyncSession
+    key : Callable[[int], str]
+        Creates the cache key of the request for a dataset version.
+    render : Callable[[], Awaitable[bytes]]
+        Renders the body.
+    media_type : str
+
+    Returns
+    -------
+    Response
+    """
+    version = await dataset_version.get_async(db)
+    request_key = key(version.number)
+    body = await response_cache.get(name, request_key)
+    if body is None:
+        body = await render()
+        await response_cache.set(name, request_key, body)
+    return Response(body, media_type=media_type)
+
+
+async def cached_search(
+    name: str,
+    db: AsyncSession,
+    search: Callable[[], Awaitable[List[Any]]],
+    schema: Type[BaseModel],
+    *,
+    expressions: Union[Expression, ExpressionGroup],
+    order_by: Optional[List[str]],
+    limit: int,
+) -> Response:
+    """Return the serialized results of the search from the response cache, or run
+    the search and cache them.
+
+    Parameters
+    ----------
+    name : str
+        The name of the search endpoint.
+    db : AsyncSession
+    search : Callable[[], Awaitable[List[Any]]]
+        Runs the search.
+    schema : Type[BaseModel]
+        The response model of a result.
+    expressions : Union[Expression, ExpressionGroup]
+    order_by : Optional[List[str]]
+    limit : int
+
+    Returns
+    -------
+    Response
+        The JSON array of the results, the same as FastAPI would serialize it.
+    """
+
+    async def render() -> bytes:
+        return b"".join(stream_json_array(await search(), schema))
+
+    return await cached_response(
+        name,
+        db,
+        lambda version: search_cache_key(
+            name, expressions, order_by=order_by, limit=limit, version=version
+        ),
+        render,
+        media_type="application/json",
+    )
+
+
+def create_backend() -> CacheBackend:
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        return RedisCacheBackend(
+            settings.RESPONSE_CACHE_REDIS_URL, prefix="challenger-api:"
+        )
+    return LRUCacheBackend(max_bytes=settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+response_cache = ResponseCache(
+    create_backend(), ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple, Type
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import get_settings
+from app.db.base_class import Base
+from app.utils.dataset_version import dataset_version
+
+settings = get_settings()
+
+
+class CachedCount(NamedTuple):
+    total: int
+    estimated: bool
+    version: int
+    expires_at: float
+
+
+class CountCache:
+    """Memoize the total number of records per table for the paginated endpoints.
+
+    Counts are kept for `ttl` seconds, or until a write through the CRUD objects
+    invalidates them, or the dataset version changes. For tables larger than
+    `estimate_threshold` rows, the estimate PostgreSQL keeps in `pg_class.reltuples`
+    is used instead of an exact count.
+    """
+
+    def __init__(self, *, ttl: float, estimate_threshold: int) -> None:
+        self.ttl = ttl
+        self.estimate_threshold = estimate_threshold
+        self._counts: Dict[str, CachedCount] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, model: Type[Base]) -> Tuple[int, bool]:
+        """Return the number of records of the given model, and whether the number
+        is estimated.
+
+        Parameters
+        ----------
+        db : Session
+            The database session.
+        model : Type[Base]
+            A SQLAlchemy model class.
+
+        Returns
+        -------
+        Tuple[int, bool]
+        """
+        version = dataset_version.get(db).number
+        cached = self._cached(model, version)
+        if cached:
+            return cached.total, cached.estimated
+
+        estimate = None
+        if self.estimate_threshold > 0:
+            estimate = db.execute(*self._estimate_statement(model)).scalar()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return self._store(model, version, int(estimate), True)
+        count = db.execute(self._count_statement(model)).scalar()
+        return self._store(model, version, count, False)
+
+    async def get_async(self, db: AsyncSession, model: Type[Base]) -> Tuple[int, bool]:
+        """Same as `get`, with an `AsyncSession`."""
+        version = (await dataset_version.get_async(db)).number
+        cached = self._cached(model, version)
+        if cached:
+            return cached.total, cached.estimated
+
+        estimate = None
+        if self.estimate_threshold > 0:
+            estimate = (await db.execute(*self._estimate_statement(model))).scalar()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return self._store(model, version, int(estimate), True)
+        count = (await db.execute(self._count_statement(model))).scalar()
+        return self._store(model, version, count, False)
+
+    def _cached(self, model: Type[Base], version: int) -> Optional[CachedCount]:
+        with self._lock:
+            cached = self._counts.get(inspect(model).local_table.name)
+        if (
+            cached
+            and cached.version == version
+            and cached.expires_at > time.monotonic()
+        ):
+            return cached
+        return None
+
+    def _store(
+        self, model: Type[Base], version: int, count: Optional[int], estimated: bool
+    ) -> Tuple[int, bool]:
+        count = count or 0
+        with self._lock:
+            self._counts[inspect(model).local_table.name] = CachedCount(
+                total=count,
+                estimated=estimated,
+                version=version,
+                expires_at=time.monotonic() + self.ttl,
+            )
+        return count, estimated
+
+    @staticmethod
+    def _estimate_statement(model: Type[Base]) -> Tuple[TextClause, Dict[str, str]]:
+        # `reltuples` is -1 (or 0 before PostgreSQL 14) for tables
+        # that are not vacuumed or analyzed yet.
+        return (
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:t AS regclass)"),
+            {"t": inspect(model).local_table.name},
+        )
+
+    @staticmethod
+    def _count_statement(model: Type[Base]) -> Select:
+        return select(func.count()).select_from(model)
+
+    def invalidate(self, *models: Type[Base]) -> None:
+        """Drop the cached counts of the given models."""
+        with self._lock:
+            for model in models:
+                self._counts.pop(inspect(model).local_table.name, None)
+
+    def clear(self) -> None:
+        """Drop all the cached counts."""
+        with self._lock:
+            self._counts.clear()
+
+
+count_cache = CountCache(
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+    estimate_threshold=settings.COUNT_ESTIMATE_THRESHOLD,
+)
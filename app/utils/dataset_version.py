@@ -0,0 +1,116 @@
+"""The version of the dataset (species, stations and data sources), which the
+HTTP caching and the in-memory caches are keyed on.
+
+The version is bumped in the database by `app/db/init_data.py` and by the writes
+through the CRUD objects, and each worker process reads it again at most every
+`DATASET_VERSION_TTL_SECONDS`.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import get_settings
+from app.models import DatasetVersion
+
+settings = get_settings()
+
+
+class Version(NamedTuple):
+    number: int
+    updated_at: datetime
+
+
+# Before the first migration to the dataset version table has run
+INITIAL_VERSION = Version(
+    number=0, updated_at=datetime(1876, 8, 1, tzinfo=timezone.utc)
+)
+
+
+class CachedVersion(NamedTuple):
+    version: Version
+    expires_at: float
+
+
+class DatasetVersionCache:
+    def __init__(self, *, ttl: float) -> None:
+        self.ttl = ttl
+        self._cached: Optional[CachedVersion] = None
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[Version]:
+        """Return the version read from the database in the last `ttl` seconds."""
+        with self._lock:
+            cached = self._cached
+        if cached and cached.expires_at > time.monotonic():
+            return cached.version
+        return None
+
+    def get(self, db: Session) -> Version:
+        """Return the current version of the dataset.
+
+        Parameters
+        ----------
+        db : Session
+            The database session, only used if the cached version has expired.
+
+        Returns
+        -------
+        Version
+        """
+        version = self.cached()
+        if version is None:
+            version = self._store(db.execute(self._select_statement()).first())
+        return version
+
+    async def get_async(self, db: AsyncSession) -> Version:
+        """Same as `get`, with an `AsyncSession`."""
+        version = self.cached()
+        if version is None:
+            result = await db.execute(self._select_statement())
+            version = self._store(result.first())
+        return version
+
+    def bump(self, db: Session) -> None:
+        """Increment the version in the current transaction of the session, so it
+        changes together with the data. Call `clear` after the transaction is
+        committed, for this process to read the new version."""
+        statement = insert(DatasetVersion).values(id=1, version=1)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[DatasetVersion.id],
+                set_={
+                    "version": DatasetVersion.version + 1,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+    def clear(self) -> None:
+        """Drop the cached version."""
+        with self._lock:
+            self._cached = None
+
+    def _store(self, row: Optional[Row]) -> Version:
+        version = Version(*row) if row else INITIAL_VERSION
+        with self._lock:
+            self._cached = CachedVersion(
+                version=version, expires_at=time.monotonic() + self.ttl
+            )
+        return version
+
+    @staticmethod
+    def _select_statement() -> Select:
+        return select(DatasetVersion.version, DatasetVersion.updated_at).where(
+            DatasetVersion.id == 1
+        )
+
+
+dataset_version = DatasetVersionCache(ttl=settings.DATASET_VERSION_TTL_SECONDS)
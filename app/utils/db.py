@@ -1,7 +1,36 @@
 import geoalchemy2
+from sqlalchemy import Float, func
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.sql.elements import ColumnElement
 
 
 class Geometry(geoalchemy2.Geometry):
     """Make `geoalchemy2.Geometry` return a GeoJSON object instead of WKT."""
 
     as_binary = "ST_AsGeoJSON"
+
+
+class Point(Geometry):
+    """Make the points return a `[longitude, latitude]` list of floats, read by
+    `ST_X` and `ST_Y` in the database, instead of a GeoJSON object parsed for each
+    row."""
+
+    def column_expression(self, col: ColumnElement) -> ColumnElement:
+        return array([func.ST_X(col), func.ST_Y(col)], type_=Float)
+
+
+# The SRID of `Station.coordinates`, WGS 84
+SRID = 4326
+
+
+def point(longitude: float, latitude: float) -> ColumnElement:
+    return func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), SRID)
+
+
+def geography(geometry: ColumnElement) -> ColumnElement:
+    """Cast the geometry to geography, to compare distances in meters.
+
+    The expression is the same as the one of the GiST index on the geography of the
+    coordinates of the stations, so the queries can use it.
+    """
+    return func.geography(geometry)
@@ -0,0 +1,374 @@
+"""In-memory trigram index for fuzzy matching of species names.
+
+It mirrors the `word_similarity` function of the PostgreSQL `pg_trgm` extension,
+so autocomplete requests can be scored in-process and only the winning species are
+fetched from the database.
+"""
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models import Species, SpeciesCommonNames, SpeciesSynonyms
+from app.utils.dataset_version import dataset_version
+from app.utils.logger import logger
+from app.utils.species import binomial_only
+
+settings = get_settings()
+
+# The names that are matched for each species, in the order they are indexed.
+NAME_FIELDS = (
+    "matched_canonical_full_name",
+    "current_name",
+    "common_name",
+    "synonym",
+)
+
+
+def to_float4(value: float) -> float:
+    """Round to single precision, as `pg_trgm` computes similarities in `real`."""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+# The digits of the scores in the responses, whether they are computed by the index
+# or in the database, see `CRUDSpecies.fuzzy_match_query`.
+SCORE_DIGITS = 4
+
+
+def round_score(value: float) -> float:
+    return round(value, SCORE_DIGITS)
+
+
+def words(text: str) -> List[str]:
+    """Split the text into lower-cased words of alphanumeric characters."""
+    result = []
+    word: List[str] = []
+    for char in text.lower():
+        if char.isalnum():
+            word.append(char)
+        elif word:
+            result.append("".join(word))
+            word = []
+    if word:
+        result.append("".join(word))
+    return result
+
+
+def trigrams(text: str) -> List[str]:
+    """Return the trigrams of the text in order, with duplicates.
+    Like `pg_trgm`, each word is padded with two spaces at the start
+    and one at the end."""
+    result: List[str] = []
+    for word in words(text):
+        padded = f"  {word} "
+        result.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def word_similarity(query: str, name: str) -> float:
+    """Port of `pg_trgm`'s `word_similarity(query, name)`: the greatest similarity
+    between the trigrams of `query` and any continuous extent of the ordered
+    trigrams of `name`."""
+    query_trigrams = set(trigrams(query))
+    if not query_trigrams:
+        return 0.0
+    return _iterate_word_similarity(query_trigrams, trigrams(name))
+
+
+def _iterate_word_similarity(query_trigrams: set, name_trigrams: List[str]) -> float:
+    """See `iterate_word_similarity` in `contrib/pg_trgm/trgm_op.c`."""
+    query_length = len(query_trigrams)
+    found = [trigram in query_trigrams for trigram in name_trigrams]
+    # Last position of each trigram in the current extent
+    last_position: Dict[str, int] = {}
+    extent_length = 0  # unique trigrams in the extent
+    count = 0  # unique trigrams in the extent that are in the query
+    lower = -1
+    max_similarity = 0.0
+
+    def similarity(count: int, extent_length: int) -> float:
+        return to_float4(count / (query_length + extent_length - count))
+
+    for i, trigram in enumerate(name_trigrams):
+        if lower >= 0 or found[i]:
+            if last_position.get(trigram, -1) < 0:
+                extent_length += 1
+                if found[i]:
+                    count += 1
+            last_position[trigram] = i
+
+        if not found[i]:
+            continue
+
+        upper = i
+        if lower == -1:
+            lower = i
+            extent_length = 1
+
+        current_similarity = similarity(count, extent_length)
+
+        # Try to move the lower bound for a greater similarity
+        tmp_count = count
+        tmp_extent_length = extent_length
+        previous_lower = lower
+        for tmp_lower in range(lower, upper + 1):
+            tmp_similarity = similarity(tmp_count, tmp_extent_length)
+            if tmp_similarity > current_similarity:
+                current_similarity = tmp_similarity
+                extent_length = tmp_extent_length
+                lower = tmp_lower
+                count = tmp_count
+
+            tmp_trigram = name_trigrams[tmp_lower]
+            if last_position.get(tmp_trigram) == tmp_lower:
+                tmp_extent_length -= 1
+                if found[tmp_lower]:
+                    tmp_count -= 1
+
+        max_similarity = max(max_similarity, current_similarity)
+
+        for tmp_lower in range(previous_lower, lower):
+            tmp_trigram = name_trigrams[tmp_lower]
+            if last_position.get(tmp_trigram) == tmp_lower:
+                last_position[tmp_trigram] = -1
+
+    return max_similarity
+
+
+class FuzzyMatch(NamedTuple):
+    species_id: str
+    score: float
+    matched_field: str
+    matched_name: str
+
+
+class MatchedRecord:
+    """A species record with its best match, read as the rows of
+    `CRUDSpecies.fuzzy_match` are, e.g. by `json_response`."""
+
+    def __init__(self, record: Any, match: FuzzyMatch) -> None:
+        self.record = record
+        self.score = round_score(match.score)
+        self.matched_field = match.matched_field
+        self.matched_name = match.matched_name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.record, name)
+
+
+class FuzzyIndex:
+    """Trigram index of the species names, common names and synonyms.
+
+    Every name gets a position in `names`, and each trigram maps to an array of the
+    positions of the names that contain it. The species and the field of each name
+    are kept in arrays parallel to `names`.
+    """
+
+    def __init__(self) -> None:
+        self.species_ids: List[str] = []
+        self.names: List[str] = []
+        self.name_species = array("I")
+        self.name_fields = array("B")
+        self.postings: Dict[str, array] = {}
+        self.built_at: Optional[float] = None
+        # The dataset version the index was built from
+        self.version = 0
+
+    def build(self, entries: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """Build the index from `(species_id, field, name)` entries."""
+        species_positions: Dict[str, int] = {}
+        postings: Dict[str, array] = defaultdict(lambda: array("I"))
+
+        for species_id, field, name in entries:
+            if not name:
+                continue
+            species_position = species_positions.setdefault(
+                species_id, len(species_positions)
+            )
+            if species_position == len(self.species_ids):
+                self.species_ids.append(species_id)
+
+            position = len(self.names)
+            self.names.append(name)
+            self.name_species.append(species_position)
+            self.name_fields.append(NAME_FIELDS.index(field))
+            for trigram in set(trigrams(name)):
+                postings[trigram].append(position)
+
+        self.postings = dict(postings)
+        self.built_at = time.time()
+
+    @classmethod
+    def from_db(cls, db: Session) -> "FuzzyIndex":
+        """Build the index from the species, common names and synonyms tables.
+        Genera are left out, as the fuzzy search only returns binomial species."""
+        index = cls()
+        # Read before the names, so the index is refreshed if they change meanwhile
+        index.version = dataset_version.get(db).number
+
+        def entries() -> Iterable[Tuple[str, str, Optional[str]]]:
+            for species_id, full_name, current_name in (
+                db.query(
+                    Species.id,
+                    Species.matched_canonical_full_name,
+                    Species.current_name,
+                )
+                .filter(binomial_only())
+                .yield_per(1000)
+            ):
+                yield species_id, "matched_canonical_full_name", full_name
+                yield species_id, "current_name", current_name
+            for species_id, name in (
+                db.query(SpeciesCommonNames.species_id, SpeciesCommonNames.name)
+                .join(Species)
+                .filter(binomial_only())
+                .yield_per(1000)
+            ):
+                yield species_id, "common_name", name
+            for species_id, name in (
+                db.query(SpeciesSynonyms.species_id, SpeciesSynonyms.scientific_name)
+                .join(Species)
+                .filter(binomial_only())
+                .yield_per(1000)
+            ):
+                yield species_id, "synonym", name
+
+        index.build(entries())
+        return index
+
+    def search(
+        self, query: str, *, min_similarity: float, limit: int = 0
+    ) -> List[FuzzyMatch]:
+        """Find the species with a name that has a word similarity with the query
+        of at least `min_similarity`, ordered by their best similarity.
+
+        Parameters
+        ----------
+        query : str
+        min_similarity : float
+        limit : int, optional
+            The maximum number of species to return, by default 0 (no limit).
+
+        Returns
+        -------
+        List[FuzzyMatch]
+        """
+        query_trigrams = set(trigrams(query))
+        if not query_trigrams:
+            return []
+
+        shared: Dict[int, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for position in self.postings.get(trigram, ()):
+                shared[position] += 1
+
+        # A name can't be more similar than the share of the query trigrams it has.
+        min_shared = min_similarity * len(query_trigrams) - 1e-6
+        best: Dict[int, FuzzyMatch] = {}
+        for position, shared_count in shared.items():
+            if shared_count < min_shared:
+                continue
+            name = self.names[position]
+            score = _iterate_word_similarity(query_trigrams, trigrams(name))
+            if score < min_similarity:
+                continue
+            species_position = self.name_species[position]
+            if species_position not in best or score > best[species_position].score:
+                best[species_position] = FuzzyMatch(
+                    species_id=self.species_ids[species_position],
+                    score=score,
+                    matched_field=NAME_FIELDS[self.name_fields[position]],
+                    matched_name=name,
+                )
+
+        matches = sorted(best.values(), key=lambda match: -match.score)
+        return matches[:limit] if limit > 0 else matches
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate the memory used by the index, in bytes, per component."""
+        names = sys.getsizeof(self.names) + sum(map(sys.getsizeof, self.names))
+        species_ids = sys.getsizeof(self.species_ids) + sum(
+            map(sys.getsizeof, self.species_ids)
+        )
+        postings = sys.getsizeof(self.postings) + sum(
+            sys.getsizeof(trigram) + sys.getsizeof(positions)
+            for trigram, positions in self.postings.items()
+        )
+        return {
+            "names": names,
+            "species_ids": species_ids,
+            "name_arrays": sys.getsizeof(self.name_species)
+            + sys.getsizeof(self.name_fields),
+            "postings": postings,
+        }
+
+    def report(self) -> str:
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        components = ", ".join(
+            f"{name}: {size / 2**20:.2f} MiB" for name, size in usage.items()
+        )
+        return (
+            f"Fuzzy index: {len(self.names)} names of {len(self.species_ids)} species,"
+            f" {len(self.postings)} trigrams, {total / 2**20:.2f} MiB ({components})"
+        )
+
+
+_fuzzy_index: Optional[FuzzyIndex] = None
+_fuzzy_index_lock = threading.Lock()
+_refreshing = False
+
+
+def get_fuzzy_index() -> Optional[FuzzyIndex]:
+    """Return the current fuzzy index, if it's enabled and built."""
+    return _fuzzy_index if settings.FUZZY_INDEX_ENABLED else None
+
+
+def refresh_fuzzy_index(db: Session) -> FuzzyIndex:
+    """Rebuild the fuzzy index from the database and swap it with the current one.
+    Requests being served keep using the previous index until the new one is ready.
+
+    Call it after the species data has changed, e.g. after `app/db/init_data.py`,
+    or see `refresh_fuzzy_index_if_stale`.
+    """
+    global _fuzzy_index
+
+    start = time.perf_counter()
+    index = FuzzyIndex.from_db(db)
+    with _fuzzy_index_lock:
+        _fuzzy_index = index
+    logger.info(f"{index.report()}, built in {time.perf_counter() - start:.2f}s")
+    return index
+
+
+def refresh_fuzzy_index_if_stale(version: int) -> None:
+    """Rebuild the fuzzy index in a background thread if it was built from an older
+    version of the dataset, e.g. before an import."""
+    global _refreshing
+
+    with _fuzzy_index_lock:
+        if _fuzzy_index is None or _fuzzy_index.version >= version or _refreshing:
+            return
+        _refreshing = True
+
+    def refresh() -> None:
+        global _refreshing
+
+        db = SessionLocal()
+        try:
+            refresh_fuzzy_index(db)
+        except Exception as exc:
+            logger.exception(exc)
+        finally:
+            db.close()
+            with _fuzzy_index_lock:
+                _refreshing = False
+
+    threading.Thread(target=refresh, daemon=True).start()
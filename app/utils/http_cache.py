@@ -0,0 +1,128 @@
+"""HTTP caching of the read endpoints of the dataset.
+
+The responses of the species, stations and data source endpoints only change with
+the dataset version and the deployed build of the API, so both are used as their
+`ETag`, and the time the later of them happened as their `Last-Modified`. A
+conditional request for the current version is answered with `304 Not Modified`
+before the endpoint runs.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import PROJECT_ROOT
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.utils.dataset_version import Version, dataset_version
+
+settings = get_settings()
+
+CACHED_PATHS = tuple(
+    f"{settings.API_V1_STR}/{path}/" for path in ("species", "stations", "data_source")
+)
+
+
+def build_hash() -> str:
+    """Hash the version and the source of the API, which the schemas of the
+    responses are defined in, identifying the deployed build."""
+    digest = hashlib.sha1()
+    digest.update((PROJECT_ROOT / "pyproject.toml").read_bytes())
+    for path in sorted((PROJECT_ROOT / "app").rglob("*.py")):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+BUILD_ID = settings.BUILD_ID or build_hash()
+# The worker started serving this build: the responses cached by the clients
+# before were not modified since, but may have been rendered by another build
+STARTED_AT = datetime.now(timezone.utc)
+
+
+def make_etag(version: Version) -> str:
+    # Weak, as the same version can be encoded differently, e.g. when compressed
+    return f'W/"{BUILD_ID}-{version.number}"'
+
+
+def last_modified(version: Version) -> datetime:
+    return max(version.updated_at, STARTED_AT)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether the `If-None-Match` header matches the ETag, using the weak
+    comparison of RFC 9110."""
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return any(opaque(tag) == opaque(etag) for tag in if_none_match.split(","))
+
+
+def not_modified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have a resolution of one second
+    return updated_at.replace(microsecond=0) <= since
+
+
+def cache_headers(version: Version) -> Dict[str, str]:
+    return {
+        "ETag": make_etag(version),
+        "Last-Modified": format_datetime(
+            last_modified(version).astimezone(timezone.utc), usegmt=True
+        ),
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}",
+    }
+
+
+async def current_version() -> Version:
+    version = dataset_version.cached()
+    if version is None:
+        async with AsyncSessionLocal() as db:
+            version = await dataset_version.get_async(db)
+    return version
+
+
+def is_cacheable(request: Request) -> bool:
+    return request.method in ("GET", "HEAD") and request.url.path.startswith(
+        CACHED_PATHS
+    )
+
+
+async def http_cache_middleware(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Add the caching headers of the dataset version to the successful responses,
+    and answer the conditional requests for the current version with 304."""
+    if not is_cacheable(request):
+        return await call_next(request)
+
+    version = await current_version()
+    headers = cache_headers(version)
+
+    not_modified = False
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        not_modified = etag_matches(if_none_match, headers["ETag"])
+    elif "If-Modified-Since" in request.headers:
+        not_modified = not_modified_since(
+            request.headers["If-Modified-Since"], last_modified(version)
+        )
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,148 @@
+"""Loading of what a response schema serializes, and only that.
+
+Without eager loading, serializing a record with relationships, e.g.
+`SpeciesDetails`, runs a query per relationship while the response is validated,
+and fails with an `AsyncSession`, which can't lazy load.
+
+The other way around, the summaries of the list endpoints, e.g. `StationSummary`,
+serialize a few columns of the records, so only those are selected (see
+`projected_columns`), instead of long texts such as `stations.text`.
+"""
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Type,
+)
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.db.base_class import Base
+
+# `selectin` loads a relationship with a second query, for all the loaded records,
+# and `joined` with a join in the query of the records.
+Strategy = Literal["selectin", "joined"]
+
+LOADERS: Dict[str, Callable[..., Any]] = {
+    "selectin": selectinload,
+    "joined": joinedload,
+}
+
+
+def loader_options(
+    model: Type[Base],
+    schema: Type[BaseModel],
+    *,
+    strategies: Optional[Dict[str, Strategy]] = None,
+    filters: Optional[Dict[str, Callable[[], ClauseElement]]] = None,
+) -> List[Any]:
+    """Create the loader options of the relationships of the model that are fields
+    of the schema, and of the relationships of their nested schemas.
+
+    Parameters
+    ----------
+    model : Type[Base]
+    schema : Type[BaseModel]
+        The response model of the records.
+    strategies : Optional[Dict[str, Strategy]]
+        The loading strategy of the relationships, by their dotted path from the
+        model, e.g. `species.data_source`. By default, the collections are loaded
+        with `selectin`, which doesn't repeat the record for each related record,
+        and the single related records with `joined`.
+    filters : Optional[Dict[str, Callable[[], ClauseElement]]]
+        Functions creating the filter clauses of the related records to load, by
+        the dotted path of the relationships.
+
+    Returns
+    -------
+    List[Any]
+        The options to pass to `Query.options`.
+    """
+    return list(
+        _loader_options(model, schema, None, "", strategies or {}, filters or {})
+    )
+
+
+def _loader_options(
+    model: Type[Base],
+    schema: Type[BaseModel],
+    parent: Any,
+    prefix: str,
+    strategies: Dict[str, Strategy],
+    filters: Dict[str, Callable[[], ClauseElement]],
+) -> Iterator[Any]:
+    relationships = inspect(model).relationships
+    for name, field in schema.__fields__.items():
+        if name not in relationships:
+            continue
+        relationship = relationships[name]
+        path = prefix + name
+
+        attribute = getattr(model, name)
+        if path in filters:
+            attribute = attribute.and_(filters[path]())
+        strategy = strategies.get(
+            path, "selectin" if relationship.uselist else "joined"
+        )
+        if parent is None:
+            option = LOADERS[strategy](attribute)
+        else:
+            option = getattr(parent, f"{strategy}load")(attribute)
+        yield option
+
+        # The type of a list field is the type of its items
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            yield from _loader_options(
+                relationship.mapper.class_,
+                field.type_,
+                option,
+                f"{path}.",
+                strategies,
+                filters,
+            )
+
+
+def projected_columns(
+    model: Type[Base], schema: Type[BaseModel], *, include: Iterable[str] = ()
+) -> Optional[List[Any]]:
+    """Return the column attributes of the model that the schema serializes, to
+    select them instead of the whole records.
+
+    The primary key columns come first, whether the schema serializes them or not,
+    so the selected rows can be told apart when a join repeats them.
+
+    Parameters
+    ----------
+    model : Type[Base]
+    schema : Type[BaseModel]
+        The response model of the records.
+    include : Iterable[str]
+        The names of other column attributes to select, e.g. the keyset columns of
+        a cursor page.
+
+    Returns
+    -------
+    Optional[List[Any]]
+        The column attributes, or None if the schema serializes relationships or
+        other attributes that are not columns, and needs the whole records.
+    """
+    mapper = inspect(model)
+    columns = {column_property.key for column_property in mapper.column_attrs}
+    names = [
+        mapper.get_property_by_column(primary_key).key
+        for primary_key in mapper.primary_key
+    ]
+    for name in [*schema.__fields__, *include]:
+        if name not in columns:
+            return None
+        if name not in names:
+            names.append(name)
+    return [getattr(model, name) for name in names]
@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, TypedDict
+
+from fastapi.encoders import jsonable_encoder
+
+
+class Cursor(TypedDict):
+    """The decoded content of an opaque pagination cursor.
+
+    `values` holds the values of the keyset columns (the `order_by` columns followed
+    by the primary key) for the row the page starts after (or ends before, if
+    `before` is set). A cursor without values points to the first page, or to the
+    last page if `before` is set.
+    """
+
+    order_by: List[str]
+    values: Optional[List[Any]]
+    before: bool
+
+
+def encode_cursor(
+    order_by: Optional[List[str]],
+    values: Optional[List[Any]] = None,
+    *,
+    before: bool = False,
+) -> str:
+    """Encode the keyset position into an URL-safe opaque string.
+
+    Parameters
+    ----------
+    order_by : Optional[List[str]]
+        The `order_by` argument the page was requested with.
+    values : Optional[List[Any]]
+        The values of the keyset columns for the boundary row.
+    before : bool
+        Whether the page ends before the boundary row instead of starting after it.
+
+    Returns
+    -------
+    str
+    """
+    payload = json.dumps(
+        jsonable_encoder(
+            {"order_by": order_by or [], "values": values, "before": before}
+        ),
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: Optional[List[str]] = None) -> Cursor:
+    """Decode a cursor created by `encode_cursor`.
+    An empty cursor starts the cursor pagination from the first page,
+    ordered by the given `order_by`.
+
+    Parameters
+    ----------
+    cursor : str
+    order_by : Optional[List[str]]
+        Only used for an empty cursor. Otherwise, the order of the cursor is used.
+
+    Returns
+    -------
+    Cursor
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed.
+    """
+    if not cursor:
+        return Cursor(order_by=order_by or [], values=None, before=False)
+
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        )
+        decoded = Cursor(
+            order_by=list(map(str, payload["order_by"])),
+            values=payload["values"],
+            before=bool(payload["before"]),
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if decoded["values"] is not None and not isinstance(decoded["values"], list):
+        raise ValueError("Invalid cursor")
+    return decoded
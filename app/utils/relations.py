@@ -0,0 +1,59 @@
+"""Semi-joins of the relations of the search queries.
+
+Joining a one-to-many relation, e.g. the synonyms of the species, to filter the
+records repeats each record for each of its related records, which then have to
+be deduplicated. The search expressions on the columns of such a relation are
+instead tested with `EXISTS` subqueries (see `CRUDBase.create_search_expressions`),
+which the planner runs as semi-joins, and which don't repeat the records.
+"""
+from typing import Optional, Type, Union
+
+from sqlalchemy import Table, and_, inspect, literal_column, select
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.db.base_class import Base
+
+Relation = Union[Type[Base], Table]
+
+
+def relation_table(relation: Relation) -> Table:
+    """Return the table of a relation, which is either a table or a model."""
+    if isinstance(relation, Table):
+        return relation
+    return inspect(relation).local_table
+
+
+def correlation_clause(
+    model: Type[Base], relation: Relation
+) -> Optional[ClauseElement]:
+    """Return the clause matching the rows of the relation to the records of the
+    model, through the foreign keys of the relation to the table of the model.
+
+    Returns
+    -------
+    Optional[ClauseElement]
+        The clause, or None if the relation has no foreign key to the model, i.e. it
+        is not one-to-many, and must be joined.
+    """
+    model_table = relation_table(model)
+    clauses = [
+        foreign_key.parent == foreign_key.column
+        for foreign_key in relation_table(relation).foreign_keys
+        if foreign_key.column.table is model_table
+    ]
+    if not clauses:
+        return None
+    return and_(*clauses)
+
+
+def exists_in(
+    relation: Relation, correlation: ClauseElement, clause: ClauseElement
+) -> ClauseElement:
+    """Create the `EXISTS` subquery of the rows of the relation that are related to
+    the record and match the clause."""
+    return (
+        select(literal_column("1"))
+        .select_from(relation_table(relation))
+        .where(correlation, clause)
+        .exists()
+    )
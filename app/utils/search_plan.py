@@ -0,0 +1,163 @@
+"""Cache of the compiled queries of the search endpoints, by the shape of their search
+expressions.
+
+Building a search query walks the tree of its expressions, resolves their columns
+in the model and the relations, and creates the ORM query, whose statement
+SQLAlchemy then compiles. The search terms are bound parameters of the statement
+(see `CRUDBase.create_search_expressions`), so the requests whose expressions only
+differ by their terms reuse the same `SearchPlan`, and its statement, whose SQL is
+compiled once in the compiled cache of SQLAlchemy, as its cache key is memoized.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.schemas import Expression, ExpressionGroup
+from app.utils.metrics import counter, histogram
+
+plan_requests = counter(
+    "search_plan_cache_requests_total",
+    "Lookups in the search plan cache, by model and result (hit or miss).",
+    ["model", "result"],
+)
+plan_compile_seconds = histogram(
+    "search_plan_compile_seconds",
+    "Time to compile the search expressions into a plan, by model.",
+    ["model"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1],
+)
+
+
+class SearchPlan(NamedTuple):
+    # The query, for the description of its rows, see `CRUDBase.unique`
+    query: Query
+    statement: Select
+    # The columns of the search expressions, in the order of `search_terms`
+    columns: List[Any]
+
+
+def search_terms(
+    expressions: Union[Expression, ExpressionGroup]
+) -> Iterator[Expression]:
+    """Yield the expressions of the tree that have a search term, depth first."""
+    if isinstance(expressions, ExpressionGroup):
+        for expression in expressions.expressions:
+            yield from search_terms(expression)
+    else:
+        yield expressions
+
+
+def expression_shape(expressions: Union[Expression, ExpressionGroup]) -> Hashable:
+    """Return what the SQL of the search expressions depends on, i.e. everything
+    but the search terms and the minimum similarities."""
+    if isinstance(expressions, ExpressionGroup):
+        return (
+            expressions.join,
+            tuple(
+                expression_shape(expression) for expression in expressions.expressions
+            ),
+        )
+    return (
+        expressions.column_name,
+        expressions.operator,
+        expressions.fuzzy,
+        expressions.min_string_similarity is None,
+    )
+
+
+def clauses_key(clauses: Sequence[ClauseElement]) -> Optional[Hashable]:
+    """Return a key of the structure and the values of the clauses, or None if
+    SQLAlchemy can't cache them, or their values can't be hashed."""
+    keys = []
+    for clause in clauses:
+        cache_key = clause._generate_cache_key()  # type: ignore[attr-defined]
+        if cache_key is None:
+            return None
+        keys.append(
+            (
+                cache_key.key,
+                tuple(bind.effective_value for bind in cache_key.bindparams),
+            )
+        )
+    try:
+        hash(tuple(keys))
+    except TypeError:
+        return None
+    return tuple(keys)
+
+
+class SearchPlanCache:
+    """A least recently used cache of the search plans of a model.
+
+    Parameters
+    ----------
+    name : str
+        The name of the model, for the metrics.
+    maxsize : int
+        The maximum number of plans. If 0, nothing is cached.
+    """
+
+    def __init__(self, name: str, *, maxsize: int) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[Hashable, SearchPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(
+        self, key: Optional[Hashable], build: Callable[[], SearchPlan]
+    ) -> SearchPlan:
+        """Return the plan of the key, compiling and storing it if it isn't cached.
+
+        Parameters
+        ----------
+        key : Optional[Hashable]
+            The shape of the search, or None if it can't be cached.
+        build : Callable[[], SearchPlan]
+            The function compiling the plan.
+
+        Returns
+        -------
+        SearchPlan
+        """
+        if key is not None and self.maxsize > 0:
+            with self._lock:
+                plan = self._plans.get(key)
+                if plan is not None:
+                    self._plans.move_to_end(key)
+            if plan is not None:
+                plan_requests.inc(model=self.name, result="hit")
+                return plan
+        plan_requests.inc(model=self.name, result="miss")
+
+        start = time.perf_counter()
+        plan = build()
+        plan_compile_seconds.observe(time.perf_counter() - start, model=self.name)
+
+        if key is not None and self.maxsize > 0:
+            with self._lock:
+                self._plans[key] = plan
+                while len(self._plans) > self.maxsize:
+                    self._plans.popitem(last=False)
+        return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
@@ -0,0 +1,142 @@
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Optional,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+from app.utils.encoders import encode_json, row_encoder
+
+
+class StreamFormat(str, Enum):
+    json = "json"  # A JSON array, sent in chunks
+    ndjson = "ndjson"  # Newline-delimited JSON, one record per line
+
+
+def encode_row(row: Any, schema: Type[BaseModel]) -> bytes:
+    """Serialize one record the same way FastAPI serializes a response model, see
+    `app.utils.encoders`."""
+    return encode_json(row_encoder(schema)(row))
+
+
+class ChunkBuffer:
+    """Collect serialized records into chunks of about `chunk_size` bytes."""
+
+    def __init__(self, chunk_size: int, start: bytes = b"") -> None:
+        self.chunk_size = chunk_size
+        self.chunk = bytearray(start)
+
+    def add(self, data: bytes) -> Optional[bytes]:
+        """Add the data, and return the chunk if it is full."""
+        self.chunk += data
+        if len(self.chunk) < self.chunk_size:
+            return None
+        chunk = bytes(self.chunk)
+        self.chunk.clear()
+        return chunk
+
+    def close(self, end: bytes = b"") -> Optional[bytes]:
+        """Add the end of the stream, and return the last chunk if it isn't empty."""
+        self.chunk += end
+        return bytes(self.chunk) if self.chunk else None
+
+
+def stream_json_array(
+    rows: Iterable[Any], schema: Type[BaseModel], *, chunk_size: int = 64 * 1024
+) -> Iterator[bytes]:
+    """Serialize the records into a JSON array, yielding chunks of about
+    `chunk_size` bytes, so only one chunk is held in memory at a time."""
+    buffer = ChunkBuffer(chunk_size, b"[")
+    separator = b""
+    for row in rows:
+        chunk = buffer.add(separator + encode_row(row, schema))
+        separator = b","
+        if chunk:
+            yield chunk
+    yield buffer.close(b"]") or b""
+
+
+async def stream_json_array_async(
+    rows: AsyncIterable[Any], schema: Type[BaseModel], *, chunk_size: int = 64 * 1024
+) -> AsyncIterator[bytes]:
+    """Same as `stream_json_array`, for records from an async iterable."""
+    buffer = ChunkBuffer(chunk_size, b"[")
+    separator = b""
+    async for row in rows:
+        chunk = buffer.add(separator + encode_row(row, schema))
+        separator = b","
+        if chunk:
+            yield chunk
+    yield buffer.close(b"]") or b""
+
+
+def stream_ndjson(
+    rows: Iterable[Any], schema: Type[BaseModel], *, chunk_size: int = 64 * 1024
+) -> Iterator[bytes]:
+    """Serialize the records into newline-delimited JSON, yielding chunks of about
+    `chunk_size` bytes."""
+    buffer = ChunkBuffer(chunk_size)
+    for row in rows:
+        chunk = buffer.add(encode_row(row, schema) + b"\n")
+        if chunk:
+            yield chunk
+    chunk = buffer.close()
+    if chunk:
+        yield chunk
+
+
+async def stream_ndjson_async(
+    rows: AsyncIterable[Any], schema: Type[BaseModel], *, chunk_size: int = 64 * 1024
+) -> AsyncIterator[bytes]:
+    """Same as `stream_ndjson`, for records from an async iterable."""
+    buffer = ChunkBuffer(chunk_size)
+    async for row in rows:
+        chunk = buffer.add(encode_row(row, schema) + b"\n")
+        if chunk:
+            yield chunk
+    chunk = buffer.close()
+    if chunk:
+        yield chunk
+
+
+def streaming_response(
+    rows: Union[Iterable[Any], AsyncIterable[Any]],
+    schema: Type[BaseModel],
+    stream_format: StreamFormat,
+) -> StreamingResponse:
+    """Create a chunked response that serializes the records while they are
+    fetched from the database.
+
+    Parameters
+    ----------
+    rows : Union[Iterable[Any], AsyncIterable[Any]]
+        The records, e.g. from `CRUDBase.stream_all` or `CRUDBase.stream_all_async`.
+    schema : Type[BaseModel]
+        The Pydantic model of each record in the response.
+    stream_format : StreamFormat
+
+    Returns
+    -------
+    StreamingResponse
+    """
+    content: Union[Iterator[bytes], AsyncIterator[bytes]]
+    if stream_format == StreamFormat.ndjson:
+        if isinstance(rows, AsyncIterable):
+            content = stream_ndjson_async(rows, schema)
+        else:
+            content = stream_ndjson(rows, schema)
+        return StreamingResponse(content, media_type="application/x-ndjson")
+
+    if isinstance(rows, AsyncIterable):
+        content = stream_json_array_async(rows, schema)
+    else:
+        content = stream_json_array(rows, schema)
+    return StreamingResponse(content, media_type="application/json")
@@ -2,7 +2,12 @@
 
 set -e
 
+# Usage: import_data.sh [-t|--test] [-i|--incremental] [-r|--report]
+#                       [--workers N] [--batch-size N]
+# The other options are passed on to app/db/init_data.py, see its --help.
+
 TEST=0
+ARGS=()
 
 while test $# -gt 0; do
     case "$1" in
@@ -10,6 +15,18 @@ while test $# -gt 0; do
         TEST=1
         shift
         ;;
+    -i | --incremental)
+        ARGS+=(--incremental)
+        shift
+        ;;
+    -r | --report)
+        ARGS+=(--report)
+        shift
+        ;;
+    *)
+        ARGS+=("$1")
+        shift
+        ;;
     esac
 done
 
@@ -18,7 +35,7 @@ export PYTHONPATH=$PROJECT_ROOT
 
 # Create initial data in DB
 if [ "$TEST" == 1 ]; then
-   python app/db/init_data.py --testing
+   python app/db/init_data.py --testing "${ARGS[@]}"
 else
-   python app/db/init_data.py
+   python app/db/init_data.py "${ARGS[@]}"
 fi
@@ -0,0 +1,9 @@
+#! /usr/bin/env bash
+
+set -e
+
+PROJECT_ROOT=$(dirname $(dirname $(realpath $0)))
+export PYTHONPATH=$PROJECT_ROOT
+
+# Refresh the station and species counts, see app/db/aggregates.py
+python app/db/refresh_aggregates.py